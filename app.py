@@ -1,18 +1,99 @@
 import streamlit as st
-import pyperclip
-import matplotlib.pyplot as plt
 from src.zero_width_steg import ZeroWidthSteg
 from src.morse_steg import MorseSteg
 from src.unicode_steg import UnicodeSteg
 from src.encryption import Encryptor
-from src.analyzer import StegAnalyzer  # Import module phân tích mới
+from src.analyzer import StegAnalyzer, CharHistogram  # Import module phân tích mới
+from src.lazy import lazy_import
 
-# Khởi tạo các phương pháp steganography, encryptor và analyzer
-zero_width_steg = ZeroWidthSteg()
-morse_steg = MorseSteg()
-unicode_steg = UnicodeSteg()
-encryptor = Encryptor()
-analyzer = StegAnalyzer()  # Khởi tạo analyzer
+# pyperclip chỉ được nạp khi người dùng bấm sao chép
+pyperclip = lazy_import('pyperclip')
+
+# Giới hạn bộ nhớ đệm kết quả phân tích/trích xuất dùng chung giữa các phiên
+CACHE_MAX_ENTRIES = 256
+CACHE_TTL = 600  # giây
+
+# Khởi tạo các phương pháp steganography, encryptor và analyzer một lần cho cả server
+# Khóa hoán vị do người dùng nhập không nằm trong khóa cache, được gắn theo từng lần gọi qua with_key
+@st.cache_resource(show_spinner=False)
+def load_zero_width_steg(bits_per_symbol=1, distribute=False):
+    return ZeroWidthSteg(bits_per_symbol, distribute)
+
+@st.cache_resource(show_spinner=False)
+def load_morse_steg():
+    steg = MorseSteg()
+    steg.load_word_lists()  # Tải danh sách từ một lần
+    return steg
+
+@st.cache_resource(show_spinner=False)
+def load_unicode_steg():
+    return UnicodeSteg()
+
+@st.cache_resource(show_spinner=False)
+def load_encryptor():
+    return Encryptor()
+
+@st.cache_resource(show_spinner=False)
+def load_analyzer():
+    return StegAnalyzer()
+
+zero_width_steg = load_zero_width_steg()
+morse_steg = load_morse_steg()
+unicode_steg = load_unicode_steg()
+encryptor = load_encryptor()
+analyzer = load_analyzer()  # Khởi tạo analyzer
+
+# Các hàm trích xuất và phân tích không phụ thuộc mật khẩu được lưu đệm theo hash của đầu vào
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def extract_zero_width(stego_text, key=None):
+    return zero_width_steg.with_key(key).extract(stego_text)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def extract_zero_width_bytes(stego_text, key=None):
+    return zero_width_steg.with_key(key).extract_bytes(stego_text)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def extract_morse(stego_text):
+    return morse_steg.extract(stego_text)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def extract_unicode(stego_text):
+    return unicode_steg.extract(stego_text)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def extract_unicode_bytes(stego_text):
+    return unicode_steg.extract_bytes(stego_text)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def analyze_texts(original_text, stego_text, steg_method):
+    """Toàn bộ phân tích so sánh hai văn bản: kết quả chung, cụ thể, entropy và biểu đồ PNG"""
+    # Phân tích chung
+    general_results = analyzer.analyze_text_changes(original_text, stego_text)
+    
+    # Phân tích cụ thể theo phương pháp
+    specific_results = {}
+    if steg_method == "Zero-width Characters":
+        specific_results = analyzer.analyze_zero_width(stego_text)
+    elif steg_method == "Mã Morse Ẩn":
+        specific_results = analyzer.analyze_morse(stego_text)
+    elif steg_method == "Unicode Steganography":
+        specific_results = analyzer.analyze_unicode(stego_text, unicode_steg.similar_chars)
+    
+    # Đếm tần suất ký tự một lần, dùng chung cho entropy và biểu đồ
+    original_histogram = CharHistogram(original_text)
+    stego_histogram = CharHistogram(stego_text)
+    
+    return {
+        "general": general_results,
+        "specific": specific_results,
+        "original_entropy": float(analyzer.calculate_entropy(original_histogram)),
+        "stego_entropy": float(analyzer.calculate_entropy(stego_histogram)),
+        "chart": analyzer.render_char_distribution(original_histogram, stego_histogram),
+    }
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def detect_steganography(suspect_text):
+    return analyzer.detect_steganography(suspect_text)
 
 # Thiết lập trang
 st.set_page_config(
@@ -45,6 +126,18 @@ with tab1:
         
         cover_text = st.text_area("Văn bản gốc:", height=150, key="zw_cover")
         secret_text = st.text_area("Thông điệp bí mật:", height=100, key="zw_secret")
+        zw_bits = st.selectbox(
+            "Số bit mỗi ký tự ẩn:", [1, 2, 4, 8], key="zw_bits",
+            help="Nhiều bit mỗi ký tự dùng bảng chữ cái lớn hơn (word joiner, variation selector, ...) "
+                 "nên văn bản kết quả ngắn hơn; trích xuất tự nhận biết bảng chữ cái"
+        )
+        zw_distribute = st.checkbox(
+            "Phân tán thông điệp theo ranh giới từ", key="zw_distribute",
+            help="Chia thông điệp thành nhiều đoạn nhỏ đặt ở cuối các từ thay vì một khối liền"
+        )
+        zw_key = ""
+        if zw_distribute:
+            zw_key = st.text_input("Khóa xáo trộn thứ tự đoạn (tùy chọn):", type="password", key="zw_key")
         
         # Thêm tùy chọn mật khẩu
         use_password = st.checkbox("Sử dụng mật khẩu bảo vệ", key="zw_use_password")
@@ -66,12 +159,11 @@ with tab1:
                 st.error("Vui lòng nhập mật khẩu")
             else:
                 try:
-                    # Mã hóa thông điệp nếu sử dụng mật khẩu
-                    message_to_hide = secret_text
+                    # Mã hóa thông điệp nếu sử dụng mật khẩu (bản mã nhị phân được nhúng trực tiếp)
                     if use_password:
-                        message_to_hide = encryptor.encrypt(secret_text, password)
-                    
-                    result = zero_width_steg.hide(cover_text, message_to_hide)
+                        result = load_zero_width_steg(zw_bits, zw_distribute).with_key(zw_key).hide_bytes(cover_text, encryptor.encrypt_bytes(secret_text, password))
+                    else:
+                        result = load_zero_width_steg(zw_bits, zw_distribute).with_key(zw_key).hide(cover_text, secret_text)
                     st.session_state.zw_result = result
                     st.text_area("Kết quả:", value=result, height=150, key="zw_result_area")
                     st.success("Đã ẩn thông điệp thành công!")
@@ -94,6 +186,8 @@ with tab1:
         decrypt_password = ""
         if is_encrypted:
             decrypt_password = st.text_input("Nhập mật khẩu để giải mã:", type="password", key="zw_decrypt_password")
+        extract_key = st.text_input("Khóa xáo trộn (nếu thông điệp được phân tán có khóa):", type="password",
+                                    key="zw_extract_key")
         
         # Tạo hai cột cho nút trích xuất và nút sao chép
         extract_col1, extract_col2 = st.columns([1, 1])
@@ -109,12 +203,14 @@ with tab1:
                 st.error("Vui lòng nhập mật khẩu để giải mã")
             else:
                 try:
-                    extracted_message = zero_width_steg.extract(stego_text)
+                    extracted_message = extract_zero_width(stego_text, extract_key or None)
                     
                     # Giải mã nếu thông điệp được mã hóa
                     if is_encrypted:
                         try:
-                            extracted_message = encryptor.decrypt(extracted_message, decrypt_password)
+                            extracted_data = extract_zero_width_bytes(stego_text, extract_key or None)
+                            if extracted_data is not None:
+                                extracted_message = encryptor.decrypt_bytes(extracted_data, decrypt_password)
                         except ValueError:
                             st.error("Mật khẩu không đúng hoặc thông điệp không được mã hóa")
                             extracted_message = "Lỗi giải mã: Mật khẩu không đúng hoặc thông điệp không được mã hóa"
@@ -168,7 +264,6 @@ with tab2:
                     if morse_use_password:
                         message_to_hide = encryptor.encrypt(morse_secret, morse_password)
                     
-                    morse_steg.load_word_lists()  # Đảm bảo danh sách từ được tải
                     result = morse_steg.hide(message_to_hide)
                     st.session_state.morse_result = result
                     st.text_area("Kết quả (văn bản chứa mã Morse ẩn):", value=result, height=150, key="morse_result_area")
@@ -207,8 +302,7 @@ with tab2:
                 st.error("Vui lòng nhập mật khẩu để giải mã")
             else:
                 try:
-                    morse_steg.load_word_lists()  # Đảm bảo danh sách từ được tải
-                    extracted_message = morse_steg.extract(morse_stego)
+                    extracted_message = extract_morse(morse_stego)
                     
                     # Giải mã nếu thông điệp được mã hóa
                     if morse_is_encrypted:
@@ -263,12 +357,11 @@ with tab3:
                 st.error("Vui lòng nhập mật khẩu")
             else:
                 try:
-                    # Mã hóa thông điệp nếu sử dụng mật khẩu
-                    message_to_hide = unicode_secret
+                    # Mã hóa thông điệp nếu sử dụng mật khẩu (bản mã nhị phân được nhúng trực tiếp)
                     if unicode_use_password:
-                        message_to_hide = encryptor.encrypt(unicode_secret, unicode_password)
-                    
-                    result = unicode_steg.hide(unicode_cover, message_to_hide)
+                        result = unicode_steg.hide_bytes(unicode_cover, encryptor.encrypt_bytes(unicode_secret, unicode_password))
+                    else:
+                        result = unicode_steg.hide(unicode_cover, unicode_secret)
                     st.session_state.unicode_result = result
                     st.text_area("Kết quả:", value=result, height=150, key="unicode_result_area")
                     st.success("Đã ẩn thông điệp thành công!")
@@ -306,12 +399,12 @@ with tab3:
                 st.error("Vui lòng nhập mật khẩu để giải mã")
             else:
                 try:
-                    extracted_message = unicode_steg.extract(unicode_stego)
+                    extracted_message = extract_unicode(unicode_stego)
                     
                     # Giải mã nếu thông điệp được mã hóa
                     if unicode_is_encrypted:
                         try:
-                            extracted_message = encryptor.decrypt(extracted_message, unicode_decrypt_password)
+                            extracted_message = encryptor.decrypt_bytes(extract_unicode_bytes(unicode_stego), unicode_decrypt_password)
                         except ValueError:
                             st.error("Mật khẩu không đúng hoặc thông điệp không được mã hóa")
                             extracted_message = "Lỗi giải mã: Mật khẩu không đúng hoặc thông điệp không được mã hóa"
@@ -357,21 +450,12 @@ with tab4:
             if not original_text or not stego_text:
                 st.error("Vui lòng nhập cả văn bản gốc và văn bản đã ẩn thông tin")
             else:
-                # Phân tích chung
-                general_results = analyzer.analyze_text_changes(original_text, stego_text)
-                
-                # Phân tích cụ thể theo phương pháp
-                specific_results = {}
-                if steg_method == "Zero-width Characters":
-                    specific_results = analyzer.analyze_zero_width(stego_text)
-                elif steg_method == "Mã Morse Ẩn":
-                    specific_results = analyzer.analyze_morse(stego_text)
-                elif steg_method == "Unicode Steganography":
-                    specific_results = analyzer.analyze_unicode(stego_text, unicode_steg.similar_chars)
-                
-                # Tính entropy
-                original_entropy = analyzer.calculate_entropy(original_text)
-                stego_entropy = analyzer.calculate_entropy(stego_text)
+                # Phân tích (lưu đệm theo nội dung hai văn bản và phương pháp)
+                analysis = analyze_texts(original_text, stego_text, steg_method)
+                general_results = analysis["general"]
+                specific_results = analysis["specific"]
+                original_entropy = analysis["original_entropy"]
+                stego_entropy = analysis["stego_entropy"]
                 
                 # Hiển thị kết quả
                 st.subheader("Kết quả phân tích")
@@ -385,6 +469,11 @@ with tab4:
                     st.write(f"- Độ dài văn bản đã ẩn: {general_results['stego_length']} ký tự")
                     st.write(f"- Chênh lệch độ dài: {general_results['length_difference']} ký tự")
                     st.write(f"- Số ký tự khác nhau: {general_results['different_chars']}")
+                    st.write(f"- Ký tự chèn/xóa/thay thế: {general_results['inserted_chars']}"
+                             f"/{general_results['deleted_chars']}/{general_results['substituted_chars']}"
+                             f" ({len(general_results['changes'])} đoạn)")
+                    if general_results.get('approximate'):
+                        st.caption("Thay đổi quá dày đặc, số liệu chèn/xóa/thay thế là gần đúng")
                     st.write(f"- Tỷ lệ thay đổi: {general_results['change_ratio']:.2%}")
                 
                 with res_col2:
@@ -399,6 +488,7 @@ with tab4:
                         st.write(f"- Số ký tự zero-width space: {specific_results['zwsp_count']}")
                         st.write(f"- Số ký tự zero-width joiner: {specific_results['zwj_count']}")
                         st.write(f"- Số ký tự zero-width non-joiner: {specific_results['zwnj_count']}")
+                        st.write(f"- Số ký tự ẩn khác (word joiner, variation selector, ...): {specific_results['other_zero_width_count']}")
                         st.write(f"- Tổng số ký tự zero-width: {specific_results['total_zero_width']}")
                         st.write(f"- Tỷ lệ ký tự zero-width: {specific_results['zero_width_ratio']:.2%}")
                     
@@ -416,9 +506,9 @@ with tab4:
                 
                 # Hiển thị biểu đồ phân bố ký tự
                 st.subheader("Biểu đồ phân bố ký tự")
-                fig = analyzer.plot_char_distribution(original_text, stego_text)
-                if fig:
-                    st.pyplot(fig)
+                chart = analysis["chart"]
+                if chart:
+                    st.image(chart)
                 else:
                     st.info("Không thể tạo biểu đồ phân bố ký tự")
                 
@@ -472,7 +562,7 @@ with tab4:
                 st.error("Vui lòng nhập văn bản cần kiểm tra")
             else:
                 # Phát hiện dấu hiệu steganography
-                detection_results = analyzer.detect_steganography(suspect_text)
+                detection_results = detect_steganography(suspect_text)
                 
                 # Hiển thị kết quả
                 st.subheader("Kết quả kiểm tra")
@@ -0,0 +1,93 @@
+"""So sánh tốc độ StegAnalyzer.detect_steganography trước/sau khi gộp thành một lượt quét.
+
+Chạy: python -m benchmarks.analyzer [--sizes 100K 1M 10M]
+"""
+import argparse
+import math
+import random
+
+from src.analyzer import StegAnalyzer, SUSPICIOUS_RANGES
+from benchmarks.unicode import make_cover
+from benchmarks.zero_width import format_size, parse_size, time_call
+
+
+class LegacyStegAnalyzer(StegAnalyzer):
+    """Cài đặt nhiều lượt quét (cũ), giữ lại chỉ để so sánh"""
+
+    def detect_steganography(self, text):
+        results = {}
+        zwsp_count = text.count('\u200B')
+        zwj_count = text.count('\u200D')
+        zwnj_count = text.count('\u200C')
+        results["has_zero_width"] = (zwsp_count + zwj_count + zwnj_count) > 0
+        results["zero_width_count"] = zwsp_count + zwj_count + zwnj_count
+
+        homoglyph_count = 0
+        for char in text:
+            code_point = ord(char)
+            for start, end in SUSPICIOUS_RANGES:
+                if start <= code_point <= end:
+                    homoglyph_count += 1
+                    break
+        results["suspicious_homoglyphs"] = homoglyph_count > 0
+        results["homoglyph_count"] = homoglyph_count
+
+        words = text.split()
+        if words:
+            short_words = sum(1 for word in words if len(word.strip('.,;:!?')) <= 3)
+            short_ratio = short_words / len(words)
+            results["unusual_word_distribution"] = abs(short_ratio - 0.55) > 0.2
+            results["short_word_ratio"] = short_ratio
+        else:
+            results["unusual_word_distribution"] = False
+            results["short_word_ratio"] = 0
+
+        entropy = self.calculate_entropy(text)
+        results["entropy"] = entropy
+        results["unusual_entropy"] = entropy > 4.5
+        results["steganography_detected"] = (
+            results["has_zero_width"] or
+            results["suspicious_homoglyphs"] or
+            results["unusual_word_distribution"] or
+            results["unusual_entropy"]
+        )
+        return results
+
+
+def make_suspect_text(size, rng):
+    """Văn bản tổng hợp có lẫn ký tự zero-width và homoglyph"""
+    text = make_cover(size, rng)
+    return text.replace('e', '\u0435', size // 500).replace(' ', ' \u200B', size // 1000)
+
+
+def same_results(a, b):
+    """So sánh hai kết quả, cho phép sai số làm tròn của entropy"""
+    return a.keys() == b.keys() and all(
+        math.isclose(a[key], b[key], abs_tol=1e-9) if key == "entropy" else a[key] == b[key]
+        for key in a
+    )
+
+
+def run(sizes, seed=0):
+    rng = random.Random(seed)
+    new = StegAnalyzer()
+    legacy = LegacyStegAnalyzer()
+
+    print(f"{'văn bản':>8} | {'cũ':>9} | {'mới':>9} | {'tăng tốc':>8}")
+    for size in sizes:
+        text = make_suspect_text(size, rng)
+        new_result, new_time = time_call(new.detect_steganography, text)
+        old_result, old_time = time_call(legacy.detect_steganography, text)
+        assert same_results(new_result, old_result)
+        print(f"{format_size(size):>8} | {old_time:9.4f} | {new_time:9.4f} | {old_time / new_time:7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark StegAnalyzer.detect_steganography trước/sau")
+    parser.add_argument('--sizes', nargs='+', default=['100K', '1M', '10M'])
+    args = parser.parse_args()
+    run([parse_size(s) for s in args.sizes])
+
+
+if __name__ == '__main__':
+    main()
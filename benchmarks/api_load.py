@@ -0,0 +1,165 @@
+"""Kiểm tra tải dịch vụ HTTP (src.api): độ trễ p50/p99 và thông lượng ở một mức đồng thời.
+
+Mặc định tự khởi động server cục bộ (cần uvicorn) trên một cổng trống; dùng --url để
+đo một server đang chạy. Mỗi client giữ một kết nối keep-alive và gửi request liên tiếp.
+
+Chạy: python -m benchmarks.api_load [--endpoint hide/zero-width] [--concurrency 16] [--requests 500]
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from benchmarks.unicode import make_cover
+from benchmarks.zero_width import format_size, parse_size
+
+ENDPOINTS = [
+    'hide/zero-width', 'hide/unicode', 'hide/morse',
+    'extract/zero-width', 'extract/unicode', 'extract/morse',
+    'detect',
+]
+
+
+def percentile(values, fraction):
+    """Phân vị theo phương pháp nearest-rank"""
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(fraction * len(ordered))) - 1))]
+
+
+def make_body(endpoint, cover_size, password, seed=0):
+    """Thân request JSON cho endpoint; request extract dùng văn bản đã được ẩn sẵn"""
+    from src.jobs import hide_job
+
+    rng = random.Random(seed)
+    cover = make_cover(cover_size, rng)
+    secret = "Thông điệp kiểm tra tải " * 4
+    action, _, method = endpoint.partition('/')
+    if action == 'hide':
+        body = {"cover": cover, "secret": secret, "password": password}
+    elif action == 'extract':
+        body = {"text": hide_job(method, cover, secret, password, seed), "password": password}
+    else:
+        body = {"text": hide_job('zero-width', cover, secret)}
+    return json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+
+async def _read_response(reader):
+    """Đọc một response HTTP/1.1 có Content-Length, trả về mã trạng thái"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server đóng kết nối")
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(host, port, path, body, count, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = (f"POST {path} HTTP/1.1\r\nHost: {host}\r\n"
+               f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode('latin-1') + body
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            statuses[await _read_response(reader)] += 1
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def load(url, endpoint, body, concurrency, total):
+    parts = urlsplit(url)
+    path = parts.path.rstrip('/') + '/' + endpoint
+    latencies = []
+    statuses = Counter()
+    per_client = [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(parts.hostname, parts.port or 80, path, body, count, latencies, statuses)
+        for count in per_client if count
+    ))
+    return latencies, statuses, time.perf_counter() - start
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers, timeout=30):
+    """Khởi động python -m src.api trên cổng trống, chờ đến khi nhận kết nối"""
+    port = _free_port()
+    command = [sys.executable, '-m', 'src.api', '--port', str(port)]
+    if workers:
+        command += ['--workers', str(workers)]
+    process = subprocess.Popen(command)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server không khởi động được")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Hết thời gian chờ server khởi động")
+
+
+def run(url, endpoint, concurrency, total, cover_size, password, workers):
+    body = make_body(endpoint, cover_size, password)
+    process = None
+    if url is None:
+        process, url = start_server(workers)
+    try:
+        # Làm nóng: khởi tạo tiến trình con, bảng tra và khóa đã dẫn xuất
+        asyncio.run(load(url, endpoint, body, concurrency, concurrency))
+        latencies, statuses, elapsed = asyncio.run(load(url, endpoint, body, concurrency, total))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(f"endpoint: /{endpoint}, cover: {format_size(cover_size)}, đồng thời: {concurrency}, "
+          f"request: {total}, mật khẩu: {'có' if password else 'không'}")
+    print(f"mã trạng thái: {dict(statuses)}")
+    print(f"thông lượng: {len(latencies) / elapsed:.1f} req/s")
+    print(f"độ trễ (ms): p50 {percentile(latencies, 0.50) * 1000:.1f} | "
+          f"p90 {percentile(latencies, 0.90) * 1000:.1f} | "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} | "
+          f"trung bình {statistics.mean(latencies) * 1000:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiểm tra tải dịch vụ HTTP steganography")
+    parser.add_argument('--url', default=None, help="Địa chỉ server (mặc định: tự khởi động server cục bộ)")
+    parser.add_argument('--endpoint', choices=ENDPOINTS, default='hide/zero-width')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--cover-size', default='10K')
+    parser.add_argument('--password', default=None)
+    parser.add_argument('--workers', type=int, default=None, help="Số tiến trình của server tự khởi động")
+    args = parser.parse_args()
+    run(args.url, args.endpoint, args.concurrency, args.requests, parse_size(args.cover_size),
+        args.password, args.workers)
+
+
+if __name__ == '__main__':
+    main()
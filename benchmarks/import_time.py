@@ -0,0 +1,89 @@
+"""Đo thời gian import (python -X importtime) và chặn việc nạp sớm thư viện nặng.
+
+Mỗi module được import trong một tiến trình mới; lấy trung vị thời gian cộng dồn
+của nhiều lần chạy. Thoát với mã 1 nếu một thư viện nặng bị nạp ngay khi import
+hoặc thời gian vượt --max-ms.
+
+Chạy: python -m benchmarks.import_time [--modules app src.analyzer] [--runs 5] [--max-ms 300]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULES = [
+    'src.zero_width_steg',
+    'src.unicode_steg',
+    'src.morse_steg',
+    'src.encryption',
+    'src.analyzer',
+    'app',
+]
+
+# Thư viện chỉ được nạp khi dùng lần đầu
+HEAVY_MODULES = ['numpy', 'pandas', 'matplotlib', 'cryptography', 'pyperclip']
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr):
+    """Đọc output của -X importtime: {tên module: thời gian cộng dồn (µs)}"""
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # Dòng tiêu đề
+        timings[fields[2].strip()] = int(fields[1])
+    return timings
+
+
+def measure(module):
+    """Import module trong tiến trình mới, trả về {tên module: thời gian cộng dồn (µs)}"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Không import được {module}:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def run(modules, runs, max_ms):
+    failures = []
+    print(f"{'module':>20} | {'trung vị (ms)':>13} | thư viện nặng đã nạp")
+    for module in modules:
+        samples = []
+        heavy = set()
+        for _ in range(runs):
+            timings = measure(module)
+            samples.append(timings.get(module, 0) / 1000)
+            heavy.update(name for name in HEAVY_MODULES if name in timings)
+        median = statistics.median(samples)
+        print(f"{module:>20} | {median:13.1f} | {', '.join(sorted(heavy)) or '-'}")
+
+        if heavy:
+            failures.append(f"{module} nạp sớm: {', '.join(sorted(heavy))}")
+        if max_ms is not None and median > max_ms:
+            failures.append(f"{module} import mất {median:.1f} ms (> {max_ms} ms)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark thời gian import, dùng làm ngưỡng chống hồi quy")
+    parser.add_argument('--modules', nargs='+', default=DEFAULT_MODULES)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help="Thời gian import tối đa cho mỗi module (ms)")
+    args = parser.parse_args()
+
+    failures = run(args.modules, args.runs, args.max_ms)
+    for failure in failures:
+        print(f"THẤT BẠI: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,410 @@
+"""Bộ benchmark cho mọi codec, Encryptor và StegAnalyzer, dùng làm ngưỡng chống hồi quy.
+
+Mỗi trường hợp được chạy trên lưới kích thước văn bản gốc (1K..100M) và payload
+(16B..1M): đo độ trễ (trung vị, p90, p99), thông lượng (MB/s theo kích thước đầu
+vào) và bộ nhớ đỉnh (tracemalloc, đo ở một lần chạy riêng). Dữ liệu tổng hợp sinh
+từ seed cố định nên chạy được hoàn toàn offline và lặp lại được.
+
+Cả bộ được chạy --runs lần xen kẽ nhau; mỗi trường hợp lấy lần chạy có trung vị độ
+trễ ở giữa và ghi lại độ phân tán giữa các lần chạy (độ lệch tuyệt đối trung vị so với
+trung vị, ít bị ảnh hưởng bởi một lần chạy bất thường).
+
+Kết quả ghi ra JSON (--output); với --baseline, so sánh với kết quả đã lưu và báo các
+trường hợp có trung vị độ trễ tăng quá max(--threshold, --spread-factor * độ phân tán)
+hoặc bộ nhớ đỉnh tăng quá ngưỡng; trường hợp vốn nhiễu vì thế có ngưỡng rộng hơn.
+Mặc định chỉ cảnh báo: benchmarks/baseline.json (preset quick, seed 0) được commit cùng
+mã nguồn nhưng phụ thuộc máy đo và tải của máy lúc đo. Với --strict (máy đo riêng,
+baseline tạo lại bằng --update-baseline trên chính máy đó) thì thoát với mã 1 khi có
+hồi quy. Thiếu file baseline hoặc không có benchmark nào trùng thì luôn thoát với mã 2
+thay vì coi như đạt.
+
+Chạy: python -m benchmarks.suite [--preset quick|full] [--cases 'zero-width.*'] [--runs 5]
+      [--baseline benchmarks/baseline.json] [--threshold 0.2] [--strict] [--update-baseline]
+"""
+import argparse
+import datetime
+import fnmatch
+import functools
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.api_load import percentile
+from benchmarks.unicode import make_cover
+from benchmarks.zero_width import format_size, parse_size
+from src.analyzer import StegAnalyzer
+from src.encryption import Encryptor, KeyCache
+from src.morse_steg import MorseSteg
+from src.unicode_steg import UnicodeSteg
+from src.zero_width_steg import ZeroWidthSteg
+
+PRESETS = {
+    'quick': (['1K', '64K', '1M'], ['16', '1K', '64K']),
+    'full': (['1K', '64K', '1M', '10M', '100M'], ['16', '1K', '64K', '1M']),
+}
+# Văn bản Morse dài gấp khoảng 100 lần payload nên giới hạn payload của morse
+MORSE_MAX_PAYLOAD = 64 * 1024
+# Văn bản gốc lớn được ghép từ các khối cùng kích thước này
+_COVER_BLOCK = 1024 * 1024
+# Bỏ qua chênh lệch nhỏ hơn các ngưỡng này khi so sánh (nhiễu đo)
+LATENCY_FLOOR = 100e-6
+MEMORY_FLOOR = 64 * 1024
+# Ngưỡng độ trễ của mỗi trường hợp không nhỏ hơn bội số này của độ phân tán đo được
+SPREAD_FACTOR = 3.0
+
+
+class Corpus:
+    """Văn bản gốc và payload tổng hợp theo seed, sinh một lần cho mỗi kích thước"""
+
+    def __init__(self, seed=0):
+        self.seed = seed
+        self._covers = {}
+        self._payloads = {}
+
+    def cover(self, size):
+        if size not in self._covers:
+            rng = random.Random(f'{self.seed}:cover')
+            block = make_cover(min(size, _COVER_BLOCK), rng)
+            self._covers[size] = (block * (size // len(block) + 1))[:size]
+        return self._covers[size]
+
+    def payload(self, size):
+        if size not in self._payloads:
+            rng = random.Random(f'{self.seed}:payload:{size}')
+            alphabet = 'abcdefghijklmnopqrstuvwxyz0123456789 ăâđêôơư'
+            self._payloads[size] = ''.join(rng.choices(alphabet, k=size))
+        return self._payloads[size]
+
+
+def _utf8_size(*texts):
+    return sum(len(text.encode('utf-8')) for text in texts)
+
+
+# --- Các trường hợp: setup(corpus, cover_size, payload_size) -> (hàm cần đo, số byte đầu vào) hoặc None ---
+
+def _zero_width_hide(corpus, cover_size, payload_size, bits_per_symbol=1, distribute=False):
+    steg = ZeroWidthSteg(bits_per_symbol, distribute, key='benchmark' if distribute else None)
+    cover, secret = corpus.cover(cover_size), corpus.payload(payload_size)
+    return lambda: steg.hide(cover, secret), _utf8_size(cover, secret)
+
+
+def _zero_width_extract(corpus, cover_size, payload_size, bits_per_symbol=1, distribute=False):
+    steg = ZeroWidthSteg(bits_per_symbol, distribute, key='benchmark' if distribute else None)
+    stego = steg.hide(corpus.cover(cover_size), corpus.payload(payload_size))
+    return lambda: steg.extract(stego), _utf8_size(stego)
+
+
+def _unicode_stego(steg, corpus, cover_size, payload_size):
+    try:
+        return steg.hide(corpus.cover(cover_size), corpus.payload(payload_size))
+    except ValueError:
+        return None  # Văn bản gốc không đủ chỗ
+
+
+def _unicode_hide(corpus, cover_size, payload_size):
+    steg = UnicodeSteg()
+    if _unicode_stego(steg, corpus, cover_size, payload_size) is None:
+        return None
+    cover, secret = corpus.cover(cover_size), corpus.payload(payload_size)
+    return lambda: steg.hide(cover, secret), _utf8_size(cover, secret)
+
+
+def _unicode_extract(corpus, cover_size, payload_size):
+    steg = UnicodeSteg()
+    stego = _unicode_stego(steg, corpus, cover_size, payload_size)
+    if stego is None:
+        return None
+    return lambda: steg.extract(stego), _utf8_size(stego)
+
+
+def _morse_steg():
+    steg = MorseSteg()
+    steg.load_word_lists()
+    return steg
+
+
+def _morse_hide(corpus, cover_size, payload_size):
+    if payload_size > MORSE_MAX_PAYLOAD:
+        return None
+    steg = _morse_steg()
+    secret = corpus.payload(payload_size)
+    return lambda: steg.hide(secret, seed=corpus.seed), _utf8_size(secret)
+
+
+def _morse_extract(corpus, cover_size, payload_size):
+    if payload_size > MORSE_MAX_PAYLOAD:
+        return None
+    steg = _morse_steg()
+    stego = steg.hide(corpus.payload(payload_size), seed=corpus.seed)
+    return lambda: steg.extract(stego), _utf8_size(stego)
+
+
+def _encryptor_generate_key(corpus, cover_size, payload_size):
+    # Không dùng bộ nhớ đệm khóa: đo đúng một lần PBKDF2
+    encryptor = Encryptor(key_cache=KeyCache(maxsize=0))
+    return lambda: encryptor.generate_key('benchmark-password'), 0
+
+
+def _encryptor_encrypt(corpus, cover_size, payload_size):
+    encryptor = Encryptor()
+    secret = corpus.payload(payload_size)
+    encryptor.generate_key('benchmark-password')
+    return lambda: encryptor.encrypt_bytes(secret, 'benchmark-password'), _utf8_size(secret)
+
+
+def _encryptor_decrypt(corpus, cover_size, payload_size):
+    encryptor = Encryptor()
+    blob = encryptor.encrypt_bytes(corpus.payload(payload_size), 'benchmark-password')
+    return lambda: encryptor.decrypt_bytes(blob, 'benchmark-password'), len(blob)
+
+
+def _analyzer_detect(corpus, cover_size, payload_size):
+    analyzer = StegAnalyzer()
+    stego = ZeroWidthSteg().hide(corpus.cover(cover_size), corpus.payload(16))
+    return lambda: analyzer.detect_steganography(stego), _utf8_size(stego)
+
+
+def _analyzer_entropy(corpus, cover_size, payload_size):
+    analyzer = StegAnalyzer()
+    cover = corpus.cover(cover_size)
+    return lambda: analyzer.calculate_entropy(cover), _utf8_size(cover)
+
+
+def _analyzer_changes(corpus, cover_size, payload_size):
+    analyzer = StegAnalyzer()
+    cover = corpus.cover(cover_size)
+    # Văn bản Unicode steganography: nhiều ký tự bị thay thế rải rác
+    stego = _unicode_stego(UnicodeSteg(), corpus, cover_size, min(payload_size, cover_size // 64))
+    if stego is None:
+        return None
+    return lambda: analyzer.analyze_text_changes(cover, stego), _utf8_size(cover, stego)
+
+
+# Tên trường hợp -> (trục kích thước: 'cover' | 'payload' | 'both' | None, setup)
+CASES = {
+    'zero-width.hide': ('both', _zero_width_hide),
+    'zero-width.extract': ('both', _zero_width_extract),
+    'zero-width-4bit.hide': ('both', functools.partial(_zero_width_hide, bits_per_symbol=4)),
+    'zero-width-4bit.extract': ('both', functools.partial(_zero_width_extract, bits_per_symbol=4)),
+    'zero-width-distributed.hide': ('both', functools.partial(_zero_width_hide, distribute=True)),
+    'zero-width-distributed.extract': ('both', functools.partial(_zero_width_extract, distribute=True)),
+    'unicode.hide': ('both', _unicode_hide),
+    'unicode.extract': ('both', _unicode_extract),
+    'morse.hide': ('payload', _morse_hide),
+    'morse.extract': ('payload', _morse_extract),
+    'encryptor.generate_key': (None, _encryptor_generate_key),
+    'encryptor.encrypt_bytes': ('payload', _encryptor_encrypt),
+    'encryptor.decrypt_bytes': ('payload', _encryptor_decrypt),
+    'analyzer.detect_steganography': ('cover', _analyzer_detect),
+    'analyzer.calculate_entropy': ('cover', _analyzer_entropy),
+    'analyzer.analyze_text_changes': ('cover', _analyzer_changes),
+}
+
+
+def iter_params(axes, cover_sizes, payload_sizes):
+    """Các cặp (kích thước văn bản gốc, kích thước payload) của một trường hợp"""
+    if axes == 'both':
+        return itertools.product(cover_sizes, payload_sizes)
+    if axes == 'cover':
+        return ((size, 1024) for size in cover_sizes)
+    if axes == 'payload':
+        return ((0, size) for size in payload_sizes)
+    return [(0, 0)]
+
+
+def benchmark_key(name, axes, cover_size, payload_size):
+    """Khóa kết quả, ví dụ zero-width.hide[cover=1M,payload=1K]"""
+    params = []
+    if axes in ('cover', 'both'):
+        params.append(f'cover={format_size(cover_size)}')
+    if axes in ('payload', 'both'):
+        params.append(f'payload={format_size(payload_size)}')
+    return f"{name}[{','.join(params)}]" if params else name
+
+
+def measure(func, input_bytes, min_repeats, max_repeats, min_time):
+    """Chạy func nhiều lần (sau một lần làm nóng), trả về dict thống kê"""
+    func()
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < max_repeats and (len(latencies) < min_repeats or time.perf_counter() - start < min_time):
+        t0 = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - t0)
+
+    # Bộ nhớ đỉnh đo riêng vì tracemalloc làm chậm chương trình
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(latencies)
+    return {
+        "repeats": len(latencies),
+        "input_bytes": input_bytes,
+        "median_s": median,
+        "p90_s": percentile(latencies, 0.90),
+        "p99_s": percentile(latencies, 0.99),
+        "mean_s": statistics.mean(latencies),
+        "throughput_mb_s": input_bytes / median / 1e6 if input_bytes and median else None,
+        "peak_bytes": peak,
+    }
+
+
+def combine(measurements):
+    """Gộp kết quả nhiều lần chạy: lấy lần có trung vị độ trễ ở giữa, thêm trung vị từng lần và độ phân tán"""
+    ordered = sorted(measurements, key=lambda m: m["median_s"])
+    result = dict(ordered[(len(ordered) - 1) // 2])
+    medians = [m["median_s"] for m in measurements]
+    median = result["median_s"]
+    result["run_medians_s"] = medians
+    result["spread"] = statistics.median(abs(m - median) for m in medians) / median if median else 0.0
+    return result
+
+
+def run(patterns, cover_sizes, payload_sizes, seed, min_repeats, max_repeats, min_time, runs=1, out=sys.stdout):
+    corpus = Corpus(seed)
+    measurements = {}
+    # Chạy cả bộ nhiều lần xen kẽ để nhiễu nhất thời của máy không dồn vào một trường hợp
+    for index in range(runs):
+        for name, (axes, setup) in CASES.items():
+            if not any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns):
+                continue
+            for cover_size, payload_size in iter_params(axes, cover_sizes, payload_sizes):
+                prepared = setup(corpus, cover_size, payload_size)
+                if prepared is None:
+                    continue  # Tổ hợp kích thước không áp dụng được
+                key = benchmark_key(name, axes, cover_size, payload_size)
+                measurements.setdefault(key, []).append(measure(*prepared, min_repeats, max_repeats, min_time))
+        print(f"Xong lần chạy {index + 1}/{runs}", file=out, flush=True)
+
+    results = {key: combine(values) for key, values in measurements.items()}
+    print(f"{'benchmark':>50} | {'trung vị (ms)':>13} {'p99 (ms)':>9} {'phân tán':>8} | {'MB/s':>8} | "
+          f"{'bộ nhớ đỉnh':>11}", file=out)
+    for key, result in results.items():
+        throughput = result["throughput_mb_s"]
+        print(f"{key:>50} | {result['median_s'] * 1000:13.3f} {result['p99_s'] * 1000:9.3f} "
+              f"{result['spread']:8.0%} | {throughput if throughput is not None else float('nan'):8.1f} | "
+              f"{format_size(result['peak_bytes']):>11}", file=out)
+    return results
+
+
+def compare(results, baseline, threshold, memory_threshold, spread_factor=SPREAD_FACTOR):
+    """So sánh với baseline, trả về danh sách hồi quy vượt ngưỡng.
+
+    Ngưỡng độ trễ của mỗi trường hợp là max(threshold, spread_factor * độ phân tán),
+    với độ phân tán lớn hơn giữa baseline và lần chạy này.
+    """
+    failures = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        ratio = result["median_s"] / base["median_s"] - 1
+        allowed = max(threshold, spread_factor * max(base.get("spread", 0.0), result.get("spread", 0.0)))
+        if ratio > allowed and result["median_s"] - base["median_s"] >= LATENCY_FLOOR:
+            failures.append(f"{key}: độ trễ trung vị tăng {ratio:+.0%}, ngưỡng {allowed:.0%} "
+                            f"({base['median_s'] * 1000:.3f} -> {result['median_s'] * 1000:.3f} ms)")
+        if max(result["peak_bytes"], base["peak_bytes"]) >= MEMORY_FLOOR:
+            memory_ratio = result["peak_bytes"] / max(base["peak_bytes"], 1) - 1
+            if memory_ratio > memory_threshold:
+                failures.append(f"{key}: bộ nhớ đỉnh tăng {memory_ratio:+.0%} "
+                                f"({format_size(base['peak_bytes'])} -> {format_size(result['peak_bytes'])})")
+    return failures
+
+
+def _environment(seed):
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bộ benchmark codec/Encryptor/StegAnalyzer, so sánh với baseline")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick', help="Lưới kích thước mặc định")
+    parser.add_argument('--cover-sizes', nargs='+', default=None, help="Ví dụ: 1K 1M 100M")
+    parser.add_argument('--payload-sizes', nargs='+', default=None, help="Ví dụ: 16 1K 1M")
+    parser.add_argument('--cases', nargs='+', default=['*'], help="Mẫu tên trường hợp (fnmatch)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-repeats', type=int, default=5)
+    parser.add_argument('--max-repeats', type=int, default=1000)
+    parser.add_argument('--min-time', type=float, default=0.2, help="Thời gian đo tối thiểu mỗi trường hợp (giây)")
+    parser.add_argument('--runs', type=int, default=5, help="Số lần chạy cả bộ; kết quả lấy trung vị giữa các lần")
+    parser.add_argument('-o', '--output', default=None, help="File JSON ghi kết quả")
+    parser.add_argument('--baseline', default=None, help="File JSON baseline để so sánh")
+    parser.add_argument('--update-baseline', action='store_true', help="Ghi kết quả làm baseline thay vì so sánh")
+    parser.add_argument('--strict', action='store_true',
+                        help="Thoát với mã 1 khi có hồi quy (mặc định chỉ cảnh báo)")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Mức tăng độ trễ trung vị tối đa cho phép (0.2 = 20%%)")
+    parser.add_argument('--spread-factor', type=float, default=SPREAD_FACTOR,
+                        help="Ngưỡng độ trễ tối thiểu theo bội số độ phân tán giữa các lần chạy")
+    parser.add_argument('--memory-threshold', type=float, default=0.25, help="Mức tăng bộ nhớ đỉnh tối đa cho phép")
+    parser.add_argument('--list', action='store_true', help="Liệt kê các trường hợp rồi thoát")
+    args = parser.parse_args()
+
+    if args.list:
+        print('\n'.join(CASES))
+        return
+    if args.runs < 1:
+        parser.error("--runs phải lớn hơn 0")
+    if args.update_baseline and not args.baseline:
+        parser.error("--update-baseline cần --baseline")
+    # Kiểm tra trước khi chạy để không mất thời gian đo rồi mới báo thiếu baseline
+    if args.baseline and not args.update_baseline and not os.path.isfile(args.baseline):
+        parser.error(f"không tìm thấy baseline {args.baseline} (tạo bằng --update-baseline)")
+
+    preset_covers, preset_payloads = PRESETS[args.preset]
+    cover_sizes = [parse_size(s) for s in args.cover_sizes or preset_covers]
+    payload_sizes = [parse_size(s) for s in args.payload_sizes or preset_payloads]
+    results = run(args.cases, cover_sizes, payload_sizes, args.seed,
+                  args.min_repeats, args.max_repeats, args.min_time, args.runs)
+    report = {"environment": _environment(args.seed), "results": results}
+    if args.output:
+        _write_json(args.output, report)
+
+    if args.update_baseline:
+        _write_json(args.baseline, report)
+        print(f"Đã ghi baseline: {args.baseline}")
+        return
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline["environment"].get("seed") != args.seed:
+            print("Cảnh báo: baseline dùng seed khác, kết quả có thể không so sánh được", file=sys.stderr)
+        compared = len(results.keys() & baseline["results"].keys())
+        if not compared:
+            # Không có benchmark chung (sai preset/cases) thì không được coi là đạt
+            print("Không có benchmark nào trùng với baseline, không thể so sánh", file=sys.stderr)
+            sys.exit(2)
+        failures = compare(results, baseline["results"], args.threshold, args.memory_threshold, args.spread_factor)
+        for failure in failures:
+            print(f"HỒI QUY: {failure}", file=sys.stderr)
+        print(f"So sánh {compared} benchmark với baseline: {len(failures)} hồi quy vượt ngưỡng")
+        sys.exit(1 if failures and args.strict else 0)
+
+
+if __name__ == '__main__':
+    main()
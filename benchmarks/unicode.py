@@ -0,0 +1,93 @@
+"""So sánh tốc độ UnicodeSteg trước/sau khi vector hóa bằng NumPy.
+
+Chạy: python -m benchmarks.unicode [--sizes 100K 1M 10M] [--legacy-max 10M]
+"""
+import argparse
+import random
+
+from src import payload
+from src.unicode_steg import UnicodeSteg
+from benchmarks.zero_width import format_size, parse_size, time_call
+
+
+class LegacyUnicodeSteg(UnicodeSteg):
+    """Vòng lặp từng ký tự (cài đặt cũ), giữ lại chỉ để so sánh"""
+
+    def _embed_bytes(self, cover_text, data):
+        binary_secret = payload.bytes_to_bits(data)
+        bit_index = 0
+        steganographic_text = ''
+        for char in cover_text:
+            if char in self.similar_chars and bit_index < len(binary_secret):
+                if binary_secret[bit_index] == '1':
+                    steganographic_text += self.similar_chars[char]
+                else:
+                    steganographic_text += char
+                bit_index += 1
+            else:
+                steganographic_text += char
+        if bit_index < len(binary_secret):
+            return "Văn bản gốc quá ngắn để ẩn toàn bộ thông điệp"
+        return steganographic_text
+
+    def extract_bytes(self, steganographic_text):
+        binary = ''
+        for char in steganographic_text:
+            if char in self.reverse_similar:
+                binary += '1'
+            elif char in self.similar_chars:
+                binary += '0'
+        return payload.bits_to_bytes(binary)
+
+
+def make_cover(size, rng):
+    """Tạo văn bản gốc tổng hợp có kích thước xấp xỉ size ký tự"""
+    words = ["steganography", "văn", "bản", "hidden", "message", "cover", "text",
+             "Unicode", "homoglyph", "example", "data", "secret", "ẩn", "tin"]
+    parts = []
+    length = 0
+    while length < size:
+        word = rng.choice(words)
+        parts.append(word)
+        length += len(word) + 1
+    return ' '.join(parts)[:size]
+
+
+def run(sizes, legacy_max, seed=0):
+    rng = random.Random(seed)
+    new = UnicodeSteg()
+    legacy = LegacyUnicodeSteg()
+
+    print(f"{'cover':>8} | {'cũ hide':>9} {'cũ extract':>10} | {'mới hide':>9} {'mới extract':>11} | {'tăng tốc':>8}")
+    for size in sizes:
+        cover = make_cover(size, rng)
+        # Payload dùng khoảng một nửa dung lượng của văn bản gốc
+        capacity = sum(1 for char in cover if char in new.similar_chars) // 8
+        secret = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz ') for _ in range(capacity // 2))
+
+        stego, new_hide = time_call(new.hide, cover, secret)
+        extracted, new_extract = time_call(new.extract, stego)
+        assert extracted == secret
+
+        if size <= legacy_max:
+            legacy_stego, old_hide = time_call(legacy.hide, cover, secret)
+            _, old_extract = time_call(legacy.extract, legacy_stego)
+            assert legacy_stego == stego
+            speedup = (old_hide + old_extract) / (new_hide + new_extract)
+            print(f"{format_size(size):>8} | {old_hide:9.4f} {old_extract:10.4f} | "
+                  f"{new_hide:9.4f} {new_extract:11.4f} | {speedup:7.1f}x")
+        else:
+            print(f"{format_size(size):>8} | {'-':>9} {'-':>10} | {new_hide:9.4f} {new_extract:11.4f} | {'-':>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark UnicodeSteg trước/sau")
+    parser.add_argument('--sizes', nargs='+', default=['100K', '1M', '10M'])
+    parser.add_argument('--legacy-max', default='10M',
+                        help="Kích thước văn bản gốc lớn nhất chạy cài đặt cũ (chậm)")
+    args = parser.parse_args()
+    run([parse_size(s) for s in args.sizes], parse_size(args.legacy_max))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""So sánh tốc độ ZeroWidthSteg trước/sau khi chuyển sang bảng tra theo byte.
+
+Chạy: python -m benchmarks.zero_width [--sizes 1K 10K 100K 1M 10M] [--legacy-max 10M]
+"""
+import argparse
+import random
+import time
+
+from src.zero_width_steg import ZeroWidthSteg
+
+
+class LegacyZeroWidthSteg:
+    """Cài đặt cũ (cộng chuỗi theo từng bit), giữ lại chỉ để so sánh"""
+
+    def __init__(self):
+        self.zwsp = '\u200B'
+        self.zwj = '\u200D'
+        self.zwnj = '\u200C'
+
+    def text_to_binary(self, text):
+        return ''.join(format(ord(char), '08b') for char in text)
+
+    def binary_to_text(self, binary):
+        text = ''
+        for i in range(0, len(binary), 8):
+            if i + 8 <= len(binary):
+                text += chr(int(binary[i:i+8], 2))
+        return text
+
+    def hide(self, cover_text, secret_message):
+        binary_secret = self.text_to_binary(secret_message)
+        steganographic_text = cover_text[0]
+        steganographic_text += self.zwnj
+        for bit in binary_secret:
+            if bit == '0':
+                steganographic_text += self.zwsp
+            else:
+                steganographic_text += self.zwj
+        steganographic_text += self.zwnj
+        steganographic_text += cover_text[1:]
+        return steganographic_text
+
+    def extract(self, steganographic_text):
+        parts = steganographic_text.split(self.zwnj)
+        if len(parts) < 3:
+            return "Không tìm thấy thông điệp bí mật"
+        binary = ''
+        for char in parts[1]:
+            if char == self.zwsp:
+                binary += '0'
+            elif char == self.zwj:
+                binary += '1'
+        return self.binary_to_text(binary)
+
+
+def parse_size(value):
+    """Đổi chuỗi như 1K, 10M thành số byte"""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    value = value.strip().upper()
+    if value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def format_size(size):
+    """Hiển thị số byte dạng ngắn gọn"""
+    for unit, factor in (('M', 1024 ** 2), ('K', 1024)):
+        if size >= factor:
+            return f"{size / factor:g}{unit}"
+    return f"{size}B"
+
+
+def time_call(func, *args):
+    """Đo thời gian một lần gọi hàm, trả về (kết quả, giây)"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def run(sizes, legacy_max, seed=0):
+    rng = random.Random(seed)
+    cover = "Đây là văn bản gốc dùng để ẩn thông điệp."
+    new = ZeroWidthSteg()
+    legacy = LegacyZeroWidthSteg()
+    new.extract(new.hide(cover, 'x'))  # Làm nóng: nạp numpy và bảng tra
+
+    print(f"{'payload':>8} | {'cũ hide':>9} {'cũ extract':>10} | {'mới hide':>9} {'mới extract':>11} | {'tăng tốc':>8}")
+    for size in sizes:
+        # Payload ASCII để kết quả cũ và mới giống hệt nhau
+        secret = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz0123456789 ') for _ in range(size))
+
+        stego, new_hide = time_call(new.hide, cover, secret)
+        extracted, new_extract = time_call(new.extract, stego)
+        assert extracted == secret
+
+        if size <= legacy_max:
+            legacy_stego, old_hide = time_call(legacy.hide, cover, secret)
+            legacy_extracted, old_extract = time_call(legacy.extract, legacy_stego)
+            # hide() mới đóng khung payload; so sánh với hide_bytes() không đóng khung
+            assert legacy_stego == new.hide_bytes(cover, secret.encode('utf-8'))
+            assert legacy_extracted == secret
+            speedup = (old_hide + old_extract) / (new_hide + new_extract)
+            print(f"{format_size(size):>8} | {old_hide:9.4f} {old_extract:10.4f} | "
+                  f"{new_hide:9.4f} {new_extract:11.4f} | {speedup:7.1f}x")
+        else:
+            print(f"{format_size(size):>8} | {'-':>9} {'-':>10} | {new_hide:9.4f} {new_extract:11.4f} | {'-':>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ZeroWidthSteg trước/sau")
+    parser.add_argument('--sizes', nargs='+', default=['1K', '10K', '100K', '1M', '10M'])
+    parser.add_argument('--legacy-max', default='10M',
+                        help="Kích thước payload lớn nhất chạy cài đặt cũ (chậm)")
+    args = parser.parse_args()
+    run([parse_size(s) for s in args.sizes], parse_size(args.legacy_max))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+"""python -m src: xử lý hàng loạt hide/extract theo manifest (xem src/batch.py)"""
+from src.batch import main
+
+main()
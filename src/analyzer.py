@@ -1,15 +1,191 @@
-import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
-import streamlit as st
-from collections import Counter
+import functools
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+from src import text_diff
+from src.instrumentation import span
+from src.lazy import lazy_import
+from src.zero_width_steg import HIDDEN_CHARS
+
+# numpy và matplotlib chỉ được nạp khi dùng lần đầu
+np = lazy_import('numpy')
+_mpl_figure = lazy_import('matplotlib.figure')
+
+# Cờ phân loại ký tự cho bộ quét một lượt
+_SPACE = 1        # Khoảng trắng theo str.split()
+_PUNCT = 2        # Dấu câu bị bỏ khi đo độ dài từ
+_ZERO_WIDTH = 4   # Ký tự ẩn của ZeroWidthSteg (mọi bảng chữ cái)
+_SUSPICIOUS = 8   # Greek/Cyrillic/General Punctuation
+
+# Các khoảng mã Unicode đáng ngờ (chứa homoglyphs và ký tự zero-width)
+SUSPICIOUS_RANGES = [
+    (0x0370, 0x03FF),  # Greek and Coptic
+    (0x0400, 0x04FF),  # Cyrillic
+    (0x2000, 0x206F)   # General Punctuation (contains zero-width chars)
+]
+
+
+@functools.lru_cache(maxsize=None)
+def _flag_table():
+    """Bảng cờ theo mã Unicode; mọi mã lớn hơn dùng phần tử cuối (không có cờ)"""
+    # Khoảng trắng Unicode lớn nhất là U+3000, variation selector lớn nhất là U+E01EF
+    size = max(0x3000, max(map(ord, HIDDEN_CHARS))) + 2
+    table = np.zeros(size, dtype=np.uint8)
+    for code_point in range(0x3001):
+        if chr(code_point).isspace():
+            table[code_point] |= _SPACE
+    for char in '.,;:!?':
+        table[ord(char)] |= _PUNCT
+    table[[ord(char) for char in HIDDEN_CHARS]] |= _ZERO_WIDTH
+    for start, end in SUSPICIOUS_RANGES:
+        table[start:end + 1] |= _SUSPICIOUS
+    return table
+
+
+
+def _code_point_flags(text):
+    """Mã Unicode của từng ký tự và cờ phân loại tương ứng"""
+    # surrogatepass: văn bản dán vào có thể chứa surrogate lẻ, vẫn được đếm như một ký tự
+    code_points = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+    flag_table = _flag_table()
+    return code_points, flag_table[np.minimum(code_points, len(flag_table) - 1)]
+
+
+def scan_text(text):
+    """Quét văn bản một lượt (vector hóa), trả về các thống kê thô cho việc phát hiện"""
+    code_points, flags = _code_point_flags(text)
+
+    # Từ là chuỗi ký tự liên tiếp không phải khoảng trắng (giống str.split())
+    is_word_char = (flags & _SPACE) == 0
+    edges = np.diff(is_word_char.astype(np.int8), prepend=np.int8(0), append=np.int8(0))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    # Độ dài từ sau khi bỏ dấu câu ở hai đầu = khoảng từ ký tự "lõi" đầu tiên đến cuối cùng
+    core = np.flatnonzero(is_word_char & ((flags & _PUNCT) == 0))
+    first = np.searchsorted(core, starts)
+    last = np.searchsorted(core, ends) - 1
+    has_core = first <= last
+    stripped = np.zeros(len(starts), dtype=np.int64)
+    stripped[has_core] = core[last[has_core]] - core[first[has_core]] + 1
+
+    return {
+        "total_chars": len(code_points),
+        "zero_width_count": int(np.count_nonzero(flags & _ZERO_WIDTH)),
+        "homoglyph_count": int(np.count_nonzero(flags & _SUSPICIOUS)),
+        "total_words": len(starts),
+        "short_words": int(np.count_nonzero(stripped <= 3)),
+        "char_counts": np.bincount(code_points) if len(code_points) else np.zeros(0, dtype=np.int64),
+    }
+
+
+def _add_counts(counts_a, counts_b):
+    """Cộng hai mảng tần suất theo mã Unicode có độ dài khác nhau"""
+    if len(counts_a) < len(counts_b):
+        counts_a, counts_b = counts_b, counts_a
+    counts = counts_a.copy()
+    counts[:len(counts_b)] += counts_b
+    return counts
+
+
+def merge_stats(a, b):
+    """Gộp thống kê của hai đoạn văn bản (các đoạn phải được cắt ở ranh giới từ)"""
+    merged = {key: a[key] + b[key] for key in a if key != "char_counts"}
+    merged["char_counts"] = _add_counts(a["char_counts"], b["char_counts"])
+    return merged
+
+
+def entropy_from_counts(counts, total):
+    """Tính entropy từ mảng tần suất ký tự"""
+    if not total:
+        return 0
+    counts = counts[counts > 0]
+    frequencies = counts / total
+    return -np.sum(frequencies * np.log2(frequencies))
+
+
+class CharHistogram:
+    """Bảng tần suất ký tự cộng dồn được: cập nhật theo từng đoạn, gộp, tính entropy và top_n"""
+
+    def __init__(self, text=''):
+        self._counts = np.zeros(0, dtype=np.int64)
+        self.total = 0
+        if text:
+            self.update(text)
+
+    @classmethod
+    def from_counts(cls, counts):
+        """Tạo từ mảng tần suất theo mã Unicode (ví dụ char_counts của scan_text)"""
+        histogram = cls()
+        histogram._counts = np.asarray(counts, dtype=np.int64)
+        histogram.total = int(histogram._counts.sum())
+        return histogram
+
+    def update(self, chunk):
+        """Đếm thêm một đoạn văn bản"""
+        if chunk:
+            code_points = np.frombuffer(chunk.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+            self._counts = _add_counts(self._counts, np.bincount(code_points))
+            self.total += len(code_points)
+        return self
+
+    def merge(self, other):
+        """Cộng dồn tần suất của một CharHistogram khác"""
+        self._counts = _add_counts(self._counts, other._counts)
+        self.total += other.total
+        return self
+
+    def __len__(self):
+        """Số ký tự khác nhau"""
+        return int(np.count_nonzero(self._counts))
+
+    def count(self, char):
+        """Số lần xuất hiện của một ký tự"""
+        code_point = ord(char)
+        return int(self._counts[code_point]) if code_point < len(self._counts) else 0
+
+    def entropy(self):
+        """Entropy (bit/ký tự) của phân bố hiện tại"""
+        return entropy_from_counts(self._counts, self.total)
+
+    def digest(self):
+        """Hash nội dung của bảng tần suất"""
+        code_points = np.flatnonzero(self._counts)
+        digest = hashlib.blake2b(code_points.astype('<i8').tobytes())
+        digest.update(self._counts[code_points].astype('<i8').tobytes())
+        return digest.digest()
+
+    def top_n(self, n):
+        """n ký tự phổ biến nhất dạng [(ký tự, số lần)], không cần quét lại văn bản"""
+        code_points = np.flatnonzero(self._counts)
+        order = np.argsort(-self._counts[code_points], kind='stable')[:n]
+        return [(chr(code_point), int(self._counts[code_point])) for code_point in code_points[order]]
+
+
+def _content_key(text):
+    """Khóa bộ nhớ đệm theo nội dung của văn bản hoặc CharHistogram"""
+    if isinstance(text, CharHistogram):
+        return ('histogram', text.digest())
+    return ('text', hashlib.blake2b(text.encode('utf-8', 'surrogatepass')).digest())
+
 
 class StegAnalyzer:
-    def __init__(self):
-        pass
+    def __init__(self, chart_cache_size=32):
+        # Bộ nhớ đệm LRU cho ảnh biểu đồ: (khóa nội dung, khóa nội dung, top_n) -> PNG
+        self.chart_cache_size = chart_cache_size
+        self._chart_cache = OrderedDict()
+        self._chart_lock = threading.Lock()
     
-    def analyze_text_changes(self, original_text, stego_text):
-        """Phân tích sự thay đổi giữa văn bản gốc và văn bản đã ẩn thông tin"""
+    @span('analyzer.analyze_text_changes')
+    def analyze_text_changes(self, original_text, stego_text, mode="diff"):
+        """Phân tích sự thay đổi giữa văn bản gốc và văn bản đã ẩn thông tin
+        
+        mode="diff": so khớp theo thuật toán Myers, liệt kê các đoạn chèn/xóa/thay thế
+            (approximate=True nếu vùng sửa đổi quá dày phải so khớp gần đúng).
+        mode="fast": so sánh từng vị trí (nhanh nhưng lệch hết sau ký tự được chèn đầu tiên).
+        """
         results = {}
         
         # Tính toán độ dài
@@ -17,9 +193,29 @@ class StegAnalyzer:
         results["stego_length"] = len(stego_text)
         results["length_difference"] = len(stego_text) - len(original_text)
         
-        # Tính số ký tự khác nhau
-        diff_chars = sum(1 for a, b in zip(original_text[:min(len(original_text), len(stego_text))], 
-                                          stego_text[:min(len(original_text), len(stego_text))]) if a != b)
+        if mode == "fast":
+            # Tính số ký tự khác nhau theo vị trí (zip dừng ở văn bản ngắn hơn, không cần cắt)
+            diff_chars = sum(1 for a, b in zip(original_text, stego_text) if a != b)
+        elif mode == "diff":
+            changes = text_diff.diff_runs(original_text, stego_text)
+            inserted = deleted = substituted = 0
+            for change in changes:
+                original_run = change["original_end"] - change["original_start"]
+                stego_run = change["modified_end"] - change["modified_start"]
+                if change["type"] == "insert":
+                    inserted += stego_run
+                elif change["type"] == "delete":
+                    deleted += original_run
+                else:
+                    substituted += max(original_run, stego_run)
+            results["changes"] = changes
+            results["approximate"] = changes.approximate
+            results["inserted_chars"] = inserted
+            results["deleted_chars"] = deleted
+            results["substituted_chars"] = substituted
+            diff_chars = inserted + deleted + substituted
+        else:
+            raise ValueError(f"Chế độ so sánh không hợp lệ: {mode}")
         results["different_chars"] = diff_chars
         
         # Tính tỷ lệ thay đổi
@@ -30,6 +226,7 @@ class StegAnalyzer:
         
         return results
     
+    @span('analyzer.analyze_zero_width')
     def analyze_zero_width(self, stego_text):
         """Phân tích các ký tự zero-width trong văn bản"""
         results = {}
@@ -42,7 +239,10 @@ class StegAnalyzer:
         results["zwsp_count"] = zwsp_count
         results["zwj_count"] = zwj_count
         results["zwnj_count"] = zwnj_count
-        results["total_zero_width"] = zwsp_count + zwj_count + zwnj_count
+        # Tổng gồm cả ký tự của các bảng chữ cái 2/4/8 bit (word joiner, variation selector, ...)
+        _, flags = _code_point_flags(stego_text)
+        results["total_zero_width"] = int(np.count_nonzero(flags & _ZERO_WIDTH))
+        results["other_zero_width_count"] = results["total_zero_width"] - zwsp_count - zwj_count - zwnj_count
         
         # Tính tỷ lệ ký tự zero-width
         if len(stego_text) > 0:
@@ -52,6 +252,7 @@ class StegAnalyzer:
         
         return results
     
+    @span('analyzer.analyze_unicode')
     def analyze_unicode(self, stego_text, similar_chars_dict):
         """Phân tích các ký tự Unicode đặc biệt trong văn bản"""
         results = {}
@@ -70,6 +271,7 @@ class StegAnalyzer:
         
         return results
     
+    @span('analyzer.analyze_morse')
     def analyze_morse(self, stego_text):
         """Phân tích văn bản chứa mã Morse ẩn"""
         results = {}
@@ -106,113 +308,111 @@ class StegAnalyzer:
         
         return results
     
+    @span('analyzer.calculate_entropy')
     def calculate_entropy(self, text):
-        """Tính entropy của văn bản (độ đo tính ngẫu nhiên)"""
-        if not text:
-            return 0
-        
-        # Đếm tần suất xuất hiện của mỗi ký tự
-        counter = Counter(text)
-        frequencies = np.array(list(counter.values())) / len(text)
-        
-        # Tính entropy
-        entropy = -np.sum(frequencies * np.log2(frequencies))
-        return entropy
+        """Tính entropy của văn bản hoặc CharHistogram (độ đo tính ngẫu nhiên)"""
+        if not isinstance(text, CharHistogram):
+            if not text:
+                return 0
+            text = CharHistogram(text)
+        return text.entropy()
     
+    def _char_distribution_data(self, original_text, stego_text, top_n):
+        """Nhãn và số lượng (mảng) của các ký tự phổ biến nhất trong cả hai văn bản"""
+        # Đếm tần suất xuất hiện của các ký tự (mỗi văn bản chỉ đếm một lần)
+        original_counter = original_text if isinstance(original_text, CharHistogram) else CharHistogram(original_text)
+        stego_counter = stego_text if isinstance(stego_text, CharHistogram) else CharHistogram(stego_text)
+        
+        # Lấy top_n ký tự phổ biến nhất từ cả hai văn bản, sắp theo số lượng trong văn bản gốc
+        top_chars = {char for char, _ in original_counter.top_n(top_n)}
+        top_chars.update(char for char, _ in stego_counter.top_n(top_n))
+        chars = sorted(top_chars, key=lambda char: (-original_counter.count(char), ord(char)))
+        
+        labels = [char if char.isprintable() else f'U+{ord(char):04X}' for char in chars]
+        original_counts = np.array([original_counter.count(char) for char in chars], dtype=np.int64)
+        stego_counts = np.array([stego_counter.count(char) for char in chars], dtype=np.int64)
+        return labels, original_counts, stego_counts
+    
+    @span('analyzer.plot_char_distribution')
     def plot_char_distribution(self, original_text, stego_text, top_n=10):
-        """Tạo biểu đồ phân bố ký tự cho văn bản gốc và văn bản đã ẩn"""
+        """Tạo biểu đồ phân bố ký tự cho văn bản gốc và văn bản đã ẩn (văn bản hoặc CharHistogram)"""
         if not original_text or not stego_text:
             return None
         
-        # Đếm tần suất xuất hiện của các ký tự
-        original_counter = Counter(original_text)
-        stego_counter = Counter(stego_text)
-        
-        # Lấy top_n ký tự phổ biến nhất từ cả hai văn bản
-        top_chars = set()
-        for char, _ in original_counter.most_common(top_n):
-            top_chars.add(char)
-        for char, _ in stego_counter.most_common(top_n):
-            top_chars.add(char)
-        
-        # Tạo DataFrame cho biểu đồ
-        data = []
-        for char in top_chars:
-            data.append({
-                'Ký tự': char if char.isprintable() else f'U+{ord(char):04X}',
-                'Số lượng': original_counter.get(char, 0),
-                'Loại': 'Văn bản gốc'
-            })
-            data.append({
-                'Ký tự': char if char.isprintable() else f'U+{ord(char):04X}',
-                'Số lượng': stego_counter.get(char, 0),
-                'Loại': 'Văn bản đã ẩn'
-            })
-        
-        df = pd.DataFrame(data)
-        
-        # Tạo biểu đồ
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        # Nhóm theo loại và vẽ biểu đồ
-        original_df = df[df['Loại'] == 'Văn bản gốc'].sort_values('Số lượng', ascending=False)
-        stego_df = df[df['Loại'] == 'Văn bản đã ẩn'].sort_values('Số lượng', ascending=False)
-        
-        x = np.arange(len(top_chars))
+        labels, original_counts, stego_counts = self._char_distribution_data(original_text, stego_text, top_n)
+        
+        # Figure không đăng ký với pyplot nên được giải phóng khi không còn tham chiếu
+        fig = _mpl_figure.Figure(figsize=(10, 6))
+        ax = fig.subplots()
+        
+        x = np.arange(len(labels))
         width = 0.35
         
-        ax.bar(x - width/2, original_df['Số lượng'], width, label='Văn bản gốc')
-        ax.bar(x + width/2, stego_df['Số lượng'], width, label='Văn bản đã ẩn')
+        ax.bar(x - width/2, original_counts, width, label='Văn bản gốc')
+        ax.bar(x + width/2, stego_counts, width, label='Văn bản đã ẩn')
         
         ax.set_xlabel('Ký tự')
         ax.set_ylabel('Số lượng')
         ax.set_title('So sánh phân bố ký tự')
         ax.set_xticks(x)
-        ax.set_xticklabels(original_df['Ký tự'])
+        ax.set_xticklabels(labels)
         ax.legend()
         
-        plt.tight_layout()
+        fig.tight_layout()
         return fig
     
+    @span('analyzer.render_char_distribution')
+    def render_char_distribution(self, original_text, stego_text, top_n=10):
+        """Biểu đồ phân bố ký tự dạng ảnh PNG (bytes), lưu đệm LRU theo nội dung hai văn bản và top_n"""
+        if not original_text or not stego_text:
+            return None
+        
+        cache_key = (_content_key(original_text), _content_key(stego_text), top_n)
+        with self._chart_lock:
+            png = self._chart_cache.get(cache_key)
+            if png is not None:
+                self._chart_cache.move_to_end(cache_key)
+                return png
+        
+        fig = self.plot_char_distribution(original_text, stego_text, top_n)
+        buffer = io.BytesIO()
+        try:
+            fig.savefig(buffer, format='png')
+        finally:
+            # Giải phóng figure ngay, chỉ giữ lại ảnh PNG
+            fig.clear()
+        png = buffer.getvalue()
+        
+        with self._chart_lock:
+            self._chart_cache[cache_key] = png
+            self._chart_cache.move_to_end(cache_key)
+            while len(self._chart_cache) > self.chart_cache_size:
+                self._chart_cache.popitem(last=False)
+        return png
+    
+    @span('analyzer.detect_steganography')
     def detect_steganography(self, text):
         """Phát hiện dấu hiệu của steganography trong văn bản"""
+        # Thu thập mọi thống kê trong một lượt quét
+        return self.detect_from_stats(scan_text(text))
+
+    @span('analyzer.detect_from_stats')
+    def detect_from_stats(self, stats):
+        """Kết luận từ thống kê của scan_text (có thể đã gộp từ nhiều đoạn bằng merge_stats)"""
         results = {}
         
         # Kiểm tra Zero-width characters
-        zwsp_count = text.count('\u200B')  # Zero-width space
-        zwj_count = text.count('\u200D')   # Zero-width joiner
-        zwnj_count = text.count('\u200C')  # Zero-width non-joiner
-        
-        results["has_zero_width"] = (zwsp_count + zwj_count + zwnj_count) > 0
-        results["zero_width_count"] = zwsp_count + zwj_count + zwnj_count
+        results["has_zero_width"] = stats["zero_width_count"] > 0
+        results["zero_width_count"] = stats["zero_width_count"]
         
-        # Kiểm tra Unicode homoglyphs (cần danh sách homoglyphs)
+        # Kiểm tra Unicode homoglyphs trong các khoảng SUSPICIOUS_RANGES
         # Đây chỉ là kiểm tra cơ bản, cần cung cấp danh sách đầy đủ để kiểm tra chính xác
-        suspicious_ranges = [
-            (0x0370, 0x03FF),  # Greek and Coptic
-            (0x0400, 0x04FF),  # Cyrillic
-            (0x2000, 0x206F)   # General Punctuation (contains zero-width chars)
-        ]
-        
-        homoglyph_count = 0
-        for char in text:
-            code_point = ord(char)
-            for start, end in suspicious_ranges:
-                if start <= code_point <= end:
-                    homoglyph_count += 1
-                    break
-        
-        results["suspicious_homoglyphs"] = homoglyph_count > 0
-        results["homoglyph_count"] = homoglyph_count
+        results["suspicious_homoglyphs"] = stats["homoglyph_count"] > 0
+        results["homoglyph_count"] = stats["homoglyph_count"]
         
         # Kiểm tra phân bố từ ngắn/dài bất thường (cho Morse)
-        words = text.split()
-        if words:
-            short_words = sum(1 for word in words if len(word.strip('.,;:!?')) <= 3)
-            long_words = sum(1 for word in words if len(word.strip('.,;:!?')) > 3)
-            
-            short_ratio = short_words / len(words) if len(words) > 0 else 0
-            long_ratio = long_words / len(words) if len(words) > 0 else 0
+        if stats["total_words"]:
+            short_ratio = stats["short_words"] / stats["total_words"]
             
             # Phân bố từ ngắn/dài bất thường (thường khoảng 0.5-0.6 cho văn bản tiếng Anh thông thường)
             results["unusual_word_distribution"] = abs(short_ratio - 0.55) > 0.2
@@ -222,7 +422,7 @@ class StegAnalyzer:
             results["short_word_ratio"] = 0
         
         # Tính entropy
-        entropy = self.calculate_entropy(text)
+        entropy = entropy_from_counts(stats["char_counts"], stats["total_chars"])
         results["entropy"] = entropy
         
         # Entropy cao bất thường có thể là dấu hiệu của steganography
@@ -236,4 +436,4 @@ class StegAnalyzer:
             results["unusual_entropy"]
         )
         
-        return results
\ No newline at end of file
+        return results
@@ -0,0 +1,237 @@
+"""Dịch vụ HTTP (ASGI) cho hide/extract/detect, dùng độc lập với giao diện Streamlit.
+
+Endpoint (POST):
+    /hide/{method}      method: zero-width | unicode | morse
+    /extract/{method}
+    /detect
+
+Thân request JSON (Content-Type: application/json):
+    hide:    {"cover": ..., "secret": ..., "password": tùy chọn, "seed": tùy chọn (morse)}
+    extract: {"text": ..., "password": tùy chọn}
+    detect:  {"text": ...}
+Kết quả: {"result": ...} hoặc {"error": ...}.
+
+Thân request được gom đủ trong bộ nhớ trước khi xử lý vì công việc chạy ở tiến
+trình con; giới hạn max_body_size được kiểm tra trong lúc nhận nên request quá
+lớn bị từ chối trước khi đọc hết.
+
+Công việc nặng CPU (ẩn, trích xuất, phân tích, PBKDF2) chạy trong process pool có
+giới hạn. Mỗi request giữ một chỗ trong hàng đợi từ lúc đọc thân request đến khi
+xử lý xong; hết chỗ quá queue_timeout giây thì trả 503 kèm Retry-After.
+
+Chạy: python -m src.api [--host 127.0.0.1] [--port 8000] [--workers 4]
+hoặc: uvicorn src.api:app
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from src import instrumentation
+from src.jobs import METHODS, detect_job, extract_job, hide_job
+
+DEFAULT_MAX_BODY_SIZE = 16 * 1024 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=()):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = list(headers)
+
+
+class _Disconnected(Exception):
+    """Client ngắt kết nối trước khi gửi xong request"""
+
+
+class StegService:
+    """Ứng dụng ASGI; process pool được tạo khi khởi động (hoặc ở request đầu tiên)"""
+
+    def __init__(self, workers=None, max_body_size=DEFAULT_MAX_BODY_SIZE, max_pending=None, queue_timeout=5.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_body_size = max_body_size
+        # Số request được đọc thân và xử lý cùng lúc (giới hạn cả bộ nhớ: max_pending * max_body_size)
+        self.max_pending = max_pending or self.workers * 4
+        self.queue_timeout = queue_timeout
+        self._executor = None
+        self._slots = None
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=instrumentation.init_worker)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            try:
+                await self._handle(scope, receive, send)
+            except HTTPError as e:
+                await _send_json(send, e.status, {"error": e.message}, e.headers)
+            except _Disconnected:
+                pass
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._pool()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _handle(self, scope, receive, send):
+        route = scope['path'].strip('/').split('/')
+        if route == ['detect']:
+            action, method = 'detect', None
+        elif len(route) == 2 and route[0] in ('hide', 'extract') and route[1] in METHODS:
+            action, method = route
+        else:
+            raise HTTPError(404, "Không có endpoint này")
+        if scope['method'] != 'POST':
+            raise HTTPError(405, "Chỉ hỗ trợ POST", [(b'allow', b'POST')])
+
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        content_length = headers.get('content-length', '')
+        if content_length.isdigit() and int(content_length) > self.max_body_size:
+            raise HTTPError(413, f"Request vượt quá {self.max_body_size} byte")
+
+        async with self._slot():
+            params = _parse_json(await self._read_body(receive))
+
+            if action == 'hide':
+                job = functools.partial(hide_job, method, _field(params, 'cover'), _field(params, 'secret'),
+                                        _field(params, 'password') or None, _seed(params.get('seed')))
+            elif action == 'extract':
+                job = functools.partial(extract_job, method, _field(params, 'text'), _field(params, 'password') or None)
+            else:
+                job = functools.partial(detect_job, _field(params, 'text'))
+            result = await self._run(job)
+
+        await _send_json(send, 200, {"result": result})
+
+    def _slot(self):
+        """Chỗ trong hàng đợi xử lý; hết chỗ quá queue_timeout thì trả 503"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        return _Slot(self._slots, self.queue_timeout)
+
+    async def _read_body(self, receive):
+        """Gom toàn bộ thân request vào bộ nhớ, dừng ngay khi vượt giới hạn kích thước"""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise _Disconnected()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_size:
+                raise HTTPError(413, f"Request vượt quá {self.max_body_size} byte")
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    async def _run(self, job):
+        """Chạy công việc trong process pool, đổi lỗi nghiệp vụ thành mã HTTP"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._pool(), job)
+        except LookupError as e:
+            raise HTTPError(404, str(e))
+        except ValueError as e:
+            raise HTTPError(422, str(e))
+
+
+class _Slot:
+    def __init__(self, semaphore, timeout):
+        self._semaphore = semaphore
+        self._timeout = timeout
+
+    async def __aenter__(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self._timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(503, "Server đang quá tải, vui lòng thử lại", [(b'retry-after', b'1')])
+
+    async def __aexit__(self, *exc_info):
+        self._semaphore.release()
+
+
+def _parse_json(body):
+    try:
+        params = json.loads(body.decode('utf-8'))
+    except UnicodeDecodeError:
+        raise HTTPError(400, "Thân request không phải UTF-8 hợp lệ")
+    except json.JSONDecodeError:
+        raise HTTPError(400, "JSON không hợp lệ")
+    if not isinstance(params, dict):
+        raise HTTPError(400, "Thân request phải là một object JSON")
+    return params
+
+
+def _field(params, name):
+    value = params.get(name) or ''
+    if not isinstance(value, str):
+        raise HTTPError(400, f"Trường {name} phải là chuỗi")
+    return value
+
+
+def _seed(value):
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, "seed phải là số nguyên")
+
+
+async def _send_json(send, status, obj, headers=()):
+    body = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json; charset=utf-8'),
+                    (b'content-length', str(len(body)).encode('ascii'))] + list(headers),
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+app = StegService()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dịch vụ HTTP cho hide/extract/detect")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None, help="Số tiến trình xử lý (mặc định: số CPU)")
+    parser.add_argument('--max-body-size', type=int, default=DEFAULT_MAX_BODY_SIZE, help="Kích thước request tối đa (byte)")
+    parser.add_argument('--max-pending', type=int, default=None, help="Số request xử lý đồng thời tối đa")
+    parser.add_argument('--queue-timeout', type=float, default=5.0,
+                        help="Thời gian chờ chỗ trong hàng đợi trước khi trả 503 (giây)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    instrumentation.configure_from_args(args)
+
+    try:
+        import uvicorn
+    except ImportError:
+        parser.error("Cần cài uvicorn để chạy server: pip install uvicorn")
+
+    service = StegService(args.workers, args.max_body_size, args.max_pending, args.queue_timeout)
+    uvicorn.run(service, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
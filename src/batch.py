@@ -0,0 +1,268 @@
+"""Xử lý hàng loạt hide/extract theo manifest bằng nhiều tiến trình.
+
+Manifest là file CSV (có dòng tiêu đề) hoặc JSONL với các cột:
+    cover     đường dẫn văn bản gốc (hide) hoặc văn bản đã ẩn (extract); morse khi hide không cần
+    payload   thông điệp cần ẩn (chỉ dùng khi hide)
+    method    zero-width | unicode | morse
+    password  tùy chọn
+    seed      tùy chọn (morse)
+    output    tùy chọn, mặc định <thư mục kết quả>/<tên file cover> (hoặc <số dòng>.txt);
+              không được trùng với file cover
+
+Dòng manifest không hợp lệ (JSON hỏng, thiếu cột, giá trị không phải chuỗi) được
+báo lỗi riêng, không làm dừng cả lần chạy. Các dòng được gom thành từng lô gửi cho process pool, số lô đang chờ có giới hạn
+nên manifest được đọc dần. Mỗi kết quả được ghi vào file tạm rồi đổi tên (atomic),
+nên file kết quả đã tồn tại luôn hoàn chỉnh: chạy lại sau khi bị dừng giữa chừng sẽ
+bỏ qua các dòng đã xong. Dòng lỗi được ghi ra dạng JSONL (--errors) và được thử lại
+ở lần chạy sau.
+
+Chạy: python -m src hide manifest.csv -o out/ [-w 8] [--chunk-size 32]
+      python -m src extract manifest.jsonl -o messages/
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from src import instrumentation
+from src.jobs import METHODS, extract_job, hide_job
+
+# Số dòng manifest trong mỗi lô gửi cho tiến trình con
+DEFAULT_CHUNK_SIZE = 32
+# Khoảng thời gian (giây) giữa hai lần in tiến độ
+PROGRESS_INTERVAL = 5.0
+
+
+def iter_manifest(path, fmt=None):
+    """Đọc manifest CSV/JSONL, trả về lần lượt (số dòng, dict các cột hoặc ValueError nếu dòng JSON hỏng)"""
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    with open(path, encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, {key.strip(): value for key, value in row.items() if key}
+        else:
+            for line, text in enumerate(f, 1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except json.JSONDecodeError as e:
+                    row = ValueError(f"JSON không hợp lệ: {e}")
+                yield line, row
+
+
+def write_atomic(path, data, fsync=False):
+    """Ghi bytes vào file tạm cùng thư mục rồi đổi tên, không để lại file ghi dở"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(temp_path)
+        raise
+
+
+def _read_text(path):
+    # newline='' để giữ nguyên ký tự xuống dòng của văn bản gốc
+    with open(path, encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+def _process_entry(action, entry, fsync):
+    line, cover, secret, method, password, seed, output = entry
+    if action == 'hide':
+        text = _read_text(cover) if cover else ''
+        size = len(text.encode('utf-8')) if cover else len(secret.encode('utf-8'))
+        result = hide_job(method, text, secret, password, seed)
+    else:
+        text = _read_text(cover)
+        size = len(text.encode('utf-8'))
+        result = extract_job(method, text, password)
+    write_atomic(output, result.encode('utf-8'), fsync)
+    return size
+
+
+def process_chunk(action, entries, fsync=False):
+    """Xử lý một lô dòng manifest trong tiến trình con, trả về [(số dòng, số byte đầu vào, lỗi)]"""
+    results = []
+    for entry in entries:
+        try:
+            results.append((entry[0], _process_entry(action, entry, fsync), None))
+        except Exception as e:
+            # Một văn bản lỗi không làm dừng cả lô
+            results.append((entry[0], 0, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def _field(row, name):
+    """Giá trị chuỗi của một cột ('' nếu không có); ValueError nếu không phải chuỗi"""
+    value = row.get(name)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValueError(f"Cột {name} phải là chuỗi")
+    return value
+
+
+def _same_file(a, b):
+    """Hai đường dẫn có trỏ tới cùng một file không (kể cả qua symlink/hard link)"""
+    if os.path.realpath(a) == os.path.realpath(b):
+        return True
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def _prepare_entry(action, line, row, output_dir):
+    """Chuẩn hóa một dòng manifest thành tuple gửi cho tiến trình con; ValueError nếu dòng không hợp lệ"""
+    if isinstance(row, ValueError):
+        raise row
+    if not isinstance(row, dict):
+        raise ValueError("Mỗi dòng manifest phải là một object JSON")
+    method = _field(row, 'method').strip()
+    if method not in METHODS:
+        raise ValueError(f"method phải là một trong {', '.join(METHODS)}")
+    cover = _field(row, 'cover')
+    if not cover and (action == 'extract' or method != 'morse'):
+        raise ValueError("Thiếu cột cover")
+    secret = _field(row, 'payload')
+    if action == 'hide' and not secret:
+        raise ValueError("Thiếu cột payload")
+    seed = row.get('seed')
+    if seed in (None, ''):
+        seed = None
+    else:
+        try:
+            seed = int(seed)
+        except (TypeError, ValueError):
+            raise ValueError("seed phải là số nguyên")
+    output = _field(row, 'output') or os.path.join(output_dir, os.path.basename(cover) if cover else f'{line}.txt')
+    if cover and _same_file(output, cover):
+        # Nếu không, file cover bị coi là kết quả đã có (bỏ qua) hoặc bị ghi đè
+        raise ValueError(f"File kết quả trùng với file cover: {output}")
+    return line, cover, secret, method, _field(row, 'password') or None, seed, output
+
+
+class BatchStats:
+    """Số văn bản đã xử lý/bỏ qua/lỗi và thông lượng"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.bytes = 0
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def summary(self):
+        elapsed = max(self.elapsed(), 1e-9)
+        return (f"xong {self.done}, bỏ qua {self.skipped} (đã có kết quả), lỗi {self.failed} | "
+                f"{self.done / elapsed:.1f} văn bản/s, {self.bytes / elapsed / 1e6:.2f} MB/s, "
+                f"{elapsed:.1f} s")
+
+
+def run_batch(action, manifest, output_dir, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+              fmt=None, errors=None, fsync=False, progress=sys.stderr):
+    """Chạy cả manifest, trả về BatchStats; lỗi từng dòng được ghi JSONL vào errors"""
+    errors = errors or sys.stderr
+    workers = workers or os.cpu_count() or 1
+    # Giới hạn số lô đang chờ để manifest lớn không bị nạp hết vào hàng đợi
+    max_pending = workers * 4
+    stats = BatchStats()
+    outputs = {}
+    last_report = time.monotonic()
+
+    def report_error(line, message):
+        stats.failed += 1
+        errors.write(json.dumps({"line": line, "error": message}, ensure_ascii=False) + '\n')
+
+    def collect(done):
+        nonlocal last_report
+        for future in done:
+            for line, size, error in future.result():
+                if error is None:
+                    stats.done += 1
+                    stats.bytes += size
+                else:
+                    report_error(line, error)
+        errors.flush()
+        if progress is not None and time.monotonic() - last_report >= PROGRESS_INTERVAL:
+            last_report = time.monotonic()
+            print(stats.summary(), file=progress, flush=True)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=instrumentation.init_worker) as executor:
+        pending = set()
+        chunk = []
+        for line, row in iter_manifest(manifest, fmt):
+            try:
+                entry = _prepare_entry(action, line, row, output_dir)
+            except ValueError as e:
+                report_error(line, str(e))
+                continue
+            output = entry[-1]
+            if output in outputs:
+                report_error(line, f"Trùng file kết quả với dòng {outputs[output]}: {output}")
+                continue
+            outputs[output] = line
+            if os.path.exists(output):
+                stats.skipped += 1
+                continue
+
+            chunk.append(entry)
+            if len(chunk) >= chunk_size:
+                pending.add(executor.submit(process_chunk, action, chunk, fsync))
+                chunk = []
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+        if chunk:
+            pending.add(executor.submit(process_chunk, action, chunk, fsync))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m src', description="Xử lý hàng loạt hide/extract theo manifest")
+    parser.add_argument('action', choices=['hide', 'extract'])
+    parser.add_argument('manifest', help="File manifest CSV hoặc JSONL")
+    parser.add_argument('-o', '--output-dir', required=True, help="Thư mục kết quả khi manifest không có cột output")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Số tiến trình (mặc định: số CPU)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Số dòng manifest mỗi lô")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                        help="Định dạng manifest (mặc định: theo phần mở rộng)")
+    parser.add_argument('--errors', default=None, help="File JSONL ghi các dòng lỗi (mặc định: stderr)")
+    parser.add_argument('--fsync', action='store_true', help="fsync từng file kết quả trước khi đổi tên")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    instrumentation.configure_from_args(args)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size phải lớn hơn 0")
+
+    with contextlib.ExitStack() as stack:
+        errors = stack.enter_context(open(args.errors, 'a', encoding='utf-8')) if args.errors else None
+        stats = run_batch(args.action, args.manifest, args.output_dir, args.workers, args.chunk_size,
+                          args.format, errors, args.fsync)
+    print(stats.summary())
+    sys.exit(1 if stats.failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Quét cả kho tài liệu để phát hiện steganography.
+
+Mỗi file được đọc theo từng đoạn, thống kê của các đoạn được gộp lại
+(bộ đếm cộng dồn, entropy tính từ histogram đã gộp, từ nằm vắt qua hai đoạn
+được giữ lại để ghép với đoạn sau). Các file được phân phối cho nhiều tiến
+trình, mỗi file cho ra một dòng JSON trong báo cáo ngay khi quét xong.
+
+File được ánh xạ bộ nhớ (mmap) và giải mã từng đoạn nên quét được cả file lớn
+hơn RAM; --markers-only chỉ đếm ký tự zero-width/homoglyph trên bytes UTF-8.
+
+Chạy: python -m src.corpus_scan <thư mục hoặc glob> [-o report.jsonl] [-w số tiến trình] [--markers-only]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from src import mapped_file
+from src.analyzer import StegAnalyzer, merge_stats, scan_text
+
+# Số ký tự (hoặc byte với file ánh xạ bộ nhớ) đọc mỗi lần
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+# Từ dang dở ngắn hơn mức này luôn được giữ nguyên để ghép với đoạn sau (kể cả khi đoạn rất nhỏ)
+MIN_PENDING = 4096
+
+
+def iter_corpus_files(target):
+    """Liệt kê các file trong thư mục (đệ quy) hoặc khớp với mẫu glob"""
+    if os.path.isdir(target):
+        for root, dirs, files in os.walk(target):
+            dirs.sort()
+            for name in sorted(files):
+                yield os.path.join(root, name)
+    else:
+        for path in sorted(glob.glob(target, recursive=True)):
+            if os.path.isfile(path):
+                yield path
+
+
+def _split_at_word_boundary(pending, chunk):
+    """Tách pending + chunk tại khoảng trắng cuối cùng: (phần hoàn chỉnh, từ còn dang dở)"""
+    # Chỉ dò trong đoạn mới để một từ rất dài không bị dò lại nhiều lần
+    cut = len(chunk)
+    while cut and not chunk[cut - 1].isspace():
+        cut -= 1
+    if not cut:
+        return '', pending + chunk
+    return pending + chunk[:cut], chunk[cut:]
+
+
+def scan_stream(stream, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Quét luồng văn bản theo từng đoạn, trả về thống kê đã gộp"""
+    return scan_chunks(iter(lambda: stream.read(chunk_size), ''), chunk_size)
+
+
+def scan_chunks(chunks, max_pending=DEFAULT_CHUNK_SIZE):
+    """Quét lần lượt các đoạn văn bản, trả về thống kê đã gộp.
+
+    Từ dang dở dài quá max_pending (và MIN_PENDING) - văn bản không có khoảng trắng -
+    được quét luôn thay vì tiếp tục nối dài: bộ nhớ và thời gian giữ ở mức tuyến tính,
+    đổi lại một từ như vậy được đếm thành nhiều từ dài.
+    """
+    max_pending = max(max_pending, MIN_PENDING)
+    stats = scan_text('')
+    pending = ''
+    for chunk in chunks:
+        complete, pending = _split_at_word_boundary(pending, chunk)
+        if len(pending) > max_pending:
+            complete, pending = complete + pending, ''
+        if complete:
+            stats = merge_stats(stats, scan_text(complete))
+    if pending:
+        stats = merge_stats(stats, scan_text(pending))
+    return stats
+
+
+def _to_json_value(value):
+    """Đổi kiểu số của NumPy sang kiểu Python để ghi JSON"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def scan_file(path, chunk_size=DEFAULT_CHUNK_SIZE, markers_only=False):
+    """Quét một file qua mmap (không giải mã cả file cùng lúc), trả về bản ghi báo cáo.
+
+    Với markers_only, chỉ đếm ký tự zero-width và homoglyph trực tiếp trên bytes UTF-8.
+    """
+    record = {"path": path}
+    try:
+        with mapped_file.open_mapped(path) as buffer:
+            record["bytes"] = len(buffer)
+            if markers_only:
+                markers = mapped_file.count_markers(buffer)
+            else:
+                stats = scan_chunks(mapped_file.iter_text(buffer, chunk_size), chunk_size)
+    except OSError as e:
+        record["error"] = str(e)
+        return record
+
+    if markers_only:
+        record["has_zero_width"] = markers["zero_width_count"] > 0
+        record["zero_width_count"] = markers["zero_width_count"]
+        record["suspicious_homoglyphs"] = markers["homoglyph_count"] > 0
+        record["homoglyph_count"] = markers["homoglyph_count"]
+        return record
+
+    record["chars"] = stats["total_chars"]
+    results = StegAnalyzer().detect_from_stats(stats)
+    record.update({key: _to_json_value(value) for key, value in results.items()})
+    return record
+
+
+def scan_corpus(target, output, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, markers_only=False):
+    """Quét kho tài liệu bằng nhiều tiến trình, ghi từng dòng JSONL ngay khi có kết quả"""
+    workers = workers or os.cpu_count() or 1
+    # Giới hạn số file đang chờ để không nạp toàn bộ danh sách vào hàng đợi
+    max_pending = workers * 4
+    count = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for path in iter_corpus_files(target):
+            pending.add(executor.submit(scan_file, path, chunk_size, markers_only))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                count += _write_records(done, output)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            count += _write_records(done, output)
+    return count
+
+
+def _write_records(futures, output):
+    """Ghi kết quả của các file đã quét xong"""
+    for future in futures:
+        output.write(json.dumps(future.result(), ensure_ascii=False) + '\n')
+    output.flush()
+    return len(futures)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quét kho tài liệu để phát hiện steganography")
+    parser.add_argument('target', help="Thư mục hoặc mẫu glob (ví dụ 'docs/**/*.txt')")
+    parser.add_argument('-o', '--output', help="File báo cáo JSONL (mặc định: stdout)")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Số tiến trình (mặc định: số CPU)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Số byte giải mã mỗi lần")
+    parser.add_argument('--markers-only', action='store_true',
+                        help="Chỉ đếm ký tự zero-width/homoglyph trên bytes, không giải mã văn bản")
+    args = parser.parse_args(argv)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            count = scan_corpus(args.target, output, args.workers, args.chunk_size, args.markers_only)
+    else:
+        count = scan_corpus(args.target, sys.stdout, args.workers, args.chunk_size, args.markers_only)
+    print(f"Đã quét {count} file", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
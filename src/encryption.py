@@ -1,45 +1,259 @@
 import hashlib
+import hmac
+import os
+import threading
+import time
 import base64
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from collections import OrderedDict
+
+from src.instrumentation import increment, span
+from src.lazy import lazy_import
+
+# cryptography chỉ được nạp khi mã hóa/giải mã lần đầu
+_fernet = lazy_import('cryptography.fernet')
+_hashes = lazy_import('cryptography.hazmat.primitives.hashes')
+_aead = lazy_import('cryptography.hazmat.primitives.ciphers.aead')
+_hkdf = lazy_import('cryptography.hazmat.primitives.kdf.hkdf')
+_pbkdf2 = lazy_import('cryptography.hazmat.primitives.kdf.pbkdf2')
+
+# Định dạng theo lô: version | salt lô | salt thông điệp | nonce | bản mã AES-GCM
+BATCH_FORMAT_VERSION = 0x02
+SALT_SIZE = 16
+NONCE_SIZE = 12
+HEADER_SIZE = 1 + SALT_SIZE + SALT_SIZE + NONCE_SIZE
+
+# Định dạng nhị phân gọn: version | salt thông điệp | nonce | độ dài bản mã (4 byte) | bản mã AES-GCM
+COMPACT_FORMAT_VERSION = 0x03
+COMPACT_HEADER_SIZE = 1 + SALT_SIZE + NONCE_SIZE + 4
+
+class KeyCache:
+    """Bộ nhớ đệm khóa dẫn xuất (LRU + TTL), an toàn khi dùng đa luồng"""
+
+    def __init__(self, maxsize=128, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Khóa bí mật ngẫu nhiên theo tiến trình, mật khẩu chỉ được lưu dưới dạng HMAC
+        self._secret = os.urandom(32)
+
+    def _make_key(self, password, salt, iterations):
+        """Tạo khóa tra cứu từ digest của mật khẩu, salt và số vòng lặp"""
+        digest = hmac.new(self._secret, password.encode('utf-8'), hashlib.sha256).digest()
+        return (digest, bytes(salt), iterations)
+
+    def get_or_derive(self, password, salt, iterations, derive):
+        """Lấy khóa trong bộ nhớ đệm hoặc gọi derive() rồi lưu lại"""
+        if self.maxsize <= 0:
+            return derive()
+
+        cache_key = self._make_key(password, salt, iterations)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and (self.ttl is None or now - entry[1] < self.ttl):
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                increment('encryptor.key_cache_hits')
+                return entry[0]
+            if entry is not None:
+                # Khóa đã hết hạn
+                del self._entries[cache_key]
+            self.misses += 1
+        increment('encryptor.key_cache_misses')
+
+        # Dẫn xuất khóa ngoài lock để không chặn các luồng khác
+        key = derive()
+
+        with self._lock:
+            self._entries[cache_key] = (key, now)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return key
+
+    def clear(self):
+        """Xóa toàn bộ khóa và đặt lại bộ đếm"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Trả về số lần trúng/trượt và số khóa đang lưu"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
 
 class Encryptor:
-    def __init__(self):
+    def __init__(self, key_cache=None):
         self.salt = b'steganography_salt'  # Salt cố định cho PBKDF2
-    
+        self.iterations = 100000
+        self.key_cache = key_cache if key_cache is not None else KeyCache()
+
+    @span('encryptor.pbkdf2')
+    def _derive_key(self, password, salt, iterations):
+        """Chạy PBKDF2HMAC-SHA256 để dẫn xuất khóa thô 32 byte"""
+        kdf = _pbkdf2.PBKDF2HMAC(
+            algorithm=_hashes.SHA256(),
+            length=32,
+            salt=salt,
+            iterations=iterations,
+        )
+        return kdf.derive(password.encode('utf-8'))
+
+    def _master_key(self, password, salt):
+        """Lấy khóa chính (thô) cho một salt, dùng bộ nhớ đệm khóa"""
+        return self.key_cache.get_or_derive(
+            password, salt, self.iterations,
+            lambda: self._derive_key(password, salt, self.iterations)
+        )
+
+    @span('encryptor.generate_key')
     def generate_key(self, password):
         """Tạo khóa mã hóa từ mật khẩu"""
-        password_bytes = password.encode('utf-8')
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
+        return base64.urlsafe_b64encode(self._master_key(password, self.salt))
+
+    def _subkey(self, master_key, message_salt):
+        """Dẫn xuất khóa riêng cho từng thông điệp bằng HKDF (rẻ hơn nhiều so với PBKDF2)"""
+        hkdf = _hkdf.HKDF(
+            algorithm=_hashes.SHA256(),
             length=32,
-            salt=self.salt,
-            iterations=100000,
+            salt=message_salt,
+            info=b'steganography-batch-v2',
         )
-        key = base64.urlsafe_b64encode(kdf.derive(password_bytes))
-        return key
-    
+        return hkdf.derive(master_key)
+
+    def _seal(self, master_key, batch_salt, plaintext):
+        """Mã hóa một thông điệp, trả về header + bản mã dạng bytes"""
+        message_salt = os.urandom(SALT_SIZE)
+        nonce = os.urandom(NONCE_SIZE)
+        header = bytes([BATCH_FORMAT_VERSION]) + batch_salt + message_salt + nonce
+        ciphertext = _aead.AESGCM(self._subkey(master_key, message_salt)).encrypt(nonce, plaintext, header)
+        return header + ciphertext
+
+    def _batch_key(self, password, batch_salt, batch_keys):
+        """Khóa chính của một lô; chỉ lưu trong batch_keys (theo lần gọi), không đưa vào bộ nhớ đệm
+        dùng chung để salt ngẫu nhiên của từng lô không đẩy khóa dùng lâu dài ra khỏi cache"""
+        master_key = batch_keys.get(batch_salt)
+        if master_key is None:
+            master_key = batch_keys[batch_salt] = self._derive_key(password, batch_salt, self.iterations)
+        return master_key
+
+    def _open(self, blob, password, batch_keys):
+        """Giải mã một thông điệp định dạng theo lô, header được xác thực cùng bản mã"""
+        if len(blob) < HEADER_SIZE or blob[0] != BATCH_FORMAT_VERSION:
+            raise ValueError("Định dạng thông điệp không được hỗ trợ")
+
+        batch_salt = bytes(blob[1:1 + SALT_SIZE])
+        message_salt = blob[1 + SALT_SIZE:1 + 2 * SALT_SIZE]
+        nonce = blob[1 + 2 * SALT_SIZE:HEADER_SIZE]
+        master_key = self._batch_key(password, batch_salt, batch_keys)
+        return _aead.AESGCM(self._subkey(master_key, message_salt)).decrypt(
+            nonce, blob[HEADER_SIZE:], blob[:HEADER_SIZE]
+        )
+
+    @span('encryptor.encrypt_many')
+    def encrypt_many(self, messages, password):
+        """Mã hóa nhiều thông điệp với một lần PBKDF2 cho cả lô"""
+        if not password:
+            return ["" for _ in messages]
+
+        batch_salt = os.urandom(SALT_SIZE)
+        master_key = self._batch_key(password, batch_salt, {})
+
+        results = []
+        for message in messages:
+            if not message:
+                results.append("")
+                continue
+            blob = self._seal(master_key, batch_salt, message.encode('utf-8'))
+            results.append(base64.urlsafe_b64encode(blob).decode('utf-8'))
+        return results
+
+    @span('encryptor.decrypt_many')
+    def decrypt_many(self, encrypted_messages, password):
+        """Giải mã nhiều thông điệp (định dạng theo lô hoặc định dạng cũ), mỗi lô chỉ chạy PBKDF2 một lần"""
+        batch_keys = {}
+        return [self._decrypt(message, password, batch_keys) for message in encrypted_messages]
+
+    @span('encryptor.encrypt_bytes')
+    def encrypt_bytes(self, message, password):
+        """Mã hóa thông điệp thành bytes thô (không base64) để nhúng trực tiếp vào văn bản"""
+        if not message or not password:
+            return b""
+
+        # Khóa chính dùng salt cố định nên được lấy từ bộ nhớ đệm, mỗi thông điệp có salt và nonce riêng
+        master_key = self._master_key(password, self.salt)
+        message_salt = os.urandom(SALT_SIZE)
+        nonce = os.urandom(NONCE_SIZE)
+        plaintext = message.encode('utf-8')
+        # Bản mã AES-GCM dài hơn bản rõ 16 byte (tag xác thực)
+        length = (len(plaintext) + 16).to_bytes(4, 'big')
+        header = bytes([COMPACT_FORMAT_VERSION]) + message_salt + nonce + length
+        ciphertext = _aead.AESGCM(self._subkey(master_key, message_salt)).encrypt(nonce, plaintext, header)
+        return header + ciphertext
+
+    @span('encryptor.decrypt_bytes')
+    def decrypt_bytes(self, blob, password):
+        """Giải mã bytes lấy ra từ văn bản (định dạng gọn hoặc chuỗi do encrypt tạo ra)"""
+        if not blob or not password:
+            return ""
+
+        try:
+            if blob[0] == COMPACT_FORMAT_VERSION:
+                message_salt = blob[1:1 + SALT_SIZE]
+                nonce = blob[1 + SALT_SIZE:1 + SALT_SIZE + NONCE_SIZE]
+                length = int.from_bytes(blob[COMPACT_HEADER_SIZE - 4:COMPACT_HEADER_SIZE], 'big')
+                # Bỏ qua dữ liệu thừa phía sau (ví dụ các bit 0 do UnicodeSteg trích xuất thêm)
+                ciphertext = blob[COMPACT_HEADER_SIZE:COMPACT_HEADER_SIZE + length]
+                master_key = self._master_key(password, self.salt)
+                decrypted_message = _aead.AESGCM(self._subkey(master_key, message_salt)).decrypt(
+                    nonce, ciphertext, blob[:COMPACT_HEADER_SIZE]
+                )
+                return decrypted_message.decode('utf-8')
+        except Exception as e:
+            raise ValueError("Mật khẩu không đúng hoặc thông điệp bị hỏng")
+
+        # Chuỗi base64 do encrypt/encrypt_many tạo ra
+        return self.decrypt(bytes(blob).rstrip(b'\x00').decode('latin-1'), password)
+
+    @span('encryptor.encrypt')
     def encrypt(self, message, password):
         """Mã hóa thông điệp với mật khẩu"""
         if not message or not password:
             return ""
-        
+
         key = self.generate_key(password)
-        f = Fernet(key)
+        f = _fernet.Fernet(key)
         encrypted_message = f.encrypt(message.encode('utf-8'))
         return base64.urlsafe_b64encode(encrypted_message).decode('utf-8')
-    
+
+    @span('encryptor.decrypt')
     def decrypt(self, encrypted_message, password):
         """Giải mã thông điệp với mật khẩu"""
+        return self._decrypt(encrypted_message, password, {})
+
+    def _decrypt(self, encrypted_message, password, batch_keys):
         if not encrypted_message or not password:
             return ""
-        
+
         try:
-            key = self.generate_key(password)
-            f = Fernet(key)
             decoded = base64.urlsafe_b64decode(encrypted_message.encode('utf-8'))
-            decrypted_message = f.decrypt(decoded)
+            if decoded[:1] == bytes([BATCH_FORMAT_VERSION]):
+                # Định dạng theo lô (có byte phiên bản)
+                decrypted_message = self._open(decoded, password, batch_keys)
+            else:
+                # Định dạng cũ: token Fernet được mã hóa base64 thêm một lần
+                key = self.generate_key(password)
+                f = _fernet.Fernet(key)
+                decrypted_message = f.decrypt(decoded)
             return decrypted_message.decode('utf-8')
         except Exception as e:
             raise ValueError("Mật khẩu không đúng hoặc thông điệp bị hỏng")
\ No newline at end of file
@@ -0,0 +1,336 @@
+"""Đo thời gian (span), bộ đếm và profile theo mẫu cho các đường xử lý chính.
+
+Mặc định tắt: hàm đánh dấu bằng span() được giữ nguyên nên không tốn thêm chi phí;
+bản có đo thời gian chỉ được gắn vào khi bật (enable(), configure() hoặc
+STEG_METRICS=1). Khi bật, mỗi lần gọi được ghi vào registry trong tiến trình (số
+lần gọi, số lỗi, histogram thời gian); registry có thể xuất dạng văn bản Prometheus ra file (STEG_METRICS_FILE, '{pid}'
+trong đường dẫn được thay bằng mã tiến trình).
+
+profiled() chạy cProfile cho một tỷ lệ request (STEG_PROFILE_RATE) và ghi file
+pstats vào STEG_PROFILE_DIR; độc lập với việc bật span.
+
+Cấu hình được ghi cả vào biến môi trường để tiến trình con của process pool dùng lại.
+"""
+import atexit
+import bisect
+import functools
+import itertools
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# Ngưỡng (giây) của histogram thời gian
+SPAN_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+# Khoảng thời gian tối thiểu (giây) giữa hai lần ghi file Prometheus
+DEFAULT_EXPORT_INTERVAL = 1.0
+
+_enabled = False
+_metrics_file = None
+_export_interval = DEFAULT_EXPORT_INTERVAL
+_last_export = 0.0
+_export_lock = threading.Lock()
+_profile_dir = None
+_profile_rate = 0.0
+_profile_ids = itertools.count()
+# Các hàm đã đăng ký bằng span(): (hàm gốc, bản có đo thời gian)
+_sites = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+class MetricsRegistry:
+    """Registry trong tiến trình cho span và bộ đếm, an toàn khi dùng đa luồng"""
+
+    def __init__(self, buckets=SPAN_BUCKETS):
+        self.buckets = tuple(buckets)
+        # Tên span -> [số lần gọi, số lỗi, tổng thời gian, số lần theo từng ngưỡng (không cộng dồn)]
+        self._spans = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, error=False):
+        """Ghi một lần gọi kéo dài seconds giây"""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            span = self._spans.get(name)
+            if span is None:
+                span = self._spans[name] = [0, 0, 0.0, [0] * (len(self.buckets) + 1)]
+            span[0] += 1
+            span[1] += error
+            span[2] += seconds
+            span[3][index] += 1
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        """Bản sao dạng dict: {"spans": {tên: {...}}, "counters": {tên: giá trị}}"""
+        with self._lock:
+            spans = {
+                name: {
+                    "count": count,
+                    "errors": errors,
+                    "seconds": seconds,
+                    # Số lần gọi có thời gian <= ngưỡng (cộng dồn, giống Prometheus)
+                    "buckets": dict(zip(self.buckets + (float('inf'),), itertools.accumulate(buckets))),
+                }
+                for name, (count, errors, seconds, buckets) in self._spans.items()
+            }
+            return {"spans": spans, "counters": dict(self._counters)}
+
+    def to_prometheus(self, labels=None):
+        """Xuất registry dạng văn bản Prometheus (exposition format 0.0.4)"""
+        snapshot = self.snapshot()
+        extra = dict(labels or {})
+        lines = [
+            '# HELP steg_span_seconds Thời gian thực thi theo span.',
+            '# TYPE steg_span_seconds histogram',
+        ]
+        for name, span in sorted(snapshot["spans"].items()):
+            series = _format_labels({**extra, "span": name})
+            for bound, count in span["buckets"].items():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'steg_span_seconds_bucket{{{series},le="{le}"}} {count}')
+            lines.append(f'steg_span_seconds_sum{{{series}}} {span["seconds"]!r}')
+            lines.append(f'steg_span_seconds_count{{{series}}} {span["count"]}')
+        lines += [
+            '# HELP steg_span_errors_total Số lần gọi kết thúc bằng ngoại lệ theo span.',
+            '# TYPE steg_span_errors_total counter',
+        ]
+        for name, span in sorted(snapshot["spans"].items()):
+            lines.append(f'steg_span_errors_total{{{_format_labels({**extra, "span": name})}}} {span["errors"]}')
+        lines += [
+            '# HELP steg_events_total Bộ đếm sự kiện.',
+            '# TYPE steg_events_total counter',
+        ]
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'steg_events_total{{{_format_labels({**extra, "name": name})}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, labels=None):
+        """Ghi file Prometheus (ghi file tạm rồi đổi tên, dùng được với textfile collector)"""
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self.to_prometheus(labels))
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+
+registry = MetricsRegistry()
+
+
+def metrics_path():
+    """Đường dẫn file Prometheus của tiến trình hiện tại, hoặc None"""
+    if _metrics_file is None:
+        return None
+    return _metrics_file.replace('{pid}', str(os.getpid()))
+
+
+def export():
+    """Ghi registry ra file Prometheus đã cấu hình (nếu có)"""
+    path = metrics_path()
+    if path is not None:
+        registry.write_prometheus(path, {"pid": os.getpid()})
+
+
+def _maybe_export():
+    global _last_export
+    now = time.monotonic()
+    if now - _last_export < _export_interval or not _export_lock.acquire(blocking=False):
+        return
+    try:
+        _last_export = now
+        export()
+    except OSError:
+        pass  # Không để lỗi ghi file metrics làm hỏng request
+    finally:
+        _export_lock.release()
+
+
+def _record(name, seconds, error):
+    registry.observe(name, seconds, error)
+    if _metrics_file is not None:
+        # Ghi định kỳ để file luôn gần với số liệu hiện tại của tiến trình chạy lâu
+        _maybe_export()
+
+
+def _timed(func, name):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            _record(name, time.perf_counter() - start, True)
+            raise
+        _record(name, time.perf_counter() - start, False)
+        return result
+    return wrapper
+
+
+def span(name):
+    """Decorator đo thời gian và đếm số lần gọi/lỗi của hàm khi instrumentation được bật.
+
+    Khi tắt, hàm gốc được giữ nguyên (không có lớp bọc); enable() thay hàm trong
+    module/lớp chứa nó bằng bản có đo thời gian và disable trả lại hàm gốc.
+    """
+    def decorate(func):
+        wrapper = _timed(func, name)
+        _sites.append((func, wrapper))
+        return wrapper if _enabled else func
+    return decorate
+
+
+def _install(enabled):
+    """Đặt bản có đo thời gian (hoặc hàm gốc) vào nơi định nghĩa của mỗi span"""
+    for func, wrapper in _sites:
+        path = func.__qualname__.split('.')
+        if '<locals>' in path:
+            continue
+        owner = sys.modules.get(func.__module__)
+        for part in path[:-1]:
+            owner = getattr(owner, part, None)
+        current = getattr(owner, '__dict__', {}).get(path[-1])
+        # Không ghi đè nếu thuộc tính đã bị thay bằng thứ khác
+        if current is func or current is wrapper:
+            setattr(owner, path[-1], wrapper if enabled else func)
+
+
+def increment(name, value=1):
+    """Tăng bộ đếm sự kiện (không làm gì khi instrumentation tắt)"""
+    if _enabled:
+        registry.increment(name, value)
+
+
+def _dump_profile(profiler, name):
+    path = os.path.join(_profile_dir, f"{name}-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(_profile_ids)}.pstats")
+    try:
+        os.makedirs(_profile_dir, exist_ok=True)
+        profiler.dump_stats(path)
+    except OSError:
+        return
+    increment('profiles_written')
+
+
+def profiled(name):
+    """Decorator chạy cProfile cho một tỷ lệ lần gọi, ghi file pstats vào thư mục profile"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profile_dir is None or random.random() >= _profile_rate:
+                return func(*args, **kwargs)
+            import cProfile
+
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(func, *args, **kwargs)
+            finally:
+                _dump_profile(profiler, name)
+        return wrapper
+    return decorate
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable(enabled=True):
+    configure(enabled=enabled)
+
+
+def configure(enabled=None, metrics_file=None, profile_dir=None, profile_rate=None,
+              export_interval=None):
+    """Thay đổi cấu hình (tham số None giữ nguyên) và ghi vào biến môi trường cho tiến trình con"""
+    global _enabled, _metrics_file, _profile_dir, _profile_rate, _export_interval
+    if enabled is not None:
+        _enabled = bool(enabled)
+        os.environ['STEG_METRICS'] = '1' if _enabled else '0'
+        _install(_enabled)
+    if metrics_file is not None:
+        _metrics_file = metrics_file
+        os.environ['STEG_METRICS_FILE'] = metrics_file
+    if profile_dir is not None:
+        _profile_dir = profile_dir
+        os.environ['STEG_PROFILE_DIR'] = profile_dir
+    if profile_rate is not None:
+        _profile_rate = float(profile_rate)
+        os.environ['STEG_PROFILE_RATE'] = str(_profile_rate)
+    if export_interval is not None:
+        _export_interval = float(export_interval)
+
+
+def add_arguments(parser):
+    """Thêm các tùy chọn --metrics/--metrics-file/--profile-dir/--profile-rate vào argparse"""
+    group = parser.add_argument_group("instrumentation")
+    group.add_argument('--metrics', action='store_true', help="Bật đo thời gian và bộ đếm")
+    group.add_argument('--metrics-file', default=None,
+                       help="File Prometheus, '{pid}' được thay bằng mã tiến trình (ví dụ metrics/steg-{pid}.prom)")
+    group.add_argument('--profile-dir', default=None, help="Thư mục ghi file pstats cho các request được lấy mẫu")
+    group.add_argument('--profile-rate', type=float, default=None,
+                       help="Tỷ lệ request được profile (mặc định 1 khi có --profile-dir)")
+
+
+def configure_from_args(args):
+    """Áp dụng các tùy chọn do add_arguments thêm vào"""
+    configure(
+        enabled=True if args.metrics or args.metrics_file else None,
+        metrics_file=args.metrics_file,
+        profile_dir=args.profile_dir,
+        profile_rate=args.profile_rate if args.profile_rate is not None else (1.0 if args.profile_dir else None),
+    )
+
+
+def _configure_from_env():
+    global _enabled, _metrics_file, _profile_dir, _profile_rate
+    _enabled = os.environ.get('STEG_METRICS', '') not in ('', '0')
+    _metrics_file = os.environ.get('STEG_METRICS_FILE') or None
+    _profile_dir = os.environ.get('STEG_PROFILE_DIR') or None
+    try:
+        _profile_rate = float(os.environ.get('STEG_PROFILE_RATE', '1' if _profile_dir else '0'))
+    except ValueError:
+        _profile_rate = 0.0
+
+
+def _export_at_exit():
+    if not _enabled:
+        return
+    try:
+        export()
+    except OSError:
+        pass
+
+
+def init_worker():
+    """initializer cho process pool: ghi file Prometheus khi tiến trình con thoát (con không chạy atexit)"""
+    from multiprocessing import util
+
+    util.Finalize(None, _export_at_exit, exitpriority=0)
+
+
+_configure_from_env()
+atexit.register(_export_at_exit)
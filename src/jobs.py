@@ -0,0 +1,101 @@
+"""Các công việc hide/extract/detect dùng chung cho dịch vụ HTTP và CLI xử lý hàng loạt.
+
+Các hàm nhận và trả về kiểu dữ liệu đơn giản nên chạy được trong tiến trình con
+của process pool; mỗi tiến trình tạo đối tượng steganography (bảng tra, danh sách
+từ, khóa đã dẫn xuất) một lần ở lần dùng đầu tiên.
+"""
+from src import payload
+from src.analyzer import StegAnalyzer
+from src.encryption import Encryptor
+from src.instrumentation import profiled
+from src.morse_steg import MorseSteg
+from src.unicode_steg import UnicodeSteg
+from src.zero_width_steg import ZeroWidthSteg
+
+METHODS = ('zero-width', 'unicode', 'morse')
+
+
+def _load_morse_steg():
+    steg = MorseSteg()
+    steg.load_word_lists()
+    return steg
+
+
+_FACTORIES = {
+    'zero-width': ZeroWidthSteg,
+    'unicode': UnicodeSteg,
+    'morse': _load_morse_steg,
+    'encryptor': Encryptor,
+    'analyzer': StegAnalyzer,
+}
+
+# Mỗi tiến trình con tạo mỗi đối tượng một lần (giữ bảng tra, danh sách từ, khóa đã dẫn xuất)
+_instances = {}
+
+
+def _instance(name):
+    instance = _instances.get(name)
+    if instance is None:
+        instance = _instances[name] = _FACTORIES[name]()
+    return instance
+
+
+def _decode_message(data):
+    """Giải mã payload không mật khẩu giống extract() của các lớp steganography"""
+    try:
+        return payload.unpack(data).decode('utf-8')
+    except ValueError:
+        # Văn bản tạo bởi phiên bản cũ (không đóng khung)
+        return payload.decode_text(data)
+
+
+@profiled('hide')
+def hide_job(method, cover_text, secret_message, password=None, seed=None):
+    """Ẩn thông điệp; ValueError nếu đầu vào không hợp lệ"""
+    if not secret_message:
+        raise ValueError("Thông điệp bí mật không được để trống")
+
+    if method == 'morse':
+        message = _instance('encryptor').encrypt(secret_message, password) if password else secret_message
+        return _instance('morse').hide(message, seed=seed)
+
+    if not cover_text:
+        raise ValueError("Văn bản gốc không được để trống")
+    if password:
+        data = _instance('encryptor').encrypt_bytes(secret_message, password)
+    else:
+        data = payload.encode_text(secret_message)
+
+    if method == 'unicode':
+        steg = _instance('unicode')
+        index = steg.build_index(cover_text)
+        if not index.fits(len(data)):
+            raise ValueError("Văn bản gốc quá ngắn để ẩn toàn bộ thông điệp")
+        return steg.hide_bytes(index, data)
+    return _instance('zero-width').hide_bytes(cover_text, data)
+
+
+@profiled('extract')
+def extract_job(method, text, password=None):
+    """Trích xuất thông điệp; LookupError nếu không có, ValueError nếu sai mật khẩu"""
+    if not text:
+        raise ValueError("Văn bản không được để trống")
+
+    if method == 'morse':
+        message = _instance('morse').extract(text)
+        return _instance('encryptor').decrypt(message, password) if password else message
+
+    data = _instance(method).extract_bytes(text)
+    if data is None:
+        raise LookupError("Không tìm thấy thông điệp bí mật")
+    if password:
+        return _instance('encryptor').decrypt_bytes(data, password)
+    return _decode_message(data)
+
+
+@profiled('detect')
+def detect_job(text):
+    """Phát hiện steganography, trả về dict có thể ghi JSON"""
+    results = _instance('analyzer').detect_steganography(text)
+    # Đổi kiểu số của NumPy sang kiểu Python
+    return {key: value.item() if hasattr(value, 'item') else value for key, value in results.items()}
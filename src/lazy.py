@@ -0,0 +1,58 @@
+"""Nạp các thư viện nặng (numpy, matplotlib, cryptography, ...) khi dùng lần đầu.
+
+lazy_import(name) trả về một đối tượng đại diện dùng như module; module thật
+chỉ được import khi truy cập thuộc tính đầu tiên. Các module đại diện được lưu
+trong một registry chung để kiểm tra module nào đã thực sự được nạp.
+"""
+import importlib
+import threading
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class LazyModule:
+    """Đại diện cho một module, import module thật ở lần truy cập thuộc tính đầu tiên"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        # Chỉ được gọi khi thuộc tính chưa có; lưu lại để lần sau truy cập trực tiếp
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        value = getattr(self._load(), attr)
+        self.__dict__[attr] = value
+        return value
+
+    def __repr__(self):
+        state = 'đã nạp' if self.loaded else 'chưa nạp'
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    """Lấy module đại diện (dùng chung) cho module name"""
+    with _registry_lock:
+        module = _registry.get(name)
+        if module is None:
+            module = _registry[name] = LazyModule(name)
+        return module
+
+
+def loaded_modules():
+    """Tên các module trong registry đã thực sự được import"""
+    with _registry_lock:
+        return sorted(name for name, module in _registry.items() if module.loaded)
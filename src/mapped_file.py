@@ -0,0 +1,76 @@
+"""Đọc file lớn qua mmap mà không giải mã toàn bộ thành str.
+
+Các ký tự zero-width và homoglyph được tìm trực tiếp trên bytes UTF-8 của
+vùng nhớ ánh xạ; phần văn bản cần giải mã được giải mã theo từng đoạn.
+"""
+import codecs
+import contextlib
+import functools
+import mmap
+import re
+
+# Số byte giải mã mỗi lần
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+# U+0370-03FF (Greek), U+0400-04FF (Cyrillic), U+2000-206F (General Punctuation)
+HOMOGLYPH_PATTERN = re.compile(b'\xcd[\xb0-\xbf]|[\xce-\xd3][\x80-\xbf]|\xe2\x80[\x80-\xbf]|\xe2\x81[\x80-\xaf]')
+
+
+@contextlib.contextmanager
+def open_mapped(path):
+    """Ánh xạ file vào bộ nhớ ở chế độ chỉ đọc; file rỗng cho ra b''"""
+    with open(path, 'rb') as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Không ánh xạ được file rỗng
+            yield b''
+            return
+        with buffer:
+            yield buffer
+
+
+def _utf8_pattern(chars):
+    """Mẫu bytes khớp một trong các ký tự: gom theo phần đầu UTF-8, byte cuối thành lớp ký tự"""
+    groups = {}
+    for char in sorted(set(chars)):
+        encoded = char.encode('utf-8')
+        groups.setdefault(encoded[:-1], bytearray()).append(encoded[-1])
+    return re.compile(b'|'.join(
+        re.escape(prefix) + b'[' + b''.join(re.escape(bytes([last])) for last in lasts) + b']'
+        for prefix, lasts in groups.items()
+    ))
+
+
+@functools.lru_cache(maxsize=None)
+def zero_width_pattern():
+    """Mẫu bytes khớp mọi ký tự ẩn của ZeroWidthSteg (mọi bảng chữ cái, header, delimiter)"""
+    # Import muộn: zero_width_steg import module này
+    from src.zero_width_steg import HIDDEN_CHARS
+    return _utf8_pattern(HIDDEN_CHARS)
+
+
+def count_matches(pattern, buffer):
+    """Đếm số lần khớp mẫu trên vùng nhớ mà không sao chép dữ liệu"""
+    return sum(1 for _ in pattern.finditer(buffer))
+
+
+def count_markers(buffer):
+    """Đếm ký tự zero-width và homoglyph trực tiếp trên bytes UTF-8"""
+    return {
+        "zero_width_count": count_matches(zero_width_pattern(), buffer),
+        "homoglyph_count": count_matches(HOMOGLYPH_PATTERN, buffer),
+    }
+
+
+def iter_text(buffer, chunk_size=DEFAULT_CHUNK_SIZE, start=0, end=None):
+    """Giải mã UTF-8 từng đoạn của buffer[start:end]; ký tự bị cắt giữa hai đoạn được ghép lại"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    end = len(buffer) if end is None else end
+    for position in range(start, end, chunk_size):
+        text = decoder.decode(buffer[position:min(position + chunk_size, end)])
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
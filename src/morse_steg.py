@@ -1,3 +1,109 @@
+import re
+
+from src import payload
+from src import word_lists
+from src.instrumentation import span
+from src.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+# Số ký hiệu Morse xử lý mỗi lần khi sinh văn bản theo từng đoạn
+DEFAULT_CHUNK_SYMBOLS = 4096
+
+# Mã Morse dài nhất trong bảng là 5 ký hiệu; mã dài hơn chắc chắn không hợp lệ
+_MAX_CODE_LENGTH = 5
+# Số token khác nhau tối đa được ghi nhớ phân loại
+_MAX_CACHED_TOKENS = 100000
+# Độ dài tối đa của từ dang dở giữ lại giữa hai đoạn trước khi được rút gọn
+_MAX_PENDING = 64
+
+# Dấu câu bị bỏ qua ở hai đầu từ khi phân loại chấm/gạch
+_WORD_PUNCTUATION = ';:!?'
+# Phần đầu không chứa dấu phân tách (khoảng trắng, ',' hoặc '.'), dùng trên chuỗi đã đảo ngược
+_WORD_PREFIX = re.compile(r'[^\s,.]*')
+
+# Mã Morse dạng chữ số: '.' = 0, '-' = 1, '/' = 2
+_CODE_DIGITS = str.maketrans('.-/', '012')
+
+
+def _shrink_word(word):
+    """Rút gọn từ dang dở mà không đổi cách phân loại của nó khi được nối thêm ký tự"""
+    if len(word.strip(_WORD_PUNCTUATION)) > 3:
+        # Đã là gạch, nối thêm thế nào cũng vẫn là gạch
+        return 'xxxx'
+    # Dấu câu ở đầu luôn bị bỏ; sau phần lõi (<= 3 ký tự) chỉ cần giữ đủ dấu câu để vượt ngưỡng
+    rest = word.lstrip(_WORD_PUNCTUATION)
+    return word[:len(word) - len(rest)][:1] + rest[:8]
+
+
+def _take_words(words, indices):
+    """Lấy các từ theo mảng chỉ số (danh sách Python hoặc WordList đã biên dịch)"""
+    if isinstance(words, word_lists.WordList):
+        return words.take(indices)
+    return np.array(words, dtype=object)[indices]
+
+
+class _TokenClasses(dict):
+    """Bảng phân loại token -> chữ số mã Morse, tính khi gặp token lần đầu"""
+
+    def __missing__(self, token):
+        if token == ',':
+            # Kết thúc ký tự
+            digits = ' '
+        elif token == '.':
+            # '/' rồi kết thúc ký tự
+            digits = '2 '
+        else:
+            # Từ ngắn (<= 3 ký tự, bỏ dấu câu ở hai đầu) là chấm, từ dài là gạch
+            digits = '1' if len(token.strip(_WORD_PUNCTUATION)) > 3 else '0'
+        if len(self) < _MAX_CACHED_TOKENS:
+            self[token] = digits
+        return digits
+
+
+class MorseDecoder:
+    """Giải mã văn bản ẩn theo từng đoạn: mỗi token được phân loại một lần rồi tra bảng mã"""
+
+    def __init__(self, morse_code_dict):
+        # Bảng tra: mã dạng chữ số -> ký tự ('/' -> khoảng trắng)
+        self._table = {code.translate(_CODE_DIGITS): char for char, code in morse_code_dict.items()}
+        self._classes = _TokenClasses()
+        self._carry = ''
+        self._pending = ''
+
+    def _decode(self, text):
+        """Giải mã các token trong text, giữ lại mã Morse chưa kết thúc"""
+        # Tách token bằng các thao tác chuỗi chạy trong C
+        tokens = text.replace(',', ' , ').replace('.', ' . ').split()
+        digits = self._carry + ''.join(map(self._classes.__getitem__, tokens))
+        codes = digits.split(' ')
+        # Mã dang dở được mang sang đoạn sau (cắt bớt nếu đã quá dài, vẫn không hợp lệ)
+        self._carry = codes.pop()[:_MAX_CODE_LENGTH + 1]
+        return ''.join(filter(None, map(self._table.get, codes)))
+
+    def feed(self, chunk):
+        """Nhận thêm một đoạn văn bản, trả về phần văn bản đã giải mã được"""
+        # Từ cuối cùng có thể còn tiếp tục ở đoạn sau nên được giữ lại; chỉ tìm trong đoạn mới
+        cut = len(chunk) - _WORD_PREFIX.match(chunk[::-1]).end()
+        if cut:
+            text = self._pending + chunk[:cut]
+            self._pending = chunk[cut:]
+        else:
+            text = ''
+            self._pending += chunk
+        # Giới hạn từ dang dở như _carry để văn bản không có dấu phân tách không tốn bộ nhớ/thời gian bậc hai
+        if len(self._pending) > _MAX_PENDING:
+            self._pending = _shrink_word(self._pending)
+        return self._decode(text)
+
+    def close(self):
+        """Kết thúc luồng, trả về phần văn bản còn lại"""
+        text = self._decode(self._pending)
+        char = self._table.get(self._carry, '')
+        self._pending = ''
+        self._carry = ''
+        return text + char
+
 class MorseSteg:
     def __init__(self):
         # Bảng mã Morse
@@ -18,19 +124,24 @@ class MorseSteg:
         self.short_words = []
         self.long_words = []
 
+    @span('morse.load_word_lists')
     def load_word_lists(self, short_words_file=None, long_words_file=None):
-        """Tải danh sách từ ngắn và từ dài từ file"""
+        """Tải danh sách từ ngắn và từ dài từ file (dùng bản biên dịch ánh xạ bộ nhớ)"""
         if short_words_file:
-            with open(short_words_file, 'r', encoding='utf-8') as f:
-                self.short_words = [line.strip() for line in f]
+            # Chỉ giữ các từ hợp lệ có 1-3 ký tự, đã loại trùng
+            self.short_words = word_lists.load_word_lists(short_words_file).short
+            if not len(self.short_words):
+                raise ValueError("File từ ngắn không có từ hợp lệ (1-3 ký tự)")
         else:
             # Danh sách mặc định các từ ngắn
             self.short_words = ["a", "an", "at", "as", "by", "he", "hi", "in", "is", "it", 
                                "me", "my", "no", "of", "on", "or", "so", "to", "up", "us", "we"]
         
         if long_words_file:
-            with open(long_words_file, 'r', encoding='utf-8') as f:
-                self.long_words = [line.strip() for line in f]
+            # Chỉ giữ các từ hợp lệ có từ 4 ký tự trở lên, đã loại trùng
+            self.long_words = word_lists.load_word_lists(long_words_file).long
+            if not len(self.long_words):
+                raise ValueError("File từ dài không có từ hợp lệ (4+ ký tự)")
         else:
             # Danh sách mặc định các từ dài
             self.long_words = ["about", "above", "across", "actually", "although", "always",
@@ -47,51 +158,68 @@ class MorseSteg:
     
     def morse_to_text(self, morse):
         """Chuyển đổi mã Morse thành văn bản"""
-        text = ''
-        morse_chars = morse.split(' ')
-        for char in morse_chars:
-            if char in self.reverse_morse_dict:
-                text += self.reverse_morse_dict[char]
-        return text
+        reverse = self.reverse_morse_dict
+        return ''.join([reverse[char] for char in morse.split(' ') if char in reverse])
     
-    def hide(self, secret_message):
-        """Ẩn thông điệp bí mật sử dụng từ ngắn/dài để biểu diễn mã Morse"""
-        if not self.short_words or not self.long_words:
+    def is_morse_text(self, text):
+        """Kiểm tra văn bản có biểu diễn được bằng bảng mã Morse không (Morse không phân biệt hoa thường)"""
+        # So từng ký tự để không nhận nhầm ký tự viết hoa thành nhiều ký tự (ví dụ 'ß' -> 'SS')
+        return all(char.upper() in self.morse_code_dict for char in text)
+
+    def encode_payload(self, secret_message):
+        """Chuẩn bị thông điệp: giữ nguyên nếu mã Morse biểu diễn được (trích xuất ra chữ hoa), nếu không thì đóng khung UTF-8 dạng hex"""
+        if self.is_morse_text(secret_message):
+            return secret_message
+        return payload.encode_text(secret_message).hex().upper()
+
+    def decode_payload(self, text):
+        """Khôi phục thông điệp từ văn bản giải mã Morse (payload hex đóng khung hoặc văn bản thường)"""
+        try:
+            return payload.unpack(bytes.fromhex(text)).decode('utf-8')
+        except ValueError:
+            return text
+
+    def iter_hide(self, secret_message, seed=None, chunk_symbols=DEFAULT_CHUNK_SYMBOLS):
+        """Sinh văn bản ẩn theo từng đoạn; cùng seed cho cùng kết quả"""
+        if not len(self.short_words) or not len(self.long_words):
             self.load_word_lists()
         
-        morse = self.text_to_morse(secret_message)
+        morse = self.text_to_morse(self.encode_payload(secret_message))
+        symbols = np.frombuffer(morse.encode('ascii'), dtype=np.uint8)
         
-        import random
-        steganographic_text = []
-        
-        for symbol in morse:
-            if symbol == '.':
-                steganographic_text.append(random.choice(self.short_words))
-            elif symbol == '-':
-                steganographic_text.append(random.choice(self.long_words))
-            elif symbol == ' ':
-                steganographic_text.append(',')
-            elif symbol == '/':
-                steganographic_text.append('.')
-        
-        return ' '.join(steganographic_text)
+        # Hai luồng ngẫu nhiên riêng cho từ ngắn và từ dài: kết quả không phụ thuộc chunk_symbols
+        short_rng, long_rng = (np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(2))
+
+        for start in range(0, len(symbols), chunk_symbols):
+            chunk = symbols[start:start + chunk_symbols]
+            dots = chunk == ord('.')
+            dashes = chunk == ord('-')
+            
+            words = np.empty(len(chunk), dtype=object)
+            # Chấm -> từ ngắn, gạch -> từ dài (rút chỉ số hàng loạt), khoảng trắng -> ',', '/' -> '.'
+            words[dots] = _take_words(self.short_words, short_rng.integers(0, len(self.short_words), size=int(dots.sum())))
+            words[dashes] = _take_words(self.long_words, long_rng.integers(0, len(self.long_words), size=int(dashes.sum())))
+            words[chunk == ord(' ')] = ','
+            words[chunk == ord('/')] = '.'
+            
+            text = ' '.join(words.tolist())
+            yield text if start == 0 else ' ' + text
+
+    @span('morse.hide')
+    def hide(self, secret_message, seed=None):
+        """Ẩn thông điệp bí mật sử dụng từ ngắn/dài để biểu diễn mã Morse"""
+        return ''.join(self.iter_hide(secret_message, seed))
     
+    def decoder(self):
+        """Tạo bộ giải mã theo từng đoạn (feed/close); kết quả chưa qua decode_payload"""
+        return MorseDecoder(self.morse_code_dict)
+
+    @span('morse.extract')
     def extract(self, steganographic_text):
         """Trích xuất thông điệp bí mật từ văn bản sử dụng từ ngắn/dài"""
-        if not self.short_words or not self.long_words:
+        if not len(self.short_words) or not len(self.long_words):
             self.load_word_lists()
         
-        words = steganographic_text.replace('.', ' . ').replace(',', ' , ').split()
-        
-        morse = ''
-        for word in words:
-            if word == ',':
-                morse += ' '
-            elif word == '.':
-                morse += '/ '
-            elif len(word.strip('.,;:!?')) <= 3:
-                morse += '.'
-            else:
-                morse += '-'
-        
-        return self.morse_to_text(morse)
\ No newline at end of file
+        decoder = self.decoder()
+        text = decoder.feed(steganographic_text) + decoder.close()
+        return self.decode_payload(text)
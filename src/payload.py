@@ -0,0 +1,192 @@
+"""Lớp payload dùng chung cho các phương pháp ẩn tin.
+
+Thông điệp được mã hóa UTF-8 và đóng khung:
+    MAGIC (1 byte) | độ dài dữ liệu (varint) | CRC32 (4 byte) | dữ liệu
+Khi ghi theo luồng (chưa biết độ dài lúc bắt đầu) dùng khung dạng luồng:
+    STREAM_MAGIC (1 byte) | dữ liệu | CRC32 (4 byte)
+điểm kết thúc do phương pháp ẩn tin xác định (ví dụ delimiter của ZeroWidthSteg)
+nên khung này không được có dữ liệu thừa phía sau.
+Byte 0xF5 và 0xF6 không bao giờ xuất hiện trong UTF-8 hợp lệ nên phân biệt được với
+các thông điệp cũ (không đóng khung).
+"""
+import zlib
+
+MAGIC = 0xF5
+STREAM_MAGIC = 0xF6
+CHECKSUM_SIZE = 4
+# Header dài nhất: MAGIC + varint 64 bit (10 byte) + checksum
+MAX_HEADER_SIZE = 1 + 10 + CHECKSUM_SIZE
+
+
+def _encode_varint(value):
+    """Mã hóa số nguyên không âm dạng varint (7 bit mỗi byte)"""
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _decode_varint(data, pos):
+    """Đọc varint tại vị trí pos, trả về (giá trị, vị trí kế tiếp)"""
+    value = 0
+    shift = 0
+    while pos < len(data) and shift <= 63:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+    raise ValueError("Độ dài payload không hợp lệ")
+
+
+def pack(data):
+    """Đóng khung dữ liệu bytes với độ dài và checksum"""
+    data = bytes(data)
+    return (bytes([MAGIC]) + _encode_varint(len(data))
+            + zlib.crc32(data).to_bytes(CHECKSUM_SIZE, 'big') + data)
+
+
+def iter_pack_stream(chunks):
+    """Đóng khung dạng luồng các đoạn bytes: byte đầu khung, từng đoạn dữ liệu, cuối cùng là CRC32"""
+    yield bytes([STREAM_MAGIC])
+    checksum = 0
+    for chunk in chunks:
+        checksum = zlib.crc32(chunk, checksum)
+        yield chunk
+    yield checksum.to_bytes(CHECKSUM_SIZE, 'big')
+
+
+def _unpack_stream(blob):
+    """Mở khung dạng luồng (toàn bộ blob, kể cả CRC32 ở cuối)"""
+    if len(blob) < 1 + CHECKSUM_SIZE:
+        raise ValueError("Payload bị cắt cụt")
+    data = bytes(blob[1:-CHECKSUM_SIZE])
+    if zlib.crc32(data) != int.from_bytes(blob[-CHECKSUM_SIZE:], 'big'):
+        raise ValueError("Checksum payload không khớp")
+    return data
+
+
+def unpack(blob):
+    """Mở khung payload, bỏ qua dữ liệu thừa phía sau (trừ khung dạng luồng); ValueError nếu sai định dạng hoặc checksum"""
+    if blob and blob[0] == STREAM_MAGIC:
+        return _unpack_stream(blob)
+    if not blob or blob[0] != MAGIC:
+        raise ValueError("Không phải payload đóng khung")
+
+    length, pos = _decode_varint(blob, 1)
+    checksum = blob[pos:pos + CHECKSUM_SIZE]
+    data = bytes(blob[pos + CHECKSUM_SIZE:pos + CHECKSUM_SIZE + length])
+    if len(checksum) < CHECKSUM_SIZE or len(data) < length:
+        raise ValueError("Payload bị cắt cụt")
+    if zlib.crc32(data) != int.from_bytes(checksum, 'big'):
+        raise ValueError("Checksum payload không khớp")
+    return data
+
+
+class StreamUnpacker:
+    """Mở khung payload theo từng đoạn bytes; dữ liệu không đóng khung được trả về nguyên vẹn"""
+
+    def __init__(self):
+        self._header = bytearray()
+        self._framed = None
+        self._remaining = 0
+        self._expected_checksum = 0
+        self._checksum = 0
+        # Khung dạng luồng: giữ lại 4 byte cuối (có thể là CRC32) cho đến khi kết thúc
+        self._tail = None
+
+    def feed(self, data):
+        """Nhận thêm một đoạn dữ liệu, trả về phần dữ liệu đã mở khung"""
+        if not data:
+            return b''
+        if self._framed is None:
+            self._header += data
+            if self._header[0] == STREAM_MAGIC:
+                self._framed = True
+                self._tail = bytearray()
+                data, self._header = bytes(self._header[1:]), None
+                return self._feed_stream(data)
+            if self._header[0] != MAGIC:
+                self._framed = False
+                data, self._header = bytes(self._header), None
+                return data
+            try:
+                self._remaining, pos = _decode_varint(self._header, 1)
+                if len(self._header) < pos + CHECKSUM_SIZE:
+                    raise ValueError("Header chưa đủ")
+            except ValueError:
+                if len(self._header) < MAX_HEADER_SIZE:
+                    return b''
+                raise
+            self._framed = True
+            self._expected_checksum = int.from_bytes(self._header[pos:pos + CHECKSUM_SIZE], 'big')
+            data, self._header = bytes(self._header[pos + CHECKSUM_SIZE:]), None
+
+        if not self._framed:
+            return data
+        if self._tail is not None:
+            return self._feed_stream(data)
+
+        data = data[:self._remaining]
+        self._remaining -= len(data)
+        self._checksum = zlib.crc32(data, self._checksum)
+        return data
+
+    def _feed_stream(self, data):
+        self._tail += data
+        cut = len(self._tail) - CHECKSUM_SIZE
+        if cut <= 0:
+            return b''
+        data = bytes(self._tail[:cut])
+        del self._tail[:cut]
+        self._checksum = zlib.crc32(data, self._checksum)
+        return data
+
+    def close(self):
+        """Kết thúc luồng, kiểm tra độ dài và checksum; trả về dữ liệu còn giữ lại"""
+        if self._framed is None:
+            # Dữ liệu quá ngắn để là payload đóng khung
+            data, self._header = bytes(self._header), None
+            self._framed = False
+            return data
+        if self._tail is not None:
+            if len(self._tail) < CHECKSUM_SIZE or int.from_bytes(self._tail, 'big') != self._checksum:
+                raise ValueError("Checksum payload không khớp")
+            return b''
+        if self._framed and (self._remaining or self._checksum != self._expected_checksum):
+            raise ValueError("Checksum payload không khớp")
+        return b''
+
+
+def encode_text(text):
+    """Mã hóa văn bản thành payload UTF-8 đóng khung"""
+    return pack(text.encode('utf-8'))
+
+
+def decode_text(data):
+    """Giải mã bytes thành văn bản: UTF-8, hoặc mỗi byte một ký tự với dữ liệu cũ"""
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+
+def bytes_to_bits(data):
+    """Chuyển đổi bytes thành chuỗi nhị phân"""
+    if not data:
+        return ''
+    return format(int.from_bytes(data, 'big'), '0%db' % (len(data) * 8))
+
+
+def bits_to_bytes(bits):
+    """Chuyển đổi chuỗi nhị phân thành bytes, bỏ các bit lẻ ở cuối"""
+    num_bytes = len(bits) // 8
+    if num_bytes == 0:
+        return b''
+    return int(bits[:num_bytes * 8], 2).to_bytes(num_bytes, 'big')
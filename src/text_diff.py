@@ -0,0 +1,256 @@
+"""So khớp hai văn bản theo thuật toán O(ND) của Myers (bản không gian tuyến tính).
+
+Thời gian tỷ lệ với N·D (N là độ dài, D là số ký tự chèn/xóa) nên nhanh với văn
+bản dài vài MB mà chỉ thay đổi ít. Phần đầu/cuối trùng nhau được bỏ qua trước,
+các đoạn trùng dài được so sánh theo khối (so sánh slice) thay vì từng ký tự.
+Vùng dài được chia nhỏ trước tại các "mốc" (đoạn ANCHOR_LENGTH ký tự xuất hiện
+đúng một lần ở cả hai bên, giống patience diff) để các thay đổi rải rác không
+làm thời gian tăng theo D² trên cả văn bản. Vùng cùng độ dài có nhiều ký tự bị
+thay thế dày đặc (như Unicode steganography) được so khớp theo vị trí. Vùng sửa
+đổi quá dày để Myers kết thúc trong MAX_SNAKE_STEPS bước (ví dụ zero-width chèn
+rải rác) được so khớp gần đúng theo cửa sổ trong thời gian tuyến tính, kết quả
+khi đó được đánh dấu approximate.
+"""
+
+# Độ dài đoạn mốc và độ dài vùng tối thiểu để chia theo mốc
+ANCHOR_LENGTH = 64
+ANCHOR_MIN_REGION = 4096
+# Số vị trí thử tìm mốc trong mỗi vùng
+_ANCHOR_ATTEMPTS = 8
+# Vùng cùng độ dài có từ ngần này ký tự khác nhau trở lên (nhưng không quá một nửa)
+# được coi là chỉ bị thay thế, không chạy Myers
+SUBSTITUTION_MIN_MISMATCHES = 64
+# Số bước d tối đa khi tìm điểm chia; vượt quá thì vùng được so khớp gần đúng theo
+# cửa sổ để hai văn bản khác nhau nhiều không mất thời gian O(N²)
+MAX_SNAKE_STEPS = 1024
+# So khớp gần đúng: khoảng lệch tối đa tìm điểm khớp lại và số ký tự phải trùng
+RESYNC_WINDOW = 64
+RESYNC_LENGTH = 8
+
+
+class DiffRuns(list):
+    """Danh sách các đoạn khác nhau; approximate=True nếu có vùng được so khớp gần đúng"""
+
+    def __init__(self, runs=(), approximate=False):
+        super().__init__(runs)
+        self.approximate = approximate
+
+
+def _match_forward(a, i, b, j, limit):
+    """Độ dài đoạn trùng nhau bắt đầu tại a[i] và b[j] (tối đa limit)"""
+    if limit <= 0 or a[i] != b[j]:
+        return 0
+    length = 1
+    step = 1
+    while length < limit:
+        step = min(step, limit - length)
+        if a[i + length:i + length + step] == b[j + length:j + length + step]:
+            length += step
+            step *= 2
+        elif step == 1:
+            break
+        else:
+            step //= 2
+    return length
+
+
+def _match_backward(a, i, b, j, limit):
+    """Độ dài đoạn trùng nhau kết thúc ngay trước a[i] và b[j] (tối đa limit)"""
+    if limit <= 0 or a[i - 1] != b[j - 1]:
+        return 0
+    length = 1
+    step = 1
+    while length < limit:
+        step = min(step, limit - length)
+        if a[i - length - step:i - length] == b[j - length - step:j - length]:
+            length += step
+            step *= 2
+        elif step == 1:
+            break
+        else:
+            step //= 2
+    return length
+
+
+def _middle_snake(a, a_lo, a_hi, b, b_lo, b_hi):
+    """Tìm điểm chia (x, y) nằm trên một đường sửa đổi ngắn nhất"""
+    n = a_hi - a_lo
+    m = b_hi - b_lo
+    delta = n - m
+    odd = delta % 2 != 0
+    # v[k] = x xa nhất đạt được trên đường chéo k (tính từ đầu với v1, từ cuối với v2)
+    v1 = {1: 0}
+    v2 = {1: 0}
+    k1_start = k1_end = k2_start = k2_end = 0
+
+    for d in range(min((n + m + 1) // 2 + 1, MAX_SNAKE_STEPS)):
+        for k1 in range(-d + k1_start, d + 1 - k1_end, 2):
+            if k1 == -d or (k1 != d and v1.get(k1 - 1, -1) < v1.get(k1 + 1, -1)):
+                x1 = v1.get(k1 + 1, -1)
+            else:
+                x1 = v1.get(k1 - 1, -1) + 1
+            y1 = x1 - k1
+            if x1 < n and y1 < m:
+                x1 += _match_forward(a, a_lo + x1, b, b_lo + y1, min(n - x1, m - y1))
+                y1 = x1 - k1
+            v1[k1] = x1
+            if x1 > n:
+                k1_end += 2
+            elif y1 > m:
+                k1_start += 2
+            elif odd:
+                x2 = v2.get(delta - k1)
+                if x2 is not None and x1 >= n - x2:
+                    return x1, y1
+
+        for k2 in range(-d + k2_start, d + 1 - k2_end, 2):
+            if k2 == -d or (k2 != d and v2.get(k2 - 1, -1) < v2.get(k2 + 1, -1)):
+                x2 = v2.get(k2 + 1, -1)
+            else:
+                x2 = v2.get(k2 - 1, -1) + 1
+            y2 = x2 - k2
+            if x2 < n and y2 < m:
+                x2 += _match_backward(a, a_hi - x2, b, b_hi - y2, min(n - x2, m - y2))
+                y2 = x2 - k2
+            v2[k2] = x2
+            if x2 > n:
+                k2_end += 2
+            elif y2 > m:
+                k2_start += 2
+            elif not odd:
+                x1 = v1.get(delta - k2)
+                if x1 is not None and x1 >= n - x2:
+                    return x1, x1 - (delta - k2)
+
+    # Không tìm được điểm chia: xóa toàn bộ rồi chèn toàn bộ
+    return None
+
+
+def _find_anchor(a, a_lo, a_hi, b, b_lo, b_hi):
+    """Tìm đoạn gần giữa a[a_lo:a_hi] xuất hiện đúng một lần ở cả hai vùng, trả về (x, y) hoặc None"""
+    middle = (a_lo + a_hi - ANCHOR_LENGTH) // 2
+    for attempt in range(_ANCHOR_ATTEMPTS):
+        # Thử lần lượt hai phía của điểm giữa
+        offset = (attempt + 1) // 2 * ANCHOR_LENGTH
+        x = middle + offset if attempt % 2 else middle - offset
+        if x < a_lo or x + ANCHOR_LENGTH > a_hi:
+            continue
+        gram = a[x:x + ANCHOR_LENGTH]
+        y = b.find(gram, b_lo, b_hi)
+        if (y != -1 and b.find(gram, y + 1, b_hi) == -1
+                and a.find(gram, a_lo, x + ANCHOR_LENGTH - 1) == -1
+                and a.find(gram, x + 1, a_hi) == -1):
+            return x, y
+    return None
+
+
+def _resync(a, i, a_hi, b, j, b_hi):
+    """(di, dj) có di + dj nhỏ nhất trong cửa sổ để a[i + di:] và b[j + dj:] trùng lại, hoặc None"""
+    best = None
+    for di in range(min(RESYNC_WINDOW, a_hi - i) + 1):
+        if best is not None and di >= best[0] + best[1]:
+            break
+        gram = a[i + di:min(i + di + RESYNC_LENGTH, a_hi)]
+        if len(gram) == RESYNC_LENGTH:
+            y = b.find(gram, j, min(b_hi, j + RESYNC_WINDOW + RESYNC_LENGTH))
+        else:
+            # Gần cuối vùng a: chỉ khớp lại khi phần còn lại trùng với phần cuối vùng b
+            y = b_hi - len(gram)
+            if y < j or b[y:b_hi] != gram:
+                y = -1
+        if y != -1 and y - j <= RESYNC_WINDOW and (best is None or di + y - j < best[0] + best[1]):
+            best = (di, y - j)
+    return best
+
+
+def _windowed_diff(a, a_lo, a_hi, b, b_lo, b_hi, edits):
+    """So khớp gần đúng trong thời gian tuyến tính: đi song song hai vùng, tại mỗi chỗ lệch
+    tìm điểm khớp lại gần nhất trong cửa sổ; không tìm được thì coi một cửa sổ là bị thay thế"""
+    i, j = a_lo, b_lo
+    while i < a_hi and j < b_hi:
+        same = _match_forward(a, i, b, j, min(a_hi - i, b_hi - j))
+        i += same
+        j += same
+        if i == a_hi or j == b_hi:
+            break
+        resync = _resync(a, i, a_hi, b, j, b_hi)
+        if resync is None:
+            di = dj = min(RESYNC_WINDOW, a_hi - i, b_hi - j)
+        else:
+            di, dj = resync
+        edits.append((i, i + di, j, j + dj))
+        i += di
+        j += dj
+    if i < a_hi or j < b_hi:
+        edits.append((i, a_hi, j, b_hi))
+
+
+def _substitutions(a, a_lo, a_hi, b, b_lo):
+    """Vị trí các ký tự khác nhau khi so khớp a[a_lo:a_hi] với b theo vị trí"""
+    return [offset for offset, (x, y) in enumerate(zip(a[a_lo:a_hi], b[b_lo:b_lo + a_hi - a_lo])) if x != y]
+
+
+def _diff(a, a_lo, a_hi, b, b_lo, b_hi, edits):
+    """Thêm các thao tác sửa đổi (a_lo, a_hi, b_lo, b_hi) của a[a_lo:a_hi] -> b[b_lo:b_hi] vào edits,
+    trả về True nếu có vùng phải so khớp gần đúng"""
+    # Bỏ phần đầu và cuối trùng nhau
+    prefix = _match_forward(a, a_lo, b, b_lo, min(a_hi - a_lo, b_hi - b_lo))
+    a_lo += prefix
+    b_lo += prefix
+    suffix = _match_backward(a, a_hi, b, b_hi, min(a_hi - a_lo, b_hi - b_lo))
+    a_hi -= suffix
+    b_hi -= suffix
+
+    if a_lo == a_hi or b_lo == b_hi:
+        if a_lo != a_hi or b_lo != b_hi:
+            edits.append((a_lo, a_hi, b_lo, b_hi))
+        return False
+
+    if min(a_hi - a_lo, b_hi - b_lo) >= ANCHOR_MIN_REGION:
+        anchor = _find_anchor(a, a_lo, a_hi, b, b_lo, b_hi)
+        if anchor is not None:
+            x, y = anchor
+            # Dùng | để luôn xử lý cả hai nửa
+            return _diff(a, a_lo, x, b, b_lo, y, edits) | _diff(a, x, a_hi, b, y, b_hi, edits)
+
+    if a_hi - a_lo == b_hi - b_lo and a_hi - a_lo >= SUBSTITUTION_MIN_MISMATCHES:
+        mismatches = _substitutions(a, a_lo, a_hi, b, b_lo)
+        if SUBSTITUTION_MIN_MISMATCHES <= len(mismatches) <= (a_hi - a_lo) // 2:
+            edits.extend((a_lo + i, a_lo + i + 1, b_lo + i, b_lo + i + 1) for i in mismatches)
+            return False
+
+    split = _middle_snake(a, a_lo, a_hi, b, b_lo, b_hi)
+    if split is None:
+        _windowed_diff(a, a_lo, a_hi, b, b_lo, b_hi, edits)
+        return True
+    x, y = split
+    return _diff(a, a_lo, a_lo + x, b, b_lo, b_lo + y, edits) | _diff(a, a_lo + x, a_hi, b, b_lo + y, b_hi, edits)
+
+
+def diff_runs(original, modified):
+    """Các đoạn khác nhau giữa hai văn bản theo thứ tự vị trí.
+
+    Mỗi đoạn là dict gồm type ('insert', 'delete' hoặc 'substitute') và vị trí
+    original_start/original_end, modified_start/modified_end (nửa mở). Kết quả là
+    DiffRuns, có approximate=True khi một phần được so khớp gần đúng.
+    """
+    edits = []
+    approximate = _diff(original, 0, len(original), modified, 0, len(modified), edits)
+
+    runs = DiffRuns(approximate=approximate)
+    for a_lo, a_hi, b_lo, b_hi in edits:
+        # Gộp các thao tác liền nhau (không có đoạn trùng ở giữa)
+        if runs and runs[-1]["original_end"] == a_lo and runs[-1]["modified_end"] == b_lo:
+            run = runs[-1]
+            run["original_end"] = a_hi
+            run["modified_end"] = b_hi
+        else:
+            run = {"original_start": a_lo, "original_end": a_hi, "modified_start": b_lo, "modified_end": b_hi}
+            runs.append(run)
+        if run["original_start"] == run["original_end"]:
+            run["type"] = "insert"
+        elif run["modified_start"] == run["modified_end"]:
+            run["type"] = "delete"
+        else:
+            run["type"] = "substitute"
+    return runs
@@ -1,3 +1,57 @@
+import functools
+
+from src import payload
+from src.instrumentation import span
+from src.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+# Phiên bản định dạng file chỉ mục văn bản gốc
+COVER_INDEX_VERSION = 1
+
+class CoverIndex:
+    """Chỉ mục dựng sẵn cho một văn bản gốc: mã Unicode và vị trí các ký tự có thể thay thế"""
+
+    def __init__(self, code_points, positions):
+        self.code_points = code_points
+        self.positions = positions
+        # Mảng chỉ đọc để dùng lại an toàn cho nhiều lần ẩn
+        self.code_points.flags.writeable = False
+        self.positions.flags.writeable = False
+
+    @property
+    def capacity_bits(self):
+        """Số bit tối đa có thể ẩn"""
+        return len(self.positions)
+
+    @property
+    def capacity_bytes(self):
+        """Số byte tối đa có thể ẩn"""
+        return len(self.positions) // 8
+
+    @property
+    def cover_text(self):
+        """Văn bản gốc"""
+        return self.code_points.tobytes().decode('utf-32-le')
+
+    def fits(self, num_bytes):
+        """Kiểm tra num_bytes byte dữ liệu có ẩn vừa không"""
+        return num_bytes * 8 <= len(self.positions)
+
+    def save(self, path):
+        """Lưu chỉ mục ra file .npz để dùng lại giữa các tiến trình"""
+        with open(path, 'wb') as f:
+            np.savez(f, version=np.array(COVER_INDEX_VERSION),
+                     code_points=self.code_points, positions=self.positions)
+
+    @classmethod
+    def load(cls, path):
+        """Đọc chỉ mục đã lưu bằng save()"""
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != COVER_INDEX_VERSION:
+                raise ValueError("Phiên bản chỉ mục văn bản gốc không được hỗ trợ")
+            return cls(data['code_points'], data['positions'])
+
 class UnicodeSteg:
     def __init__(self):
         # Sử dụng các ký tự Unicode đặc biệt để ẩn thông tin
@@ -14,60 +68,87 @@ class UnicodeSteg:
         # Đảo ngược bảng để decode
         self.reverse_similar = {v: k for k, v in self.similar_chars.items()}
 
+    @functools.cached_property
+    def _tables(self):
+        """Bảng tra theo mã Unicode cho engine vector hóa (dựng khi dùng lần đầu); phần tử cuối là lính canh cho mọi mã lớn hơn"""
+        table_size = max(map(ord, list(self.similar_chars) + list(self.reverse_similar))) + 2
+        substitute_table = np.zeros(table_size, dtype=np.uint32)
+        bit_table = np.full(table_size, -1, dtype=np.int8)
+        for char, homoglyph in self.similar_chars.items():
+            substitute_table[ord(char)] = ord(homoglyph)
+            bit_table[ord(char)] = 0
+            bit_table[ord(homoglyph)] = 1
+        return substitute_table, bit_table
+
     def text_to_binary(self, text):
-        """Chuyển đổi văn bản thành chuỗi nhị phân"""
-        binary = ''.join(format(ord(char), '08b') for char in text)
-        return binary
+        """Chuyển đổi văn bản thành chuỗi nhị phân (UTF-8)"""
+        return payload.bytes_to_bits(text.encode('utf-8'))
     
     def binary_to_text(self, binary):
         """Chuyển đổi chuỗi nhị phân thành văn bản"""
-        text = ''
-        for i in range(0, len(binary), 8):
-            if i + 8 <= len(binary):
-                byte = binary[i:i+8]
-                text += chr(int(byte, 2))
-        return text
+        return payload.decode_text(payload.bits_to_bytes(binary))
 
+    @span('unicode.hide')
     def hide(self, cover_text, secret_message):
-        """Ẩn thông điệp bí mật sử dụng homoglyphs Unicode"""
-        binary_secret = self.text_to_binary(secret_message)
-        bit_index = 0
-        steganographic_text = ''
-        
-        for char in cover_text:
-            if char in self.similar_chars and bit_index < len(binary_secret):
-                # Nếu ký tự có thể thay thế và còn bit để ẩn
-                if binary_secret[bit_index] == '1':
-                    # Sử dụng homoglyph nếu bit là 1
-                    steganographic_text += self.similar_chars[char]
-                else:
-                    # Giữ nguyên ký tự nếu bit là 0
-                    steganographic_text += char
-                bit_index += 1
-            else:
-                steganographic_text += char
-        
-        # Kiểm tra xem đã ẩn hết thông điệp chưa
-        if bit_index < len(binary_secret):
-            return "Văn bản gốc quá ngắn để ẩn toàn bộ thông điệp"
-        
-        return steganographic_text
+        """Ẩn thông điệp bí mật sử dụng homoglyphs Unicode (cover_text có thể là CoverIndex)"""
+        return self._embed_bytes(cover_text, payload.encode_text(secret_message))
+
+    @span('unicode.hide_bytes')
+    def hide_bytes(self, cover_text, data):
+        """Ẩn dữ liệu bytes (ví dụ bản mã nhị phân) sử dụng homoglyphs Unicode"""
+        return self._embed_bytes(cover_text, data)
+
+    def _code_points(self, text):
+        """Chuyển văn bản thành mảng mã Unicode uint32"""
+        return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+    def _bit_values(self, code_points):
+        """Tra bảng cho từng ký tự: 0 (ký tự gốc thay được), 1 (homoglyph), -1 (không liên quan)"""
+        bit_table = self._tables[1]
+        return bit_table[np.minimum(code_points, len(bit_table) - 1)]
+
+    @span('unicode.build_index')
+    def build_index(self, cover_text):
+        """Quét văn bản gốc một lần để dùng lại cho nhiều lần ẩn"""
+        code_points = self._code_points(cover_text).copy()
+        # Vị trí các ký tự gốc có thể thay thế, theo thứ tự xuất hiện
+        positions = np.flatnonzero(self._bit_values(code_points) == 0)
+        return CoverIndex(code_points, positions)
+
+    @span('unicode.embed_bytes')
+    def _embed_bytes(self, cover_text, data):
+        """Thay thế các ký tự có thể thay thế theo từng bit của dữ liệu (vector hóa bằng NumPy); ValueError nếu không đủ chỗ"""
+        index = cover_text if isinstance(cover_text, CoverIndex) else self.build_index(cover_text)
 
+        # Kiểm tra xem có đủ chỗ để ẩn hết thông điệp không (trước khi xử lý dữ liệu)
+        if not index.fits(len(data)):
+            raise ValueError("Văn bản gốc quá ngắn để ẩn toàn bộ thông điệp")
+
+        bits = np.unpackbits(np.frombuffer(bytes(data), dtype=np.uint8))
+
+        # Bit 1 dùng homoglyph, bit 0 giữ nguyên ký tự
+        targets = index.positions[:len(bits)][bits.astype(bool)]
+        code_points = index.code_points.copy()
+        code_points[targets] = self._tables[0][code_points[targets]]
+        return code_points.tobytes().decode('utf-32-le')
+
+    @span('unicode.extract')
     def extract(self, steganographic_text):
         """Trích xuất thông điệp bí mật từ văn bản sử dụng homoglyphs Unicode"""
-        binary = ''
+        data = self.extract_bytes(steganographic_text)
         
-        for char in steganographic_text:
-            if char in self.reverse_similar:
-                # Nếu tìm thấy homoglyph, bit là 1
-                binary += '1'
-            elif char in self.similar_chars:
-                # Nếu tìm thấy ký tự gốc có thể thay thế, bit là 0
-                binary += '0'
-        
-        # Cắt binary thành các byte và chuyển đổi thành văn bản
-        # Tìm số byte hoàn chỉnh
-        num_bytes = len(binary) // 8
-        binary = binary[:num_bytes * 8]
-        
-        return self.binary_to_text(binary)
\ No newline at end of file
+        # Payload có độ dài nên bỏ qua được các bit thừa của phần văn bản còn lại
+        try:
+            return payload.unpack(data).decode('utf-8')
+        except ValueError:
+            # Văn bản tạo bởi phiên bản cũ (không đóng khung)
+            return payload.decode_text(data)
+
+    @span('unicode.extract_bytes')
+    def extract_bytes(self, steganographic_text):
+        """Trích xuất dữ liệu bytes từ văn bản sử dụng homoglyphs Unicode"""
+        values = self._bit_values(self._code_points(steganographic_text))
+        bits = values[values >= 0]
+        # Chỉ lấy các byte hoàn chỉnh
+        bits = bits[:len(bits) // 8 * 8]
+        return np.packbits(bits.astype(np.uint8)).tobytes()
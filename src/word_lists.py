@@ -0,0 +1,222 @@
+"""Định dạng biên dịch cho danh sách từ của MorseSteg.
+
+File nguồn (mỗi dòng một từ) được kiểm tra, loại trùng và chia thành hai nhóm
+theo độ dài (từ ngắn 1-3 ký tự, từ dài 4+ ký tự) rồi lưu thành một file gồm:
+    MAGIC | header | offsets từ ngắn | offsets từ dài | blob UTF-8
+File được ánh xạ bộ nhớ (mmap) nên dùng chung được giữa các instance và các
+tiến trình; chỉ biên dịch lại khi mtime/kích thước và hash của file nguồn thay đổi.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+from src.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+MAGIC = b'STEGWL01'
+# mtime_ns, kích thước, sha256 của file nguồn, số từ ngắn, số từ dài
+_HEADER = struct.Struct('<qq32sII')
+_OFFSET_DTYPE = '<u4'
+
+# Độ dài từ giống cách MorseSteg.extract đo: bỏ dấu câu ở hai đầu
+SHORT_MAX_LENGTH = 3
+_STRIP_CHARS = '.,;:!?'
+
+# Thư mục cache riêng của người dùng (tên file đoán được nên không dùng thư mục tạm chung)
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'text-steganography', 'wordlists',
+)
+
+# Các file đã mở trong tiến trình: đường dẫn nguồn -> (mtime_ns, kích thước, CompiledWordLists)
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def word_length(word):
+    """Độ dài từ sau khi bỏ dấu câu ở hai đầu"""
+    return len(word.strip(_STRIP_CHARS))
+
+
+def is_valid_word(word):
+    """Từ không rỗng, không chứa khoảng trắng, ',' hoặc '.' (sẽ làm sai việc tách token)"""
+    return bool(word) and word_length(word) > 0 and not any(
+        char.isspace() or char in ',.' for char in word
+    )
+
+
+class WordList:
+    """Danh sách từ chỉ đọc trên vùng nhớ ánh xạ: offsets uint32 trỏ vào blob UTF-8"""
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Chỉ số từ vượt quá danh sách")
+        start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+        return bytes(self._blob[start:end]).decode('utf-8')
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def take(self, indices):
+        """Lấy nhiều từ theo mảng chỉ số, mỗi từ khác nhau chỉ giải mã một lần"""
+        unique, inverse = np.unique(indices, return_inverse=True)
+        words = np.array([self[int(index)] for index in unique], dtype=object)
+        return words[inverse]
+
+
+class CompiledWordLists:
+    """Nhóm từ ngắn và từ dài đọc từ một file đã biên dịch"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError("File danh sách từ đã biên dịch không hợp lệ")
+        (self.source_mtime_ns, self.source_size, self.source_hash,
+         num_short, num_long) = _HEADER.unpack_from(self._mmap, len(MAGIC))
+
+        position = len(MAGIC) + _HEADER.size
+        short_offsets = np.frombuffer(self._mmap, dtype=_OFFSET_DTYPE, count=num_short + 1, offset=position)
+        position += short_offsets.nbytes
+        long_offsets = np.frombuffer(self._mmap, dtype=_OFFSET_DTYPE, count=num_long + 1, offset=position)
+        position += long_offsets.nbytes
+
+        blob = memoryview(self._mmap)[position:]
+        self.short = WordList(short_offsets, blob)
+        self.long = WordList(long_offsets, blob)
+
+
+def _hash_file(path):
+    """SHA-256 của file nguồn"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def compile_word_list(source_path, output_path):
+    """Đọc file nguồn, kiểm tra, loại trùng, chia nhóm theo độ dài và ghi file biên dịch"""
+    stat = os.stat(source_path)
+    source_hash = _hash_file(source_path)
+
+    short_words = []
+    long_words = []
+    seen = set()
+    with open(source_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            word = line.strip()
+            if word in seen or not is_valid_word(word):
+                continue
+            seen.add(word)
+            if word_length(word) <= SHORT_MAX_LENGTH:
+                short_words.append(word)
+            else:
+                long_words.append(word)
+
+    encoded = [word.encode('utf-8') for word in short_words + long_words]
+    lengths = np.fromiter((len(word) for word in encoded), dtype=np.int64, count=len(encoded))
+    ends = np.cumsum(lengths)
+    short_offsets = np.concatenate(([0], ends[:len(short_words)])).astype(_OFFSET_DTYPE)
+    long_start = short_offsets[-1]
+    long_offsets = np.concatenate(([long_start], ends[len(short_words):])).astype(_OFFSET_DTYPE)
+
+    # Ghi ra file tạm rồi đổi tên để tiến trình khác không đọc phải file dở dang
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_HEADER.pack(stat.st_mtime_ns, stat.st_size, source_hash,
+                                 len(short_words), len(long_words)))
+            f.write(short_offsets.tobytes())
+            f.write(long_offsets.tobytes())
+            for word in encoded:
+                f.write(word)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _ensure_private_dir(path):
+    """Tạo thư mục cache quyền 0o700; PermissionError nếu thư mục thuộc người dùng khác"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if not hasattr(os, 'getuid'):
+        return
+    stat = os.lstat(path)
+    if not os.path.isdir(path) or os.path.islink(path) or stat.st_uid != os.getuid():
+        raise PermissionError(f"Thư mục cache danh sách từ không thuộc người dùng hiện tại: {path}")
+    if stat.st_mode & 0o077:
+        os.chmod(path, 0o700)
+
+
+def _update_source_stat(cache_path, compiled, stat):
+    """Ghi mtime mới vào header khi nội dung nguồn không đổi, tránh hash lại ở các lần sau"""
+    try:
+        with open(cache_path, 'r+b') as f:
+            f.seek(len(MAGIC))
+            f.write(_HEADER.pack(stat.st_mtime_ns, stat.st_size, compiled.source_hash,
+                                 len(compiled.short), len(compiled.long)))
+    except OSError:
+        # Cache chỉ đọc: vẫn dùng được, chỉ phải hash lại lần sau
+        return
+    compiled.source_mtime_ns = stat.st_mtime_ns
+
+
+def cache_path_for(source_path, cache_dir=None):
+    """Đường dẫn file biên dịch tương ứng với một file nguồn"""
+    key = hashlib.sha256(os.path.abspath(source_path).encode('utf-8')).hexdigest()[:32]
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, key + '.wl')
+
+
+def load_word_lists(source_path, cache_dir=None):
+    """Mở danh sách từ đã biên dịch, biên dịch lại nếu file nguồn đã thay đổi"""
+    source_path = os.path.abspath(source_path)
+    stat = os.stat(source_path)
+
+    with _loaded_lock:
+        entry = _loaded.get(source_path)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            return entry[2]
+
+        if cache_dir is None:
+            _ensure_private_dir(DEFAULT_CACHE_DIR)
+        cache_path = cache_path_for(source_path, cache_dir)
+        compiled = None
+        if os.path.exists(cache_path):
+            try:
+                compiled = CompiledWordLists(cache_path)
+            except (ValueError, struct.error, OSError):
+                compiled = None
+
+        if compiled is not None and (compiled.source_mtime_ns, compiled.source_size) != (stat.st_mtime_ns, stat.st_size):
+            # mtime thay đổi nhưng nội dung có thể vẫn như cũ
+            if compiled.source_size != stat.st_size or compiled.source_hash != _hash_file(source_path):
+                compiled = None
+            else:
+                _update_source_stat(cache_path, compiled, stat)
+
+        if compiled is None:
+            compile_word_list(source_path, cache_path)
+            compiled = CompiledWordLists(cache_path)
+
+        _loaded[source_path] = (stat.st_mtime_ns, stat.st_size, compiled)
+        return compiled
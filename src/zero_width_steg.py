@@ -1,66 +1,433 @@
+import codecs
+import copy
+import functools
+import hashlib
+import itertools
+import re
+
+from src import mapped_file, payload
+from src.instrumentation import span
+from src.lazy import lazy_import
+
+# numpy chỉ được nạp khi mã hóa/giải mã lần đầu
+np = lazy_import('numpy')
+
+# Số ký tự đọc mỗi lần khi xử lý theo luồng
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def _read_chunks(stream, chunk_size):
+    """Đọc luồng theo từng đoạn cố định cho đến khi hết dữ liệu"""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+# Bảng chữ cái ký tự ẩn theo số bit mỗi ký tự (2^k ký tự, k chia hết 8 để một byte
+# ứng với đúng 8/k ký tự). 1 bit là định dạng gốc: zero-width space (0), joiner (1)
+ALPHABETS = {
+    1: '\u200B\u200D',
+    2: '\u200B\u200D\u2060\uFEFF',
+    # Word joiner, invisible operators, BOM và variation selector 1-8
+    4: '\u200B\u200D\u2060\u2061\u2062\u2063\u2064\uFEFF' + ''.join(map(chr, range(0xFE00, 0xFE08))),
+    # 256 variation selector (U+FE00-FE0F và U+E0100-E01EF)
+    8: ''.join(map(chr, range(0xFE00, 0xFE10))) + ''.join(map(chr, range(0xE0100, 0xE01F0))),
+}
+# Ký tự đầu tiên sau delimiter cho biết bảng chữ cái; định dạng 1 bit không có
+# header nên văn bản cũ vẫn trích xuất được
+ALPHABET_HEADERS = {2: '\u2061', 4: '\u2062', 8: '\u2063'}
+_HEADER_BITS = {header: bits for bits, header in ALPHABET_HEADERS.items()}
+
+# Chế độ phân tán: mỗi đoạn thông điệp bắt đầu bằng Mongolian vowel separator (không
+# hiển thị, không phải khoảng trắng và không thuộc bảng chữ cái nào)
+SEGMENT_MARK = '\u180E'
+# Số ký hiệu tối thiểu mỗi đoạn: ký tự đánh dấu chiếm tối đa 1/16 phần ẩn
+MIN_SEGMENT_SYMBOLS = 16
+# Một dãy ký tự ẩn bất kỳ (mọi bảng chữ cái, kể cả header)
+_RUN_PATTERN = re.compile('[' + re.escape(''.join(sorted(set(''.join(ALPHABETS.values()))))) + ']*')
+_SEGMENT_PATTERN = re.compile(SEGMENT_MARK + '(' + _RUN_PATTERN.pattern + ')')
+# Mọi ký tự ẩn có thể xuất hiện trong văn bản đã giấu (ký hiệu, header, delimiter,
+# ký tự đánh dấu đoạn), dùng cho các bộ phát hiện trong analyzer và mapped_file
+HIDDEN_CHARS = ''.join(sorted(set(
+    ''.join(ALPHABETS.values()) + ''.join(ALPHABET_HEADERS.values()) + '\u200C' + SEGMENT_MARK
+)))
+
+
+@functools.lru_cache(maxsize=None)
+def _tables(bits):
+    """(mã Unicode của từng ký hiệu theo giá trị, bảng tra mã Unicode -> giá trị hoặc -1)"""
+    code_points = np.array([ord(char) for char in ALPHABETS[bits]], dtype=np.uint32)
+    lookup = np.full(int(code_points.max()) + 2, -1, dtype=np.int16)
+    lookup[code_points] = np.arange(len(code_points), dtype=np.int16)
+    return code_points, lookup
+
+
+def _to_symbols(data, bits):
+    """Tách mỗi byte thành 8/bits giá trị ký hiệu (bit cao trước)"""
+    values = np.frombuffer(bytes(data), dtype=np.uint8)
+    if bits == 8:
+        return values
+    if bits == 1:
+        return np.unpackbits(values)
+    per_byte = 8 // bits
+    symbols = np.empty(len(values) * per_byte, dtype=np.uint8)
+    for i, shift in enumerate(range(8 - bits, -1, -bits)):
+        symbols[i::per_byte] = (values >> shift) & ((1 << bits) - 1)
+    return symbols
+
+
+def _from_symbols(symbols, bits):
+    """Ghép các giá trị ký hiệu uint8 (số lượng là bội của 8/bits) thành bytes"""
+    if bits == 8:
+        return symbols.tobytes()
+    if bits == 1:
+        return np.packbits(symbols).tobytes()
+    per_byte = 8 // bits
+    values = np.zeros(len(symbols) // per_byte, dtype=np.uint8)
+    for i, shift in enumerate(range(8 - bits, -1, -bits)):
+        values |= symbols[i::per_byte] << np.uint8(shift)
+    return values.tobytes()
+
+
+@functools.lru_cache(maxsize=None)
+def _space_table():
+    """Bảng tra mã Unicode -> có phải khoảng trắng (phần tử cuối False cho mọi ký tự lớn hơn)"""
+    spaces = [code for code in range(0x3001) if chr(code).isspace()]
+    table = np.zeros(max(spaces) + 2, dtype=bool)
+    table[spaces] = True
+    return table
+
+
+def _word_boundaries(text, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Vị trí cuối mỗi từ (ngay trước khoảng trắng hoặc cuối văn bản), tính vector hóa theo từng đoạn"""
+    table = _space_table()
+    parts = []
+    for start in range(0, len(text), chunk_size):
+        # Lấy thêm một ký tự trước đoạn để không bỏ sót ranh giới nằm giữa hai đoạn
+        offset = max(start - 1, 0)
+        code_points = np.frombuffer(text[offset:start + chunk_size].encode('utf-32-le'), dtype=np.uint32)
+        is_space = table[np.minimum(code_points, len(table) - 1)]
+        parts.append(np.flatnonzero(is_space[1:] & ~is_space[:-1]) + (offset + 1))
+    if text and not text[-1].isspace():
+        parts.append(np.array([len(text)]))
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+
+
+def _permutation(count, key):
+    """Hoán vị có khóa: đoạn thứ j trong văn bản là đoạn thứ perm[j] của thông điệp"""
+    digest = hashlib.blake2b(key + count.to_bytes(8, 'big'), digest_size=16, person=b'zw-distribute').digest()
+    # RandomState cho cùng một dãy số ở mọi phiên bản NumPy
+    return np.random.RandomState(np.frombuffer(digest, dtype='<u4')).permutation(count)
+
+
+def _key_bytes(key):
+    """Khóa hoán vị dạng bytes (None hoặc chuỗi rỗng là không có khóa)"""
+    return key.encode('utf-8') if isinstance(key, str) else bytes(key or b'')
+
+
 class ZeroWidthSteg:
-    def __init__(self):
+    def __init__(self, bits_per_symbol=1, distribute=False, key=None):
+        """bits_per_symbol: số bit mỗi ký tự ẩn (1, 2, 4 hoặc 8); trích xuất tự nhận biết qua header.
+        distribute: chia thông điệp thành nhiều đoạn đặt ở cuối các từ, thứ tự các đoạn được hoán vị
+        theo key (str hoặc bytes, cần cùng key khi trích xuất); trích xuất tự nhận biết chế độ này"""
+        if bits_per_symbol not in ALPHABETS:
+            raise ValueError(f"bits_per_symbol phải là một trong {', '.join(map(str, ALPHABETS))}")
+
         # Định nghĩa các ký tự zero-width
         self.zwsp = '\u200B'  # Zero-width space (bit 0)
         self.zwj = '\u200D'   # Zero-width joiner (bit 1)
         self.zwnj = '\u200C'  # Zero-width non-joiner (delimiter)
 
+        self.bits_per_symbol = bits_per_symbol
+        self.alphabet = ALPHABETS[bits_per_symbol]
+        self._header = ALPHABET_HEADERS.get(bits_per_symbol, '')
+        self.distribute = distribute
+        self._key = _key_bytes(key)
+
+        # Delimiter dạng UTF-8 để tìm trực tiếp trên file ánh xạ bộ nhớ
+        self._zwnj_bytes = self.zwnj.encode('utf-8')
+        self._mark_bytes = SEGMENT_MARK.encode('utf-8')
+
+    def with_key(self, key):
+        """Bản sao cùng cấu hình nhưng dùng khóa hoán vị khác, để đối tượng dùng chung không giữ khóa"""
+        steg = copy.copy(self)
+        steg._key = _key_bytes(key)
+        return steg
+
     def text_to_binary(self, text):
-        """Chuyển đổi văn bản thành chuỗi nhị phân"""
-        binary = ''.join(format(ord(char), '08b') for char in text)
-        return binary
+        """Chuyển đổi văn bản thành chuỗi nhị phân (UTF-8)"""
+        return payload.bytes_to_bits(text.encode('utf-8'))
 
     def binary_to_text(self, binary):
         """Chuyển đổi chuỗi nhị phân thành văn bản"""
-        text = ''
-        for i in range(0, len(binary), 8):
-            if i + 8 <= len(binary):
-                byte = binary[i:i+8]
-                text += chr(int(byte, 2))
-        return text
+        return payload.decode_text(payload.bits_to_bytes(binary))
+
+    @span('zero_width.encode_bytes')
+    def encode_bytes(self, data):
+        """Chuyển đổi dữ liệu bytes thành chuỗi ký tự ẩn (8/bits_per_symbol ký tự mỗi byte, không có header)"""
+        # Tra bảng theo từng ký hiệu (vector hóa), ghép thẳng thành chuỗi qua UTF-32
+        code_points, _ = _tables(self.bits_per_symbol)
+        return code_points[_to_symbols(data, self.bits_per_symbol)].tobytes().decode('utf-32-le')
+
+    @span('zero_width.decode_bytes')
+    def decode_bytes(self, hidden_part):
+        """Chuyển đổi chuỗi ký tự ẩn (có thể bắt đầu bằng header bảng chữ cái) thành dữ liệu bytes"""
+        bits, hidden_part = self._split_header(hidden_part)
+        data, _ = self._decode_symbols(hidden_part, bits)
+        return data
 
+    def _split_header(self, hidden_part):
+        """Tách header bảng chữ cái ở đầu phần ẩn: (số bit mỗi ký tự, phần còn lại)"""
+        bits = _HEADER_BITS.get(hidden_part[:1])
+        if bits is None:
+            return 1, hidden_part
+        return bits, hidden_part[1:]
+
+    def _decode_symbols(self, hidden_part, bits=1):
+        """Giải mã các byte hoàn chỉnh, trả về (bytes, các ký tự ẩn còn dư)"""
+        code_points, lookup = _tables(bits)
+        symbols = lookup[np.minimum(np.frombuffer(hidden_part.encode('utf-32-le'), dtype=np.uint32), len(lookup) - 1)]
+        if len(symbols) and symbols.min() < 0:
+            # Bỏ qua các ký tự lạ xen giữa (giống cách trích xuất cũ)
+            symbols = symbols[symbols >= 0]
+
+        used = len(symbols) // (8 // bits) * (8 // bits)
+        leftover = code_points[symbols[used:]].tobytes().decode('utf-32-le')
+        return _from_symbols(symbols[:used].astype(np.uint8), bits), leftover
+
+    @span('zero_width.hide_bytes')
+    def hide_bytes(self, cover_text, data):
+        """Ẩn dữ liệu bytes vào văn bản; ValueError nếu chế độ phân tán không tìm thấy từ nào"""
+        if self.distribute:
+            return self._hide_distributed(cover_text, self._header + self.encode_bytes(data))
+        return ''.join((
+            cover_text[0],
+            self.zwnj,  # Bắt đầu thông điệp bí mật
+            self._header,
+            self.encode_bytes(data),
+            self.zwnj,  # Kết thúc thông điệp bí mật
+            cover_text[1:],
+        ))
+
+    def _hide_distributed(self, cover_text, hidden):
+        """Chia phần ẩn thành các đoạn liên tiếp, đặt vào các điểm chèn cách đều theo thứ tự hoán vị"""
+        boundaries = _word_boundaries(cover_text)
+        if not len(boundaries):
+            raise ValueError("Văn bản gốc không có từ nào để phân tán thông điệp")
+
+        # Tính trước điểm chèn, vị trí cắt và thứ tự các đoạn rồi ghép kết quả trong một lượt
+        # Giới hạn số đoạn để mỗi đoạn đủ dài, tránh văn bản phình to vì ký tự đánh dấu
+        count = min(len(boundaries), max(1, len(hidden) // MIN_SEGMENT_SYMBOLS))
+        positions = boundaries[np.arange(count) * len(boundaries) // count].tolist()
+        cuts = (np.arange(count + 1) * len(hidden) // max(count, 1)).tolist()
+        pieces = []
+        previous = 0
+        for position, segment in zip(positions, _permutation(count, self._key).tolist()):
+            pieces.append(cover_text[previous:position])
+            pieces.append(SEGMENT_MARK)
+            pieces.append(hidden[cuts[segment]:cuts[segment + 1]])
+            previous = position
+        pieces.append(cover_text[previous:])
+        return ''.join(pieces)
+
+    def _iter_segments(self, chunks):
+        """Tìm lần lượt các đoạn ẩn (sau ký tự đánh dấu) trong một lượt đọc các đoạn văn bản"""
+        run = None  # Đoạn ẩn còn tiếp ở đoạn văn bản sau
+        for chunk in chunks:
+            position = 0
+            if run is not None:
+                position = _RUN_PATTERN.match(chunk).end()
+                run.append(chunk[:position])
+                if position == len(chunk):
+                    continue
+                yield ''.join(run)
+                run = None
+            for match in _SEGMENT_PATTERN.finditer(chunk, position):
+                if match.end() == len(chunk):
+                    run = [match.group(1)]
+                    break
+                yield match.group(1)
+        if run is not None:
+            yield ''.join(run)
+
+    def _assemble(self, segments):
+        """Xếp các đoạn ẩn về thứ tự ban đầu theo hoán vị có khóa rồi giải mã"""
+        ordered = [''] * len(segments)
+        for segment, index in zip(segments, _permutation(len(segments), self._key).tolist()):
+            ordered[index] = segment
+        return self.decode_bytes(''.join(ordered))
+
+    @span('zero_width.extract_bytes')
+    def extract_bytes(self, steganographic_text):
+        """Trích xuất dữ liệu bytes nằm giữa hai delimiter (hoặc các đoạn phân tán), None nếu không tìm thấy"""
+        start = steganographic_text.find(self.zwnj)
+        mark = steganographic_text.find(SEGMENT_MARK)
+        if mark != -1 and (start == -1 or mark < start):
+            return self._assemble(list(self._iter_segments((steganographic_text[mark:],))))
+        if start == -1:
+            return None
+        end = steganographic_text.find(self.zwnj, start + 1)
+        if end == -1:
+            return None
+        return self.decode_bytes(steganographic_text[start + 1:end])
+
+    def iter_extract_mapped(self, buffer, chunk_size=mapped_file.DEFAULT_CHUNK_SIZE):
+        """Trích xuất từ bytes UTF-8 (ví dụ file mmap): tìm delimiter trên bytes, chỉ giải mã phần ẩn"""
+        start = buffer.find(self._zwnj_bytes)
+        mark = buffer.find(self._mark_bytes)
+        if mark != -1 and (start == -1 or mark < start):
+            yield self._assemble(list(self._iter_segments(mapped_file.iter_text(buffer, chunk_size, mark))))
+            return
+        end = buffer.find(self._zwnj_bytes, start + 1) if start != -1 else -1
+        if end == -1:
+            raise ValueError("Không tìm thấy thông điệp bí mật")
+
+        # Header bảng chữ cái (nếu có) là một ký tự ngay sau delimiter
+        start += len(self._zwnj_bytes)
+        bits = 1
+        for header_bits, header in ALPHABET_HEADERS.items():
+            header = header.encode('utf-8')
+            if buffer[start:start + len(header)] == header:
+                bits = header_bits
+                start += len(header)
+                break
+
+        leftover = ''
+        for text in mapped_file.iter_text(buffer, chunk_size, start, end):
+            data, leftover = self._decode_symbols(leftover + text, bits)
+            if data:
+                yield data
+
+    @span('zero_width.extract_file')
+    def extract_file(self, path, chunk_size=mapped_file.DEFAULT_CHUNK_SIZE):
+        """Trích xuất thông điệp bí mật từ file qua mmap, không đọc cả file vào bộ nhớ"""
+        with mapped_file.open_mapped(path) as buffer:
+            if not buffer:
+                return "Văn bản không được để trống"
+            try:
+                data = b''.join(self.iter_extract_mapped(buffer, chunk_size))
+            except ValueError as e:
+                return str(e)
+
+        try:
+            return payload.unpack(data).decode('utf-8')
+        except ValueError:
+            # Văn bản tạo bởi phiên bản cũ (không đóng khung)
+            return payload.decode_text(data)
+
+    @span('zero_width.hide')
     def hide(self, cover_text, secret_message):
         """Ẩn thông điệp bí mật vào văn bản"""
         if not cover_text or not secret_message:
             return "Văn bản gốc và thông điệp bí mật không được để trống"
-        
-        binary_secret = self.text_to_binary(secret_message)
-        
-        # Thêm delimiter vào đầu và cuối để dễ dàng trích xuất
-        steganographic_text = cover_text[0]
-        steganographic_text += self.zwnj  # Bắt đầu thông điệp bí mật
-        
-        # Chèn các ký tự zero-width để biểu diễn thông điệp bí mật
-        for bit in binary_secret:
-            if bit == '0':
-                steganographic_text += self.zwsp
-            else:
-                steganographic_text += self.zwj
-        
-        steganographic_text += self.zwnj  # Kết thúc thông điệp bí mật
-        steganographic_text += cover_text[1:]
-        
-        return steganographic_text
 
+        try:
+            return self.hide_bytes(cover_text, payload.encode_text(secret_message))
+        except ValueError as e:
+            return str(e)
+
+    @span('zero_width.extract')
     def extract(self, steganographic_text):
         """Trích xuất thông điệp bí mật từ văn bản"""
         if not steganographic_text:
             return "Văn bản không được để trống"
-        
-        # Tìm vị trí của các delimiter
-        parts = steganographic_text.split(self.zwnj)
-        if len(parts) < 3:
+
+        data = self.extract_bytes(steganographic_text)
+        if data is None:
             return "Không tìm thấy thông điệp bí mật"
-        
-        # Phần giữa hai delimiter chứa thông điệp bí mật
-        hidden_part = parts[1]
-        
-        binary = ''
-        for char in hidden_part:
-            if char == self.zwsp:
-                binary += '0'
-            elif char == self.zwj:
-                binary += '1'
-        
-        # Chuyển đổi nhị phân thành văn bản
-        return self.binary_to_text(binary)
\ No newline at end of file
+
+        try:
+            return payload.unpack(data).decode('utf-8')
+        except ValueError:
+            # Văn bản tạo bởi phiên bản cũ (không đóng khung)
+            return payload.decode_text(data)
+
+    def iter_hide(self, cover_stream, secret_stream, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Ẩn thông điệp đọc từ luồng, trả về lần lượt từng đoạn văn bản kết quả.
+
+        Thông điệp luôn được đóng khung dạng luồng (payload.iter_pack_stream, CRC32 ở cuối vì
+        chưa biết độ dài) nên dữ liệu bắt đầu bằng byte đầu khung vẫn được trích xuất nguyên vẹn.
+        """
+        if self.distribute:
+            raise ValueError("Chế độ phân tán cần toàn bộ văn bản gốc, hãy dùng hide_bytes")
+        cover_chunks = _read_chunks(cover_stream, chunk_size)
+        secret_chunks = _read_chunks(secret_stream, chunk_size)
+
+        first_cover = next(cover_chunks, '')
+        first_secret = next(secret_chunks, '')
+        if not first_cover or not first_secret:
+            raise ValueError("Văn bản gốc và thông điệp bí mật không được để trống")
+
+        yield first_cover[0]
+        yield self.zwnj  # Bắt đầu thông điệp bí mật
+        if self._header:
+            yield self._header
+
+        chunks = itertools.chain((first_secret,), secret_chunks)
+        for data in payload.iter_pack_stream(
+            chunk.encode('utf-8') if isinstance(chunk, str) else chunk for chunk in chunks
+        ):
+            yield self.encode_bytes(data)
+
+        yield self.zwnj  # Kết thúc thông điệp bí mật
+
+        if len(first_cover) > 1:
+            yield first_cover[1:]
+        yield from cover_chunks
+
+    def iter_extract(self, stego_stream, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Trích xuất thông điệp từ luồng đọc, trả về từng đoạn bytes đã giải mã"""
+        started = False
+        bits = None
+        leftover = ''
+
+        chunks = _read_chunks(stego_stream, chunk_size)
+        for chunk in chunks:
+            if bits is None:
+                if not started:
+                    # Tìm delimiter mở đầu, bỏ qua phần văn bản phía trước
+                    start = chunk.find(self.zwnj)
+                    mark = chunk.find(SEGMENT_MARK)
+                    if mark != -1 and (start == -1 or mark < start):
+                        # Chế độ phân tán: gom các đoạn trong phần còn lại của luồng
+                        yield self._assemble(list(self._iter_segments(itertools.chain((chunk[mark:],), chunks))))
+                        return
+                    if start == -1:
+                        continue
+                    started = True
+                    chunk = chunk[start + 1:]
+                if not chunk:
+                    continue  # Header nằm ở đoạn sau
+                bits, chunk = self._split_header(chunk)
+
+            end = chunk.find(self.zwnj)
+            data, leftover = self._decode_symbols(leftover + (chunk if end == -1 else chunk[:end]), bits)
+            if data:
+                yield data
+            if end != -1:
+                return
+
+        raise ValueError("Không tìm thấy thông điệp bí mật")
+
+    def hide_stream(self, cover_stream, secret_stream, output_stream, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Ẩn thông điệp và ghi kết quả vào luồng ghi theo từng đoạn, trả về số ký tự đã ghi"""
+        written = 0
+        for piece in self.iter_hide(cover_stream, secret_stream, chunk_size):
+            output_stream.write(piece)
+            written += len(piece)
+        return written
+
+    def extract_stream(self, stego_stream, output_stream, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Trích xuất thông điệp và ghi văn bản UTF-8 vào luồng ghi, trả về số byte đã giải mã"""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        unpacker = payload.StreamUnpacker()
+        total = 0
+        for data in self.iter_extract(stego_stream, chunk_size):
+            data = unpacker.feed(data)
+            output_stream.write(decoder.decode(data))
+            total += len(data)
+        data = unpacker.close()
+        output_stream.write(decoder.decode(data, final=True))
+        return total + len(data)
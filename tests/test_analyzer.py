@@ -0,0 +1,120 @@
+import math
+from collections import Counter
+
+import pytest
+
+from src.analyzer import CharHistogram, StegAnalyzer, merge_stats, scan_text
+from src.zero_width_steg import ALPHABETS, HIDDEN_CHARS, ZeroWidthSteg
+
+SAMPLES = [
+    "",
+    "Hello, world! This is a plain sentence.",
+    "Đây là　văn bản\tcó khoảng trắng Unicode và dấu câu...",
+    "Ηello wοrld \u200B\u200C\u200D zero-width",
+    "word\u2060joiner\uFEFF và selector \uFE0F \U000E0100\U000E01EF",
+    " ;:!? . , a an the \n\n",
+]
+
+
+def _reference_stats(text):
+    """Cách tính cũ, từng ký tự"""
+    words = text.split()
+    stripped = [word.strip('.,;:!?') for word in words]
+    counts = Counter(text)
+    return {
+        "total_chars": len(text),
+        "zero_width_count": sum(text.count(char) for char in HIDDEN_CHARS),
+        "homoglyph_count": sum(1 for char in text
+                               if any(start <= ord(char) <= end for start, end in
+                                      [(0x0370, 0x03FF), (0x0400, 0x04FF), (0x2000, 0x206F)])),
+        "total_words": len(words),
+        "short_words": sum(1 for word in stripped if len(word) <= 3),
+        "entropy": -sum(c / len(text) * math.log2(c / len(text)) for c in counts.values()) if text else 0,
+    }
+
+
+@pytest.mark.parametrize('text', SAMPLES)
+def test_scan_text_matches_reference(text):
+    stats = scan_text(text)
+    reference = _reference_stats(text)
+    for key in ("total_chars", "zero_width_count", "homoglyph_count", "total_words", "short_words"):
+        assert stats[key] == reference[key], key
+    assert StegAnalyzer().detect_steganography(text)["entropy"] == pytest.approx(reference["entropy"])
+
+
+def test_scan_text_accepts_lone_surrogates():
+    stats = scan_text("abc \ud800 def")
+    assert stats["total_chars"] == 9 and stats["total_words"] == 3
+    assert StegAnalyzer().detect_steganography("x\udfff")["entropy"] == pytest.approx(1.0)
+
+
+def test_merge_stats_matches_whole_text():
+    a, b = "first chunk ", "second chunk \u200B"
+    merged = merge_stats(scan_text(a), scan_text(b))
+    whole = scan_text(a + b)
+    assert {k: v for k, v in merged.items() if k != "char_counts"} == \
+           {k: v for k, v in whole.items() if k != "char_counts"}
+    assert (merged["char_counts"] == whole["char_counts"]).all()
+
+
+def test_char_histogram_incremental_and_merge():
+    text = "hello Việt Nam \ud800"
+    whole = CharHistogram(text)
+    chunked = CharHistogram()
+    for i in range(0, len(text), 3):
+        chunked.update(text[i:i + 3])
+    assert chunked.total == whole.total == len(text)
+    assert chunked.digest() == whole.digest()
+    assert chunked.entropy() == pytest.approx(StegAnalyzer().calculate_entropy(text))
+    assert whole.count('l') == 2 and whole.count('\U0001F600') == 0
+    assert len(whole) == len(set(text))
+    assert whole.top_n(2) == [(' ', 3), ('l', 2)]
+
+    merged = CharHistogram("hello ").merge(CharHistogram("Việt Nam \ud800"))
+    assert merged.digest() == whole.digest()
+    assert CharHistogram.from_counts(scan_text(text)["char_counts"]).digest() == whole.digest()
+
+
+def test_render_char_distribution_is_cached():
+    analyzer = StegAnalyzer(chart_cache_size=1)
+    png = analyzer.render_char_distribution("hello world", "hello\u200B world")
+    assert png.startswith(b'\x89PNG')
+    # Cùng nội dung dùng lại ảnh đã lưu
+    assert analyzer.render_char_distribution("hello world", "hello\u200B world") is png
+    histogram = analyzer.render_char_distribution(CharHistogram("hello world"), "hello\u200B world")
+    assert analyzer.render_char_distribution(CharHistogram("hello world"), "hello\u200B world") is histogram
+    analyzer.render_char_distribution("other", "text")
+    assert len(analyzer._chart_cache) == 1
+    assert analyzer.render_char_distribution("", "x") is None
+
+
+def test_char_distribution_labels_invisible_characters():
+    labels, original, stego = StegAnalyzer()._char_distribution_data("aab", "aab\u200B", 10)
+    assert labels == ['a', 'b', 'U+200B']
+    assert original.tolist() == [2, 1, 0] and stego.tolist() == [2, 1, 1]
+
+
+@pytest.mark.parametrize('bits', sorted(ALPHABETS))
+def test_zero_width_detected_for_every_alphabet(bits):
+    cover = "Văn bản bình thường không có gì đặc biệt."
+    stego = ZeroWidthSteg(bits_per_symbol=bits).hide(cover, "bí mật")
+    hidden = len(stego) - len(cover)
+    analyzer = StegAnalyzer()
+
+    assert scan_text(stego)["zero_width_count"] == hidden
+    detection = analyzer.detect_steganography(stego)
+    assert detection["has_zero_width"] and detection["zero_width_count"] == hidden
+
+    results = analyzer.analyze_zero_width(stego)
+    assert results["total_zero_width"] == hidden
+    assert results["zero_width_ratio"] == hidden / len(stego)
+    if bits > 1:
+        assert results["other_zero_width_count"] > 0
+
+
+def test_zero_width_detects_segment_marks():
+    cover = "Một hai ba bốn năm sáu bảy tám chín mười. " * 20
+    stego = ZeroWidthSteg(distribute=True).hide(cover, "bí mật")
+    assert "\u180E" in stego
+    assert scan_text(stego)["zero_width_count"] == len(stego) - len(cover)
+    assert StegAnalyzer().analyze_zero_width(stego)["total_zero_width"] == len(stego) - len(cover)
@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import pytest
+
+from src.api import StegService
+
+COVER = "The quick brown fox jumps over the lazy dog. " * 10
+
+
+@pytest.fixture(scope='module')
+def service():
+    service = StegService(workers=1, max_body_size=64 * 1024)
+    yield service
+    service.close()
+
+
+def _request(service, path, body=b'', method='POST', headers=()):
+    """Gọi ứng dụng ASGI trực tiếp, trả về (status, headers, thân response)"""
+    messages = [{'type': 'http.request', 'body': body[i:i + 1000], 'more_body': i + 1000 < len(body)}
+                for i in range(0, max(len(body), 1), 1000)]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path,
+             'headers': [(name.encode(), value.encode()) for name, value in headers]}
+    asyncio.run(service(scope, receive, send))
+    start = sent[0]
+    return start['status'], dict(start['headers']), b''.join(m.get('body', b'') for m in sent[1:])
+
+
+def _json(service, path, params):
+    status, _, body = _request(service, path, json.dumps(params).encode(),
+                               headers=[('content-type', 'application/json')])
+    return status, json.loads(body)
+
+
+@pytest.mark.parametrize('method', ['zero-width', 'unicode', 'morse'])
+def test_hide_extract_json(service, method):
+    status, hidden = _json(service, f'/hide/{method}', {"cover": COVER, "secret": "bí mật", "seed": 1})
+    assert status == 200
+    status, extracted = _json(service, f'/extract/{method}', {"text": hidden["result"]})
+    assert status == 200
+    assert extracted["result"] == "bí mật"
+
+
+def test_hide_extract_with_password(service):
+    _, hidden = _json(service, '/hide/zero-width', {"cover": COVER, "secret": "abc", "password": "pw"})
+    assert _json(service, '/extract/zero-width', {"text": hidden["result"], "password": "pw"}) == (200, {"result": "abc"})
+    assert _json(service, '/extract/zero-width', {"text": hidden["result"], "password": "sai"})[0] == 422
+
+
+def test_detect(service):
+    status, result = _json(service, '/detect', {"text": "a\u200Bb"})
+    assert status == 200 and result["result"]["has_zero_width"] is True
+
+
+def test_errors(service):
+    assert _json(service, '/extract/zero-width', {"text": COVER})[0] == 404
+    assert _json(service, '/hide/unicode', {"cover": "abc", "secret": "quá dài"})[0] == 422
+    assert _json(service, '/hide/zero-width', {"cover": 5, "secret": "x"})[0] == 400
+    assert _request(service, '/hide/zero-width', b'{', headers=[('content-type', 'application/json')])[0] == 400
+    assert _request(service, '/detect', b'\xff')[0] == 400
+    assert _request(service, '/nope')[0] == 404
+    assert _request(service, '/detect', method='GET')[0] == 405
+    assert _request(service, '/detect', b'x' * (64 * 1024 + 1))[0] == 413
+    assert _request(service, '/detect', headers=[('content-length', str(10 ** 9))])[0] == 413
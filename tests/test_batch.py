@@ -0,0 +1,88 @@
+import io
+import json
+import os
+
+import pytest
+
+from src import batch
+
+COVER = "The quick brown fox jumps over the lazy dog. " * 40
+
+
+@pytest.fixture
+def covers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in ('a.txt', 'b.txt'):
+        (tmp_path / name).write_text(COVER, encoding='utf-8', newline='')
+    return tmp_path
+
+
+def _write_jsonl(path, rows):
+    path.write_text(''.join((row if isinstance(row, str) else json.dumps(row)) + '\n' for row in rows),
+                    encoding='utf-8')
+
+
+def _run(action, manifest, output_dir):
+    errors = io.StringIO()
+    stats = batch.run_batch(action, str(manifest), str(output_dir), workers=1, chunk_size=1,
+                            errors=errors, progress=None)
+    return stats, [json.loads(line) for line in errors.getvalue().splitlines()]
+
+
+def test_hide_extract_round_trip_and_resume(covers):
+    manifest = covers / 'hide.csv'
+    manifest.write_text("cover,payload,method,password\n"
+                        "a.txt,bí mật a,zero-width,\n"
+                        "b.txt,bí mật b,unicode,pw\n", encoding='utf-8')
+    stats, errors = _run('hide', manifest, covers / 'out')
+    assert (stats.done, stats.failed, errors) == (2, 0, [])
+
+    _write_jsonl(covers / 'extract.jsonl', [
+        {"cover": "out/a.txt", "method": "zero-width", "output": "msg/a.txt"},
+        {"cover": "out/b.txt", "method": "unicode", "password": "pw", "output": "msg/b.txt"},
+    ])
+    stats, errors = _run('extract', covers / 'extract.jsonl', covers)
+    assert stats.done == 2 and errors == []
+    assert (covers / 'msg' / 'a.txt').read_text(encoding='utf-8') == "bí mật a"
+    assert (covers / 'msg' / 'b.txt').read_text(encoding='utf-8') == "bí mật b"
+
+    # Chạy lại bỏ qua các file kết quả đã có
+    stats, _ = _run('hide', manifest, covers / 'out')
+    assert (stats.done, stats.skipped) == (0, 2)
+
+
+def test_output_equal_to_cover_is_rejected(covers):
+    manifest = covers / 'hide.jsonl'
+    _write_jsonl(manifest, [
+        {"cover": "a.txt", "payload": "x", "method": "zero-width"},
+        {"cover": "b.txt", "payload": "x", "method": "zero-width", "output": "./b.txt"},
+    ])
+    stats, errors = _run('hide', manifest, '.')
+    assert (stats.done, stats.skipped, stats.failed) == (0, 0, 2)
+    assert all("trùng với file cover" in error["error"] for error in errors)
+    assert (covers / 'b.txt').read_text(encoding='utf-8') == COVER
+
+
+def test_invalid_rows_do_not_stop_the_run(covers):
+    manifest = covers / 'hide.jsonl'
+    _write_jsonl(manifest, [
+        '{"cover": "a.txt", "payload": ',
+        {"cover": 5, "payload": "x", "method": "zero-width"},
+        ["not", "an", "object"],
+        {"cover": "a.txt", "payload": "x", "method": "nope"},
+        {"cover": "missing.txt", "payload": "x", "method": "zero-width"},
+        {"cover": "a.txt", "payload": "x", "method": "unicode", "seed": "abc"},
+        {"cover": "a.txt", "payload": "quá dài " * 400, "method": "unicode"},
+        {"cover": "b.txt", "payload": "ok", "method": "zero-width"},
+    ])
+    stats, errors = _run('hide', manifest, covers / 'out')
+    assert (stats.done, stats.failed) == (1, 7)
+    assert sorted(error["line"] for error in errors) == [1, 2, 3, 4, 5, 6, 7]
+    assert os.path.exists(covers / 'out' / 'b.txt')
+    assert not os.path.exists(covers / 'out' / 'a.txt')
+
+
+def test_cli_requires_output_dir(covers, capsys):
+    with pytest.raises(SystemExit):
+        batch.main(['hide', 'manifest.csv'])
+    assert '--output-dir' in capsys.readouterr().err
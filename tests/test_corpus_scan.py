@@ -0,0 +1,46 @@
+import io
+import json
+
+from src import corpus_scan
+from src.analyzer import scan_text
+
+TEXT = "Một đoạn văn bản dài có nhiều từ, và\tkhoảng trắng\nkhác nhau. Ηomoglyph \u200B ở đây. " * 30
+
+
+def _without_counts(stats):
+    return {key: value for key, value in stats.items() if key != "char_counts"}
+
+
+def test_scan_stream_matches_whole_text():
+    for chunk_size in (1, 7, 100, len(TEXT)):
+        stats = corpus_scan.scan_stream(io.StringIO(TEXT), chunk_size)
+        assert _without_counts(stats) == _without_counts(scan_text(TEXT))
+
+
+def test_scan_file_without_whitespace_is_bounded(tmp_path):
+    # Một "từ" dài 8 MB: từ dang dở không được nối dài mãi (trước đây tốn thời gian bậc hai)
+    text = ("a\u200b" + "b" * 1022) * 8192
+    path = tmp_path / 'nospace.txt'
+    path.write_text(text, encoding='utf-8')
+    record = corpus_scan.scan_file(str(path), chunk_size=4096)
+    assert record["chars"] == len(text)
+    assert record["zero_width_count"] == 8192
+
+    stats = corpus_scan.scan_chunks(iter([text[i:i + 4096] for i in range(0, len(text), 4096)]), 4096)
+    assert stats["total_chars"] == len(text)
+    assert stats["short_words"] == 0
+
+
+def test_scan_corpus_writes_one_record_per_file(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'a.txt').write_text(TEXT, encoding='utf-8')
+    (tmp_path / 'sub' / 'b.txt').write_text("plain text only", encoding='utf-8')
+    (tmp_path / 'empty.txt').write_bytes(b'')
+
+    output = io.StringIO()
+    assert corpus_scan.scan_corpus(str(tmp_path), output, workers=2, chunk_size=64) == 3
+    records = {json.loads(line)["path"]: json.loads(line) for line in output.getvalue().splitlines()}
+    a = records[str(tmp_path / 'a.txt')]
+    assert a["zero_width_count"] == 30 and a["chars"] == len(TEXT)
+    assert not records[str(tmp_path / 'sub' / 'b.txt')]["has_zero_width"]
+    assert records[str(tmp_path / 'empty.txt')]["bytes"] == 0
@@ -0,0 +1,136 @@
+import base64
+
+import pytest
+
+from src.encryption import COMPACT_FORMAT_VERSION, Encryptor, KeyCache
+
+
+@pytest.fixture
+def encryptor():
+    # Ít vòng lặp PBKDF2 để test chạy nhanh
+    encryptor = Encryptor()
+    encryptor.iterations = 1000
+    return encryptor
+
+
+def test_key_cache_hits_and_misses():
+    cache = KeyCache(maxsize=2)
+    calls = []
+
+    def derive():
+        calls.append(1)
+        return b'key'
+
+    assert cache.get_or_derive('pw', b'salt', 1000, derive) == b'key'
+    assert cache.get_or_derive('pw', b'salt', 1000, derive) == b'key'
+    assert len(calls) == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_key_cache_evicts_least_recently_used():
+    cache = KeyCache(maxsize=2)
+    for password in ('a', 'b', 'c'):
+        cache.get_or_derive(password, b'salt', 1000, lambda: password.encode())
+    assert len(cache) == 2
+    calls = []
+    cache.get_or_derive('a', b'salt', 1000, lambda: calls.append(1) or b'a')
+    assert calls == [1]
+
+
+def test_key_cache_ttl_and_disabled():
+    calls = []
+
+    def derive():
+        calls.append(1)
+        return b'key'
+
+    expired = KeyCache(ttl=0)
+    expired.get_or_derive('pw', b'salt', 1000, derive)
+    expired.get_or_derive('pw', b'salt', 1000, derive)
+    disabled = KeyCache(maxsize=0)
+    disabled.get_or_derive('pw', b'salt', 1000, derive)
+    assert len(calls) == 3
+    assert len(disabled) == 0
+
+
+def test_key_cache_does_not_store_password():
+    cache = KeyCache()
+    cache.get_or_derive('mật khẩu', b'salt', 1000, lambda: b'key')
+    digest, salt, iterations = next(iter(cache._entries))
+    assert b'm\xe1\xba\xadt' not in digest and (salt, iterations) == (b'salt', 1000)
+
+
+def test_encrypt_decrypt_uses_cached_key(encryptor):
+    token = encryptor.encrypt("bí mật", "pw")
+    assert encryptor.decrypt(token, "pw") == "bí mật"
+    assert encryptor.key_cache.stats()["misses"] == 1
+
+
+def test_decrypt_wrong_password(encryptor):
+    token = encryptor.encrypt("bí mật", "pw")
+    with pytest.raises(ValueError):
+        encryptor.decrypt(token, "sai")
+
+
+def test_encrypt_many_round_trip(encryptor):
+    messages = ["một", "", "ba"]
+    tokens = encryptor.encrypt_many(messages, "pw")
+    assert tokens[1] == ""
+    assert tokens[0] != encryptor.encrypt_many(messages, "pw")[0]  # salt và nonce ngẫu nhiên
+    assert encryptor.decrypt_many(tokens, "pw") == messages
+    # Khóa của lô không được đưa vào bộ nhớ đệm dùng chung
+    assert encryptor.key_cache.stats() == {"hits": 0, "misses": 0, "size": 0}
+
+
+def test_batch_runs_pbkdf2_once_per_batch(monkeypatch):
+    encryptor = Encryptor(key_cache=KeyCache(maxsize=0))
+    encryptor.iterations = 1000
+    calls = []
+    derive = encryptor._derive_key
+    monkeypatch.setattr(encryptor, '_derive_key', lambda *args: calls.append(args) or derive(*args))
+
+    tokens = encryptor.encrypt_many(["một", "hai", "ba"], "pw")
+    assert len(calls) == 1
+    # Hai lô trong cùng một lần gọi: mỗi lô một lần PBKDF2 dù bộ nhớ đệm bị tắt
+    other = encryptor.encrypt_many(["bốn"], "pw")
+    del calls[:]
+    assert encryptor.decrypt_many(tokens + other + tokens, "pw") == ["một", "hai", "ba", "bốn", "một", "hai", "ba"]
+    assert len(calls) == 2
+
+
+def test_decrypt_many_rejects_tampered_header(encryptor):
+    blob = bytearray(base64.urlsafe_b64decode(encryptor.encrypt_many(["abc"], "pw")[0]))
+    blob[20] ^= 1
+    with pytest.raises(ValueError):
+        encryptor.decrypt(base64.urlsafe_b64encode(bytes(blob)).decode(), "pw")
+    with pytest.raises(ValueError):
+        encryptor.decrypt_many(encryptor.encrypt_many(["abc"], "pw"), "sai")
+
+
+def test_decrypt_many_accepts_legacy_tokens(encryptor):
+    tokens = [encryptor.encrypt("cũ", "pw")] + encryptor.encrypt_many(["mới"], "pw")
+    assert encryptor.decrypt_many(tokens, "pw") == ["cũ", "mới"]
+
+
+def test_encrypt_bytes_compact_round_trip(encryptor):
+    blob = encryptor.encrypt_bytes("thông điệp", "pw")
+    assert blob[0] == COMPACT_FORMAT_VERSION
+    # header 33 byte + bản rõ + tag 16 byte, không qua base64
+    assert len(blob) == 33 + len("thông điệp".encode('utf-8')) + 16
+    # Bỏ qua dữ liệu thừa phía sau (ví dụ bit 0 do UnicodeSteg trích xuất thêm)
+    assert encryptor.decrypt_bytes(blob + b'\x00' * 5, "pw") == "thông điệp"
+
+
+def test_decrypt_bytes_errors(encryptor):
+    blob = encryptor.encrypt_bytes("abc", "pw")
+    with pytest.raises(ValueError):
+        encryptor.decrypt_bytes(blob, "sai")
+    with pytest.raises(ValueError):
+        encryptor.decrypt_bytes(blob[:-1], "pw")
+    assert encryptor.encrypt_bytes("", "pw") == b""
+    assert encryptor.decrypt_bytes(b"", "pw") == ""
+
+
+def test_decrypt_bytes_accepts_base64_tokens(encryptor):
+    token = encryptor.encrypt("cũ", "pw").encode('utf-8')
+    assert encryptor.decrypt_bytes(token + b'\x00\x00', "pw") == "cũ"
@@ -0,0 +1,75 @@
+import glob
+import os
+
+import pytest
+
+from src import instrumentation
+from src.unicode_steg import UnicodeSteg
+from src.zero_width_steg import ZeroWidthSteg
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    """Bật instrumentation trong một test rồi trả lại trạng thái ban đầu (cả biến môi trường do configure() đặt)"""
+    for name in ('STEG_METRICS', 'STEG_METRICS_FILE', 'STEG_PROFILE_DIR', 'STEG_PROFILE_RATE'):
+        # delenv không ghi nhận gì nếu biến chưa đặt; setenv trước để biến được xóa lại sau test
+        monkeypatch.setenv(name, '')
+        monkeypatch.delenv(name)
+    for name in ('_metrics_file', '_profile_dir', '_profile_rate'):
+        monkeypatch.setattr(instrumentation, name, getattr(instrumentation, name))
+    instrumentation.registry.reset()
+    instrumentation.enable()
+    yield instrumentation.registry
+    instrumentation.enable(False)
+    instrumentation.registry.reset()
+
+
+def test_registry_buckets_and_prometheus():
+    registry = instrumentation.MetricsRegistry(buckets=(0.1, 1.0))
+    registry.observe('a', 0.05)
+    registry.observe('a', 0.5, error=True)
+    registry.observe('a', 5.0)
+    registry.increment('hits', 2)
+
+    span = registry.snapshot()["spans"]["a"]
+    assert span["count"] == 3 and span["errors"] == 1
+    assert list(span["buckets"].values()) == [1, 2, 3]
+    assert registry.snapshot()["counters"] == {"hits": 2}
+
+    text = registry.to_prometheus({"pid": 1})
+    assert 'steg_span_seconds_bucket{pid="1",span="a",le="+Inf"} 3' in text
+    assert 'steg_span_errors_total{pid="1",span="a"} 1' in text
+    assert 'steg_events_total{pid="1",name="hits"} 2' in text
+
+
+def test_span_installed_only_when_enabled(metrics):
+    steg = ZeroWidthSteg()
+    steg.encode_bytes(b'abc')
+    assert metrics.snapshot()["spans"]["zero_width.encode_bytes"]["count"] == 1
+
+    instrumentation.enable(False)
+    # Khi tắt, hàm gốc được đặt lại (không còn lớp bọc)
+    assert not hasattr(ZeroWidthSteg.encode_bytes, '__wrapped__')
+    steg.encode_bytes(b'abc')
+    assert metrics.snapshot()["spans"]["zero_width.encode_bytes"]["count"] == 1
+
+
+def test_span_counts_errors(metrics):
+    with pytest.raises(ValueError):
+        UnicodeSteg().hide_bytes("abc", b'xyz')
+    assert metrics.snapshot()["spans"]["unicode.embed_bytes"]["errors"] == 1
+
+
+def test_metrics_file_and_profiles(metrics, tmp_path):
+    instrumentation.configure(metrics_file=str(tmp_path / 'steg-{pid}.prom'),
+                              profile_dir=str(tmp_path / 'profiles'), profile_rate=1.0)
+    instrumentation.export()
+    assert os.path.exists(tmp_path / f'steg-{os.getpid()}.prom')
+
+    @instrumentation.profiled('test')
+    def work():
+        return sum(range(100))
+
+    assert work() == 4950
+    assert len(glob.glob(str(tmp_path / 'profiles' / 'test-*.pstats'))) == 1
+    assert metrics.snapshot()["counters"]["profiles_written"] == 1
@@ -0,0 +1,25 @@
+import subprocess
+import sys
+
+from src.lazy import LazyModule, lazy_import, loaded_modules
+
+
+def test_lazy_module_loads_on_first_attribute():
+    module = LazyModule('json')
+    assert not module.loaded
+    assert module.dumps([1]) == '[1]'
+    assert module.loaded and 'đã nạp' in repr(module)
+
+
+def test_lazy_import_is_shared():
+    assert lazy_import('colorsys') is lazy_import('colorsys')
+    assert 'colorsys' not in loaded_modules()
+    lazy_import('colorsys').rgb_to_hsv(0, 0, 0)
+    assert 'colorsys' in loaded_modules()
+
+
+def test_importing_codecs_does_not_load_heavy_modules():
+    code = ("import sys, src.jobs; "
+            "print(','.join(m for m in ('numpy', 'matplotlib', 'cryptography') if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
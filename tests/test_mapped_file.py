@@ -0,0 +1,55 @@
+from src import mapped_file
+from src.analyzer import scan_text
+from src.corpus_scan import scan_file
+from src.zero_width_steg import ZeroWidthSteg
+
+TEXT = "Văn bản Ηomoglyph và ký tự ẩn \u200B\u200C\u200D ở giữa. " * 50
+
+
+def test_iter_text_rejoins_split_characters():
+    data = TEXT.encode('utf-8')
+    for chunk_size in (1, 2, 5, 1000):
+        assert ''.join(mapped_file.iter_text(data, chunk_size)) == TEXT
+    assert ''.join(mapped_file.iter_text(data, 3, start=len("Văn ".encode('utf-8')))) == TEXT[4:]
+
+
+def test_count_markers_matches_scan_text():
+    stats = scan_text(TEXT)
+    assert mapped_file.count_markers(TEXT.encode('utf-8')) == {
+        "zero_width_count": stats["zero_width_count"],
+        "homoglyph_count": stats["homoglyph_count"],
+    }
+
+
+def test_count_markers_every_alphabet():
+    for bits in (1, 2, 4, 8):
+        stego = ZeroWidthSteg(bits_per_symbol=bits).hide("Văn bản gốc.", "bí mật")
+        markers = mapped_file.count_markers(stego.encode('utf-8'))
+        assert markers["zero_width_count"] == scan_text(stego)["zero_width_count"] == len(stego) - len("Văn bản gốc.")
+
+
+def test_open_mapped_empty_file(tmp_path):
+    path = tmp_path / 'empty.txt'
+    path.write_bytes(b'')
+    with mapped_file.open_mapped(path) as buffer:
+        assert buffer == b''
+
+
+def test_extract_file_round_trip(tmp_path):
+    steg = ZeroWidthSteg()
+    path = tmp_path / 'stego.txt'
+    path.write_text(steg.hide(TEXT.replace('\u200B\u200C\u200D', ''), "bí mật trong file"), encoding='utf-8')
+    assert steg.extract_file(path, chunk_size=7) == "bí mật trong file"
+
+    path.write_text("không có gì", encoding='utf-8')
+    assert steg.extract_file(path) == "Không tìm thấy thông điệp bí mật"
+
+
+def test_scan_file_markers_only(tmp_path):
+    path = tmp_path / 'doc.txt'
+    path.write_text(TEXT, encoding='utf-8')
+    full = scan_file(str(path), chunk_size=11)
+    markers = scan_file(str(path), markers_only=True)
+    assert markers["zero_width_count"] == full["zero_width_count"] == 150
+    assert markers["homoglyph_count"] == full["homoglyph_count"]
+    assert "error" in scan_file(str(tmp_path / 'missing.txt'))
@@ -0,0 +1,71 @@
+from src.morse_steg import MorseSteg
+
+
+def _steg():
+    steg = MorseSteg()
+    steg.load_word_lists()
+    return steg
+
+
+def test_lowercase_message_uses_plain_morse():
+    steg = _steg()
+    assert steg.encode_payload("hello world") == "hello world"
+    assert steg.extract(steg.hide("hello world", seed=1)) == "HELLO WORLD"
+    # Văn bản ẩn không bị phóng to bởi dạng hex
+    assert len(steg.hide("hello", seed=1)) < len(steg.hide("héllo", seed=1)) / 3
+
+
+def test_non_morse_message_is_framed():
+    steg = _steg()
+    for message in ("Xin chào!", "straße", "a\nb"):
+        assert steg.encode_payload(message) != message
+        assert steg.extract(steg.hide(message, seed=2)) == message
+
+
+def test_seed_is_deterministic_and_chunk_independent():
+    steg = _steg()
+    message = "SEED TEST 123"
+    text = steg.hide(message, seed=42)
+    assert steg.hide(message, seed=42) == text
+    assert ''.join(steg.iter_hide(message, seed=42, chunk_symbols=3)) == text
+    assert steg.extract(text) == message
+
+
+def test_hide_uses_loaded_word_lists():
+    steg = _steg()
+    words = set(steg.hide("SOS", seed=0).replace(',', ' ').replace('.', ' ').split())
+    assert words <= set(steg.short_words) | set(steg.long_words)
+
+
+def test_decoder_feed_in_small_chunks():
+    steg = _steg()
+    message = "HELLO WORLD 42"
+    text = steg.hide(message, seed=3)
+    for size in (1, 2, 7, len(text)):
+        decoder = steg.decoder()
+        decoded = ''.join(decoder.feed(text[i:i + size]) for i in range(0, len(text), size))
+        assert decoded + decoder.close() == message
+
+
+def test_decoder_bounds_words_without_separators():
+    steg = _steg()
+    texts = ["at " + "x" * 100000 + " , in , about .",
+             "at " + ";" * 5000 + "ab" + ";" * 5000 + " , a , " + "!" * 5000 + "b" + ";" * 3000 + "c ,",
+             "at ; , ;;ab ,"]
+    for text in texts:
+        expected = steg.decoder()
+        expected = expected.feed(text) + expected.close()
+        for size in (1, 7, 1000):
+            decoder = steg.decoder()
+            decoded = ''
+            for i in range(0, len(text), size):
+                decoded += decoder.feed(text[i:i + size])
+                assert len(decoder._pending) <= 64 + size
+            assert decoded + decoder.close() == expected
+
+
+def test_decoder_skips_invalid_codes():
+    steg = _steg()
+    # Sáu từ dài liên tiếp không phải mã hợp lệ
+    assert steg.extract("about above across always another because , at about") == "A"
+    assert steg.extract("") == ""
@@ -0,0 +1,79 @@
+import pytest
+
+from src import payload
+
+
+@pytest.mark.parametrize('data', [b'', b'abc', bytes(range(256)) * 3])
+def test_pack_unpack_round_trip(data):
+    blob = payload.pack(data)
+    assert blob[0] == payload.MAGIC
+    assert payload.unpack(blob) == data
+    # Dữ liệu thừa phía sau bị bỏ qua
+    assert payload.unpack(blob + b'\x00\x00') == data
+
+
+def test_unpack_errors():
+    blob = payload.pack(b'hello')
+    with pytest.raises(ValueError):
+        payload.unpack(b'hello')
+    with pytest.raises(ValueError):
+        payload.unpack(blob[:-1])
+    with pytest.raises(ValueError):
+        payload.unpack(blob[:-1] + b'x')
+    with pytest.raises(ValueError):
+        payload.unpack(bytes([payload.MAGIC]) + b'\xff' * 11)
+
+
+def test_text_round_trip_non_latin1():
+    assert payload.unpack(payload.encode_text("Tiếng Việt ✓")).decode('utf-8') == "Tiếng Việt ✓"
+    assert payload.decode_text("é".encode('utf-8')) == "é"
+    assert payload.decode_text(b'\xe9') == "é"
+
+
+def test_bits_round_trip():
+    assert payload.bytes_to_bits(b'\x01\x80') == '0000000110000000'
+    assert payload.bits_to_bytes('0000000110000000101') == b'\x01\x80'
+    assert payload.bytes_to_bits(b'') == '' and payload.bits_to_bytes('101') == b''
+
+
+def _feed_all(data, size):
+    unpacker = payload.StreamUnpacker()
+    out = b''.join(unpacker.feed(data[i:i + size]) for i in range(0, len(data), size))
+    return out + unpacker.close()
+
+
+@pytest.mark.parametrize('size', [1, 3, 1000])
+def test_stream_unpacker(size):
+    data = "Thông điệp".encode('utf-8') * 20
+    assert _feed_all(payload.pack(data) + b'\x00' * 7, size) == data
+    # Dữ liệu không đóng khung được trả về nguyên vẹn
+    assert _feed_all(data, size) == data
+    assert _feed_all(b'\xf5', size) == b'\xf5'
+
+
+def test_stream_unpacker_detects_corruption():
+    blob = bytearray(payload.pack(b'hello world'))
+    blob[-1] ^= 1
+    with pytest.raises(ValueError):
+        _feed_all(bytes(blob), 2)
+    with pytest.raises(ValueError):
+        _feed_all(payload.pack(b'hello world')[:-2], 2)
+
+
+@pytest.mark.parametrize('size', [1, 3, 1000])
+def test_stream_frame_round_trip(size):
+    data = bytes([payload.MAGIC]) + "Thông điệp".encode('utf-8') * 20
+    blob = b''.join(payload.iter_pack_stream([data[:5], data[5:]]))
+    assert blob[0] == payload.STREAM_MAGIC
+    assert _feed_all(blob, size) == data
+    assert payload.unpack(blob) == data
+
+
+def test_stream_frame_detects_corruption():
+    blob = b''.join(payload.iter_pack_stream([b'hello']))
+    with pytest.raises(ValueError):
+        _feed_all(blob[:-1] + b'x', 2)
+    with pytest.raises(ValueError):
+        _feed_all(blob[:3], 1)
+    with pytest.raises(ValueError):
+        payload.unpack(blob[:-1])
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from src import text_diff
+from src.analyzer import StegAnalyzer
+from src.zero_width_steg import ZeroWidthSteg
+
+
+def _apply(original, modified, runs):
+    """Dựng lại văn bản đã sửa từ văn bản gốc và các đoạn khác nhau"""
+    parts = []
+    position = 0
+    for run in runs:
+        parts.append(original[position:run["original_start"]])
+        parts.append(modified[run["modified_start"]:run["modified_end"]])
+        position = run["original_end"]
+    parts.append(original[position:])
+    return ''.join(parts)
+
+
+@pytest.mark.parametrize('original, modified, expected', [
+    ("abc", "abc", []),
+    ("abc", "aXbc", [("insert", 1, 1, 1, 2)]),
+    ("abc", "ac", [("delete", 1, 2, 1, 1)]),
+    ("abc", "aXc", [("substitute", 1, 2, 1, 2)]),
+    ("", "xyz", [("insert", 0, 0, 0, 3)]),
+])
+def test_small_edits(original, modified, expected):
+    runs = text_diff.diff_runs(original, modified)
+    assert [(run["type"], run["original_start"], run["original_end"],
+             run["modified_start"], run["modified_end"]) for run in runs] == expected
+    assert not runs.approximate
+
+
+def test_runs_rebuild_modified_text():
+    rng = random.Random(0)
+    original = ''.join(rng.choice('abcde ') for _ in range(5000))
+    chars = list(original)
+    for _ in range(40):
+        position = rng.randrange(len(chars))
+        rng.choice([lambda: chars.insert(position, 'Z'), lambda: chars.pop(position),
+                    lambda: chars.__setitem__(position, 'Y')])()
+    modified = ''.join(chars)
+    assert _apply(original, modified, text_diff.diff_runs(original, modified)) == modified
+
+
+def test_dense_substitutions_matched_by_position():
+    original = "abcdefgh" * 1000
+    modified = ''.join(char.upper() if i % 7 == 0 else char for i, char in enumerate(original))
+    runs = text_diff.diff_runs(original, modified)
+    assert all(run["type"] == "substitute" for run in runs)
+    assert sum(run["original_end"] - run["original_start"] for run in runs) == len(range(0, len(original), 7))
+
+
+def test_dense_insertions_are_not_reported_as_substitution():
+    # Hồi quy: vượt MAX_SNAKE_STEPS từng làm cả vùng thành một đoạn thay thế
+    rng = random.Random(0)
+    words = "the quick brown fox jumps over lazy dog hidden text cover".split()
+    chosen = [rng.choice(words) for _ in range(20000)]
+    cover = ' '.join(chosen)
+    # Một ký tự ẩn sau mỗi ba từ: đủ dày để vượt giới hạn bước của Myers
+    stego = ' '.join(word + rng.choice('\u200B\u200D') if i % 3 == 0 else word for i, word in enumerate(chosen))
+
+    results = StegAnalyzer().analyze_text_changes(cover, stego)
+    assert results["approximate"]
+    assert results["inserted_chars"] == len(stego) - len(cover)
+    assert results["deleted_chars"] == results["substituted_chars"] == 0
+    assert _apply(cover, stego, results["changes"]) == stego
+
+
+@pytest.mark.parametrize('bits', [1, 8])
+def test_distributed_zero_width_is_pure_insertion(bits):
+    # Các đoạn ẩn phân tán nằm ở cuối các từ: văn bản gốc chỉ bị chèn thêm, không bị sửa
+    cover = "Một hai ba bốn năm sáu bảy tám chín mười. " * 500
+    stego = ZeroWidthSteg(bits_per_symbol=bits, distribute=True, key='khóa').hide(cover, "bí mật " * 200)
+
+    results = StegAnalyzer().analyze_text_changes(cover, stego)
+    assert results["inserted_chars"] == len(stego) - len(cover)
+    assert results["deleted_chars"] == results["substituted_chars"] == 0
+    assert all(change["type"] == "insert" for change in results["changes"])
+    assert _apply(cover, stego, results["changes"]) == stego
+
+
+def test_unrelated_texts_stay_linear():
+    rng = random.Random(1)
+    a = ''.join(rng.choice('ab ') for _ in range(50000))
+    b = ''.join(rng.choice('xy ') for _ in range(50000))
+    runs = text_diff.diff_runs(a, b)
+    assert runs.approximate
+    assert _apply(a, b, runs) == b
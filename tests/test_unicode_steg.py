@@ -0,0 +1,66 @@
+import pytest
+
+from src import payload
+from src.unicode_steg import UnicodeSteg
+
+COVER = "The quick brown fox jumps over the lazy dog. " * 20
+
+
+def test_hide_extract_round_trip():
+    steg = UnicodeSteg()
+    stego = steg.hide(COVER, "Xin chào")
+    assert len(stego) == len(COVER) and stego != COVER
+    assert steg.extract(stego) == "Xin chào"
+
+
+def test_hide_bytes_matches_per_character_embedding():
+    steg = UnicodeSteg()
+    data = b'\xa5\x0f'
+    bits = payload.bytes_to_bits(data)
+    expected = []
+    for char in COVER:
+        if char in steg.similar_chars and bits:
+            expected.append(steg.similar_chars[char] if bits[0] == '1' else char)
+            bits = bits[1:]
+        else:
+            expected.append(char)
+    assert steg.hide_bytes(COVER, data) == ''.join(expected)
+    assert steg.extract_bytes(steg.hide_bytes(COVER, data))[:2] == data
+
+
+def test_extract_ignores_unrelated_characters():
+    steg = UnicodeSteg()
+    stego = steg.hide(COVER, "abc")
+    assert steg.extract("日本 " + stego + " ✓") == "abc"
+
+
+def test_cover_index_reuse_and_capacity():
+    steg = UnicodeSteg()
+    index = steg.build_index(COVER)
+    assert index.cover_text == COVER
+    assert index.capacity_bits == sum(char in steg.similar_chars for char in COVER)
+    assert index.capacity_bytes == index.capacity_bits // 8
+    first = steg.hide(index, "một")
+    second = steg.hide(index, "hai")
+    assert steg.extract(first) == "một" and steg.extract(second) == "hai"
+    # Chỉ mục không bị thay đổi sau khi ẩn
+    assert index.cover_text == COVER
+
+
+def test_cover_index_save_load(tmp_path):
+    steg = UnicodeSteg()
+    index = steg.build_index(COVER)
+    index.save(tmp_path / 'cover.npz')
+    loaded = type(index).load(tmp_path / 'cover.npz')
+    assert (loaded.positions == index.positions).all()
+    assert steg.extract(steg.hide(loaded, "abc")) == "abc"
+
+
+def test_cover_too_short_raises():
+    steg = UnicodeSteg()
+    index = steg.build_index("abc")
+    assert not index.fits(1)
+    with pytest.raises(ValueError):
+        steg.hide(index, "thông điệp dài")
+    with pytest.raises(ValueError):
+        steg.hide_bytes("abc", b'xyz')
@@ -0,0 +1,63 @@
+import os
+import stat
+
+import pytest
+
+from src import word_lists
+from src.morse_steg import MorseSteg
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'words.txt'
+    path.write_text("a\nan\nan\nhello\nworld\nbad word\nx,y\n\nvăn\nthông\n", encoding='utf-8')
+    return path
+
+
+def test_compile_dedupes_and_splits(source, tmp_path):
+    compiled = word_lists.load_word_lists(source, tmp_path / 'cache')
+    assert list(compiled.short) == ['a', 'an', 'văn']
+    assert list(compiled.long) == ['hello', 'world', 'thông']
+    assert list(compiled.long.take([2, 0, 2])) == ['thông', 'hello', 'thông']
+    with pytest.raises(IndexError):
+        compiled.short[3]
+
+
+def test_recompiles_when_source_changes(source, tmp_path):
+    cache = tmp_path / 'cache'
+    word_lists.load_word_lists(source, cache)
+    source.write_text("abcd\n", encoding='utf-8')
+    os.utime(source, ns=(1, 1))
+    compiled = word_lists.load_word_lists(source, cache)
+    assert list(compiled.short) == [] and list(compiled.long) == ['abcd']
+
+
+def test_touched_source_is_hashed_once(source, tmp_path, monkeypatch):
+    cache = tmp_path / 'cache'
+    word_lists.load_word_lists(source, cache)
+    os.utime(source, ns=(10**18, 10**18))
+    calls = []
+    hash_file = word_lists._hash_file
+    monkeypatch.setattr(word_lists, '_hash_file', lambda path: calls.append(path) or hash_file(path))
+
+    word_lists._loaded.clear()
+    word_lists.load_word_lists(source, cache)
+    word_lists._loaded.clear()
+    compiled = word_lists.load_word_lists(source, cache)
+    assert len(calls) == 1
+    assert compiled.source_mtime_ns == 10**18
+
+
+def test_default_cache_dir_is_private(source, tmp_path, monkeypatch):
+    cache = tmp_path / 'xdg' / 'wordlists'
+    monkeypatch.setattr(word_lists, 'DEFAULT_CACHE_DIR', str(cache))
+    word_lists.load_word_lists(source)
+    assert stat.S_IMODE(os.stat(cache).st_mode) == 0o700
+    assert os.path.exists(word_lists.cache_path_for(source))
+
+
+def test_morse_steg_uses_compiled_lists(source, tmp_path, monkeypatch):
+    monkeypatch.setattr(word_lists, 'DEFAULT_CACHE_DIR', str(tmp_path / 'cache'))
+    steg = MorseSteg()
+    steg.load_word_lists(source, source)
+    assert steg.extract(steg.hide("HI", seed=1)) == "HI"
@@ -0,0 +1,188 @@
+import io
+
+import pytest
+
+from src import payload
+from src.zero_width_steg import ALPHABET_HEADERS, ALPHABETS, HIDDEN_CHARS, MIN_SEGMENT_SYMBOLS, SEGMENT_MARK, ZeroWidthSteg
+
+COVER = "Đây là văn bản gốc dùng để thử nghiệm."
+
+
+def test_encode_decode_bytes_round_trip():
+    steg = ZeroWidthSteg()
+    data = bytes(range(256))
+    hidden = steg.encode_bytes(data)
+    assert len(hidden) == len(data) * 8
+    assert set(hidden) <= {steg.zwsp, steg.zwj}
+    assert steg.decode_bytes(hidden) == data
+
+
+def test_encode_bytes_matches_bit_string():
+    steg = ZeroWidthSteg()
+    hidden = steg.encode_bytes(b'\xa5')
+    bits = ''.join('1' if char == steg.zwj else '0' for char in hidden)
+    assert bits == '10100101'
+
+
+def test_hide_extract_round_trip():
+    steg = ZeroWidthSteg()
+    stego = steg.hide(COVER, "Thông điệp bí mật")
+    assert stego.replace(steg.zwsp, '').replace(steg.zwj, '').replace(steg.zwnj, '') == COVER
+    assert steg.extract(stego) == "Thông điệp bí mật"
+
+
+def test_extract_legacy_unframed_text():
+    steg = ZeroWidthSteg()
+    legacy = COVER[0] + steg.zwnj + steg.encode_bytes(b'secret') + steg.zwnj + COVER[1:]
+    assert steg.extract(legacy) == 'secret'
+
+
+def test_extract_ignores_stray_characters():
+    steg = ZeroWidthSteg()
+    stego = steg.hide(COVER, "abc")
+    start = stego.index(steg.zwnj) + 5
+    assert steg.extract(stego[:start] + 'x' + stego[start:]) == "abc"
+
+
+def test_extract_without_message():
+    steg = ZeroWidthSteg()
+    assert steg.extract_bytes(COVER) is None
+    assert steg.extract(COVER) == "Không tìm thấy thông điệp bí mật"
+    assert steg.extract('') == "Văn bản không được để trống"
+    assert steg.hide('', 'abc') == "Văn bản gốc và thông điệp bí mật không được để trống"
+
+
+def test_hide_bytes_is_unframed():
+    steg = ZeroWidthSteg()
+    assert steg.extract_bytes(steg.hide_bytes(COVER, b'\x00\xff')) == b'\x00\xff'
+    assert payload.unpack(steg.extract_bytes(steg.hide(COVER, 'x'))) == b'x'
+
+
+def test_stream_round_trip_small_chunks():
+    steg = ZeroWidthSteg()
+    secret = "Thông điệp dài " * 50
+    output = io.StringIO()
+    steg.hide_stream(io.StringIO(COVER * 20), io.StringIO(secret), output, chunk_size=7)
+    stego = output.getvalue()
+    assert steg.extract(stego) == secret
+
+    extracted = io.StringIO()
+    assert steg.extract_stream(io.StringIO(stego), extracted, chunk_size=5) == len(secret.encode('utf-8'))
+    assert extracted.getvalue() == secret
+
+
+def test_extract_stream_framed_payload():
+    steg = ZeroWidthSteg()
+    stego = steg.hide(COVER, "xin chào")
+    output = io.StringIO()
+    steg.extract_stream(io.StringIO(stego), output, chunk_size=3)
+    assert output.getvalue() == "xin chào"
+
+
+@pytest.mark.parametrize('secret', [b'\xf5abc', payload.pack(b'x'), b'\xf6\x00\x00\x00\x00', bytes(range(256))])
+def test_stream_binary_secret_starting_with_magic(secret):
+    # Dữ liệu nhị phân bắt đầu bằng byte đầu khung không bị hiểu nhầm là payload đóng khung
+    steg = ZeroWidthSteg()
+    stego = ''.join(steg.iter_hide(io.StringIO(COVER), io.BytesIO(secret), chunk_size=3))
+    unpacker = payload.StreamUnpacker()
+    data = b''.join(unpacker.feed(chunk) for chunk in steg.iter_extract(io.StringIO(stego), chunk_size=4))
+    assert data + unpacker.close() == secret
+    assert payload.unpack(steg.extract_bytes(stego)) == secret
+
+
+def test_stream_errors():
+    steg = ZeroWidthSteg()
+    with pytest.raises(ValueError):
+        list(steg.iter_hide(io.StringIO(''), io.StringIO('abc')))
+    with pytest.raises(ValueError):
+        list(steg.iter_extract(io.StringIO(COVER)))
+    # Thiếu delimiter kết thúc
+    with pytest.raises(ValueError):
+        stego = steg.hide(COVER, 'abc')
+        list(steg.iter_extract(io.StringIO(stego[:stego.rindex(steg.zwnj)])))
+
+
+# Văn bản gốc đã chứa sẵn các ký tự header bảng chữ cái, kể cả ngay sau chỗ chèn thông điệp
+HEADER_COVER = '\u2061\u2062' + COVER + '\u2063'
+
+
+@pytest.mark.parametrize('cover', [COVER, HEADER_COVER])
+@pytest.mark.parametrize('bits', sorted(ALPHABETS))
+def test_multi_bit_round_trip(bits, cover):
+    steg = ZeroWidthSteg(bits_per_symbol=bits)
+    stego = steg.hide(cover, "Thông điệp bí mật")
+    assert stego[0] == cover[0] and stego.endswith(steg.zwnj + cover[1:])
+    assert stego[2:3] == ALPHABET_HEADERS.get(bits, stego[2:3])
+    assert steg.extract(stego) == "Thông điệp bí mật"
+    # Header cho biết bảng chữ cái nên bộ trích xuất mặc định cũng đọc được
+    assert ZeroWidthSteg().extract(stego) == "Thông điệp bí mật"
+
+    data = bytes(range(256))
+    assert len(steg.encode_bytes(data)) == len(data) * 8 // bits
+    assert steg.decode_bytes(ALPHABET_HEADERS.get(bits, '') + steg.encode_bytes(data)) == data
+    assert steg.extract_bytes(steg.hide_bytes(cover, data)) == data
+
+
+@pytest.mark.parametrize('cover', [COVER, HEADER_COVER])
+@pytest.mark.parametrize('bits', sorted(ALPHABETS))
+def test_multi_bit_stream_and_file_round_trip(bits, cover, tmp_path):
+    steg = ZeroWidthSteg(bits_per_symbol=bits)
+    secret = "Thông điệp dài " * 20
+    stego = ''.join(steg.iter_hide(io.StringIO(cover * 5), io.StringIO(secret), chunk_size=7))
+    for chunk_size in (1, 3, len(stego)):
+        unpacker = payload.StreamUnpacker()
+        data = b''.join(unpacker.feed(chunk) for chunk in steg.iter_extract(io.StringIO(stego), chunk_size))
+        assert (data + unpacker.close()).decode('utf-8') == secret
+
+        output = io.StringIO()
+        ZeroWidthSteg().extract_stream(io.StringIO(stego), output, chunk_size)
+        assert output.getvalue() == secret
+
+    path = tmp_path / 'stego.txt'
+    path.write_text(stego, encoding='utf-8')
+    assert steg.extract_file(str(path), chunk_size=5) == secret
+    path.write_text(steg.hide(cover, "bí mật"), encoding='utf-8')
+    assert ZeroWidthSteg().extract_file(str(path)) == "bí mật"
+
+
+LONG_COVER = "Một hai ba bốn năm sáu bảy tám chín mười. " * 200
+
+
+@pytest.mark.parametrize('bits', [1, 2, 8])
+def test_distributed_round_trip(bits):
+    steg = ZeroWidthSteg(bits_per_symbol=bits, distribute=True, key='khóa')
+    stego = steg.hide(LONG_COVER, "Thông điệp phân tán")
+    assert steg.extract(stego) == "Thông điệp phân tán"
+    assert ''.join(char for char in stego if char not in HIDDEN_CHARS) == LONG_COVER
+
+    output = io.StringIO()
+    steg.extract_stream(io.StringIO(stego), output, chunk_size=13)
+    assert output.getvalue() == "Thông điệp phân tán"
+
+
+def test_distributed_segments_have_minimum_length():
+    steg = ZeroWidthSteg(distribute=True)
+    data = b'x' * 100
+    stego = steg.hide_bytes(LONG_COVER, data)
+    hidden = len(steg.encode_bytes(data))
+    # Mỗi đoạn có ít nhất MIN_SEGMENT_SYMBOLS ký hiệu nên số ký tự đánh dấu bị giới hạn
+    assert 1 < stego.count(SEGMENT_MARK) <= hidden // MIN_SEGMENT_SYMBOLS
+    assert len(stego) - len(LONG_COVER) == hidden + stego.count(SEGMENT_MARK)
+    assert steg.extract_bytes(stego) == data
+
+
+def test_distributed_key_mismatch_and_with_key():
+    steg = ZeroWidthSteg(distribute=True, key='đúng')
+    stego = steg.hide(LONG_COVER, "bí mật")
+    assert steg.with_key('sai').extract(stego) != "bí mật"
+    assert ZeroWidthSteg().with_key('đúng').extract(stego) == "bí mật"
+    # with_key trả về bản sao, đối tượng gốc giữ nguyên khóa
+    assert steg.with_key(None).extract(stego) != "bí mật"
+    assert steg.extract(stego) == "bí mật"
+
+
+def test_distributed_errors():
+    steg = ZeroWidthSteg(distribute=True)
+    assert steg.hide("   ", "abc") == "Văn bản gốc không có từ nào để phân tán thông điệp"
+    with pytest.raises(ValueError):
+        list(steg.iter_hide(io.StringIO(LONG_COVER), io.StringIO('abc')))